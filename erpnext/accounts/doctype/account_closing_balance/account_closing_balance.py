@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import cstr, flt
+from frappe.model.document import Document
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+from erpnext.utilities.bulk_insert import bulk_insert
+
+# Account Closing Balance holds the debit and credit totals of GL Entry up to the closing date of
+# a Period Closing Voucher, for each combination of these columns and the accounting dimensions
+key_fields = ("account", "cost_center", "finance_book", "is_opening", "is_period_closing")
+
+amount_fields = ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")
+
+class AccountClosingBalance(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_index("Account Closing Balance", ["company", "closing_date"])
+	frappe.db.add_index("Account Closing Balance", ["period_closing_voucher", "account"])
+
+def get_dimension_fields():
+	return key_fields + tuple(get_accounting_dimensions())
+
+def get_previous_closing(company, closing_date):
+	"""Returns the latest processed Period Closing Voucher of the company (name and posting date)
+	closed before `closing_date` which has closing balances"""
+	previous_closing = frappe.db.sql("""select pcv.name, pcv.posting_date
+		from `tabPeriod Closing Voucher` pcv
+		where pcv.company = %s and pcv.posting_date < %s and pcv.docstatus = 1
+			and pcv.gl_entry_processing_status = 'Completed'
+			and exists(select name from `tabAccount Closing Balance`
+				where period_closing_voucher = pcv.name)
+		order by pcv.posting_date desc, pcv.creation desc
+		limit 1""", (company, closing_date), as_dict=1)
+
+	return previous_closing[0] if previous_closing else None
+
+def make_closing_balances(voucher, accounts):
+	"""Insert the closing balances of `accounts` as on the posting date of the Period Closing Voucher,
+	from the closing balances of the previous closing and the GL entries posted since"""
+	if not accounts:
+		return
+
+	dimension_fields = get_dimension_fields()
+	previous_closing = get_previous_closing(voucher.company, voucher.posting_date)
+
+	balances = {}
+	def add_balance(d):
+		key = tuple(cstr(d.get(fieldname)) for fieldname in dimension_fields)
+		if key not in balances:
+			balances[key] = frappe._dict({fieldname: d.get(fieldname) or None for fieldname in dimension_fields})
+			balances[key].account_currency = d.account_currency
+			balances[key].update({fieldname: 0.0 for fieldname in amount_fields})
+
+		for fieldname in amount_fields:
+			balances[key][fieldname] += flt(d.get(fieldname))
+
+	date_condition = ""
+	if previous_closing:
+		date_condition = "and posting_date > %(from_date)s"
+		for d in frappe.db.sql("""select {dimension_fields}, account_currency, {amount_fields}
+			from `tabAccount Closing Balance`
+			where period_closing_voucher = %s and account in %s""".format(
+				dimension_fields=", ".join(dimension_fields), amount_fields=", ".join(amount_fields)),
+			(previous_closing.name, accounts), as_dict=1):
+			add_balance(d)
+
+	dimension_values = ["account", "cost_center", "finance_book", "if(is_opening = 'Yes', 'Yes', 'No')",
+		"if(voucher_type = 'Period Closing Voucher', 1, 0)"] + list(dimension_fields[len(key_fields):])
+
+	for d in frappe.db.sql("""select {dimension_values}, max(account_currency) as account_currency,
+			{sum_amount_fields}
+		from `tabGL Entry`
+		where company = %(company)s and account in %(accounts)s
+			and posting_date <= %(to_date)s {date_condition}
+		group by {group_by}""".format(
+			dimension_values=", ".join("{0} as {1}".format(value, fieldname)
+				for value, fieldname in zip(dimension_values, dimension_fields)),
+			sum_amount_fields=", ".join("sum({0}) as {0}".format(fieldname) for fieldname in amount_fields),
+			date_condition=date_condition, group_by=", ".join(dimension_values)), {
+			"company": voucher.company,
+			"accounts": accounts,
+			"from_date": previous_closing.posting_date if previous_closing else None,
+			"to_date": voucher.posting_date
+		}, as_dict=1):
+		add_balance(d)
+
+	rows = []
+	for d in balances.values():
+		if any(flt(d.get(fieldname), 9) for fieldname in amount_fields):
+			d.update({
+				"company": voucher.company,
+				"closing_date": voucher.posting_date,
+				"period_closing_voucher": voucher.name
+			})
+			rows.append(d)
+
+	bulk_insert("Account Closing Balance", rows)
+
+def delete_closing_balances(voucher):
+	frappe.db.sql("""delete from `tabAccount Closing Balance`
+		where period_closing_voucher = %s""", voucher)
+
+def invalidate_closing_balances(company=None, posting_date=None):
+	"""Delete the closing balances of the company as on or after `posting_date` (all, if not set),
+	to be called when GL entries are posted or cancelled on that date. They are recorded again
+	by `rebuild_closing_balances`"""
+	conditions, values = [], []
+	if company:
+		conditions.append("company = %s")
+		values.append(company)
+	if posting_date:
+		conditions.append("closing_date >= %s")
+		values.append(posting_date)
+
+	conditions = " and ".join(conditions) or "1=1"
+	if frappe.db.sql("""select name from `tabAccount Closing Balance`
+		where {0} limit 1""".format(conditions), tuple(values)):
+		frappe.db.sql("""delete from `tabAccount Closing Balance` where {0}""".format(conditions), tuple(values))
+
+def rebuild_closing_balances():
+	"""Scheduled job, record the closing balances of the processed Period Closing Vouchers
+	which do not have them, in the order of closing"""
+	for voucher in frappe.db.sql_list("""select pcv.name from `tabPeriod Closing Voucher` pcv
+		where pcv.docstatus = 1 and pcv.gl_entry_processing_status = 'Completed'
+			and not exists(select name from `tabAccount Closing Balance`
+				where period_closing_voucher = pcv.name)
+		order by pcv.posting_date, pcv.creation"""):
+		frappe.get_doc("Period Closing Voucher", voucher).make_closing_balances()
+		if not frappe.flags.in_test:
+			frappe.db.commit()
@@ -6,6 +6,8 @@ from __future__ import unicode_literals
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from erpnext.accounts.period_index import clear_closed_period_index
+from erpnext.utilities.site_index import update_modified_after_rename
 
 class OverlapError(frappe.ValidationError): pass
 
@@ -16,6 +18,16 @@ class AccountingPeriod(Document):
 	def before_insert(self):
 		self.bootstrap_doctypes_for_closing()
 
+	def on_update(self):
+		clear_closed_period_index()
+
+	def on_trash(self):
+		clear_closed_period_index()
+
+	def after_rename(self, old, new, merge):
+		update_modified_after_rename(self.doctype, new)
+		clear_closed_period_index()
+
 	def autoname(self):
 		company_abbr = frappe.get_cached_value('Company',  self.company,  "abbr")
 		self.name = " - ".join([self.period_name, company_abbr])
@@ -84,11 +84,39 @@ class Budget(Document):
 			or self.applicable_on_purchase_order or self.applicable_on_booking_actual_expenses):
 			self.applicable_on_booking_actual_expenses = 1
 
+def validate_expenses_against_budget(args_list):
+	"""Validates each of `args_list` (the item rows or GL entries of a document) against budget,
+	same as `validate_expense_against_budget`.
+
+	The applicable budgets are looked up in an index of the budgets of the fiscal year by account
+	and cost center (lft, rgt), and the actual, ordered and requested amounts are queried once
+	per account, budget against and period for all the rows of the document"""
+	frappe.flags.budget_cache = {}
+
+	try:
+		for args in args_list:
+			validate_expense_against_budget(args)
+	finally:
+		frappe.flags.budget_cache = None
+
+def get_budget_cache_value(key, generator):
+	"""Returns the value of `key`, memoised for the document being validated by
+	`validate_expenses_against_budget`"""
+	cache = frappe.flags.budget_cache
+	if cache is None:
+		return generator()
+
+	if key not in cache:
+		cache[key] = generator()
+
+	return cache[key]
+
 def validate_expense_against_budget(args):
 	args = frappe._dict(args)
 
 	if args.get('company') and not args.fiscal_year:
-		args.fiscal_year = get_fiscal_year(args.get('posting_date'), company=args.get('company'))[0]
+		args.fiscal_year = get_budget_cache_value(("fiscal_year", args.get('posting_date'), args.get('company')),
+			lambda: get_fiscal_year(args.get('posting_date'), company=args.get('company'))[0])
 		frappe.flags.exception_approver_role = frappe.get_cached_value('Company',
 			args.get('company'),  'exception_budget_approver_role')
 
@@ -103,42 +131,93 @@ def validate_expense_against_budget(args):
 
 	for budget_against in ['project', 'cost_center']:
 		if (args.get(budget_against) and args.account
-				and frappe.db.get_value("Account", {"name": args.account, "root_type": "Expense"})):
+				and get_budget_cache_value(("expense_account", args.account),
+					lambda: frappe.db.get_value("Account", {"name": args.account, "root_type": "Expense"}))):
 
 			if args.project and budget_against == 'project':
 				condition = "and b.project=%s" % frappe.db.escape(args.project)
 				args.budget_against_field = "Project"
 
 			elif args.cost_center and budget_against == 'cost_center':
-				cc_lft, cc_rgt = frappe.db.get_value("Cost Center", args.cost_center, ["lft", "rgt"])
+				cc_lft, cc_rgt = get_cost_center_lft_rgt(args.cost_center)
 				condition = """and exists(select name from `tabCost Center`
 					where lft<=%s and rgt>=%s and name=b.cost_center)""" % (cc_lft, cc_rgt)
 				args.budget_against_field = "Cost Center"
 
 			args.budget_against = args.get(budget_against)
 
-			budget_records = frappe.db.sql("""
-				select
-					b.{budget_against_field} as budget_against, ba.budget_amount, b.monthly_distribution,
-					ifnull(b.applicable_on_material_request, 0) as for_material_request,
-					ifnull(applicable_on_purchase_order,0) as for_purchase_order,
-					ifnull(applicable_on_booking_actual_expenses,0) as for_actual_expenses,
-					b.action_if_annual_budget_exceeded, b.action_if_accumulated_monthly_budget_exceeded,
-					b.action_if_annual_budget_exceeded_on_mr, b.action_if_accumulated_monthly_budget_exceeded_on_mr,
-					b.action_if_annual_budget_exceeded_on_po, b.action_if_accumulated_monthly_budget_exceeded_on_po
-				from
-					`tabBudget` b, `tabBudget Account` ba
-				where
-					b.name=ba.parent and b.fiscal_year=%s
-					and ba.account=%s and b.docstatus=1
-					{condition}
-			""".format(condition=condition,
-				budget_against_field=frappe.scrub(args.get("budget_against_field"))),
-				(args.fiscal_year, args.account), as_dict=True)
+			if frappe.flags.budget_cache is not None:
+				budget_records = get_applicable_budgets(args)
+			else:
+				budget_records = frappe.db.sql("""
+					select
+						b.{budget_against_field} as budget_against, ba.budget_amount, b.monthly_distribution,
+						ifnull(b.applicable_on_material_request, 0) as for_material_request,
+						ifnull(applicable_on_purchase_order,0) as for_purchase_order,
+						ifnull(applicable_on_booking_actual_expenses,0) as for_actual_expenses,
+						b.action_if_annual_budget_exceeded, b.action_if_accumulated_monthly_budget_exceeded,
+						b.action_if_annual_budget_exceeded_on_mr, b.action_if_accumulated_monthly_budget_exceeded_on_mr,
+						b.action_if_annual_budget_exceeded_on_po, b.action_if_accumulated_monthly_budget_exceeded_on_po
+					from
+						`tabBudget` b, `tabBudget Account` ba
+					where
+						b.name=ba.parent and b.fiscal_year=%s
+						and ba.account=%s and b.docstatus=1
+						{condition}
+				""".format(condition=condition,
+					budget_against_field=frappe.scrub(args.get("budget_against_field"))),
+					(args.fiscal_year, args.account), as_dict=True)
 
 			if budget_records:
 				validate_budget_records(args, budget_records)
 
+def get_cost_center_lft_rgt(cost_center):
+	return get_budget_cache_value(("cost_center", cost_center),
+		lambda: frappe.db.get_value("Cost Center", cost_center, ["lft", "rgt"]))
+
+def get_budget_index(fiscal_year):
+	"""Returns the submitted budgets of the fiscal year by account, with the lft and rgt of
+	their cost center"""
+	def build_budget_index():
+		budget_index = {}
+		for d in frappe.db.sql("""
+			select
+				b.cost_center, b.project, cc.lft, cc.rgt, ba.account, ba.budget_amount, b.monthly_distribution,
+				ifnull(b.applicable_on_material_request, 0) as for_material_request,
+				ifnull(applicable_on_purchase_order,0) as for_purchase_order,
+				ifnull(applicable_on_booking_actual_expenses,0) as for_actual_expenses,
+				b.action_if_annual_budget_exceeded, b.action_if_accumulated_monthly_budget_exceeded,
+				b.action_if_annual_budget_exceeded_on_mr, b.action_if_accumulated_monthly_budget_exceeded_on_mr,
+				b.action_if_annual_budget_exceeded_on_po, b.action_if_accumulated_monthly_budget_exceeded_on_po
+			from
+				`tabBudget` b inner join `tabBudget Account` ba on b.name=ba.parent
+				left join `tabCost Center` cc on cc.name=b.cost_center
+			where
+				b.fiscal_year=%s and b.docstatus=1
+		""", fiscal_year, as_dict=True):
+			budget_index.setdefault(d.account, []).append(d)
+
+		return budget_index
+
+	return get_budget_cache_value(("budget_index", fiscal_year), build_budget_index)
+
+def get_applicable_budgets(args):
+	"""Returns the budgets of the account of `args` against its project, or against its
+	cost center or any of its parents, from the budget index"""
+	if args.budget_against_field == "Cost Center":
+		cc_lft, cc_rgt = get_cost_center_lft_rgt(args.cost_center)
+
+	budget_records = []
+	for d in get_budget_index(args.fiscal_year).get(args.account, []):
+		if args.budget_against_field == "Project":
+			if d.project and d.project == args.project:
+				budget_records.append(frappe._dict(d, budget_against=d.project))
+
+		elif d.lft is not None and d.lft <= cc_lft and d.rgt >= cc_rgt:
+			budget_records.append(frappe._dict(d, budget_against=d.cost_center))
+
+	return budget_records
+
 def validate_budget_records(args, budget_records):
 	for budget in budget_records:
 		if flt(budget.budget_amount):
@@ -210,6 +289,16 @@ def get_requested_amount(args, budget):
 	item_code = args.get('item_code')
 	condition = get_other_condition(args, budget, 'Material Request')
 
+	if frappe.flags.budget_cache is not None:
+		requested_amounts = get_budget_cache_value(("requested_amount", condition), lambda: dict(frappe.db.sql("""
+			select child.item_code, ifnull((sum(child.stock_qty - child.ordered_qty) * rate), 0) as amount
+			from `tabMaterial Request Item` child, `tabMaterial Request` parent where parent.name = child.parent and
+			parent.docstatus = 1 and child.stock_qty > child.ordered_qty and {0} and
+			parent.material_request_type = 'Purchase' and parent.status != 'Stopped'
+			group by child.item_code""".format(condition))))
+
+		return requested_amounts.get(item_code, 0) if item_code else 0
+
 	data = frappe.db.sql(""" select ifnull((sum(child.stock_qty - child.ordered_qty) * rate), 0) as amount
 		from `tabMaterial Request Item` child, `tabMaterial Request` parent where parent.name = child.parent and
 		child.item_code = %s and parent.docstatus = 1 and child.stock_qty > child.ordered_qty and {0} and
@@ -221,6 +310,16 @@ def get_ordered_amount(args, budget):
 	item_code = args.get('item_code')
 	condition = get_other_condition(args, budget, 'Purchase Order')
 
+	if frappe.flags.budget_cache is not None:
+		ordered_amounts = get_budget_cache_value(("ordered_amount", condition), lambda: dict(frappe.db.sql("""
+			select child.item_code, ifnull(sum(child.amount - child.billed_amt), 0) as amount
+			from `tabPurchase Order Item` child, `tabPurchase Order` parent where
+			parent.name = child.parent and parent.docstatus = 1 and child.amount > child.billed_amt
+			and parent.status != 'Closed' and {0}
+			group by child.item_code""".format(condition))))
+
+		return ordered_amounts.get(item_code, 0) if item_code else 0
+
 	data = frappe.db.sql(""" select ifnull(sum(child.amount - child.billed_amt), 0) as amount
 		from `tabPurchase Order Item` child, `tabPurchase Order` parent where
 		parent.name = child.parent and child.item_code = %s and parent.docstatus = 1 and child.amount > child.billed_amt
@@ -237,8 +336,8 @@ def get_other_condition(args, budget, for_doc):
 
 	if args.get('fiscal_year'):
 		date_field = 'schedule_date' if for_doc == 'Material Request' else 'transaction_date'
-		start_date, end_date = frappe.db.get_value('Fiscal Year', args.get('fiscal_year'),
-			['year_start_date', 'year_end_date'])
+		start_date, end_date = get_budget_cache_value(("fiscal_year_dates", args.get('fiscal_year')),
+			lambda: frappe.db.get_value('Fiscal Year', args.get('fiscal_year'), ['year_start_date', 'year_end_date']))
 
 		condition += """ and parent.%s
 			between '%s' and '%s' """ %(date_field, start_date, end_date)
@@ -249,16 +348,18 @@ def get_actual_expense(args):
 	condition1 = " and gle.posting_date <= %(month_end_date)s" \
 		if args.get("month_end_date") else ""
 	if args.budget_against_field == "Cost Center":
-		lft_rgt = frappe.db.get_value(args.budget_against_field,
-			args.budget_against, ["lft", "rgt"], as_dict=1)
-		args.update(lft_rgt)
+		lft, rgt = get_cost_center_lft_rgt(args.budget_against)
+		args.update({"lft": lft, "rgt": rgt})
 		condition2 = """and exists(select name from `tabCost Center`
 			where lft>=%(lft)s and rgt<=%(rgt)s and name=gle.cost_center)"""
 
 	elif args.budget_against_field == "Project":
 		condition2 = "and exists(select name from `tabProject` where name=gle.project and gle.project = %(budget_against)s)"
 
-	return flt(frappe.db.sql("""
+	key = ("actual_expense", args.account, args.get("month_end_date"), args.fiscal_year, args.company,
+		args.budget_against_field, args.budget_against)
+
+	return get_budget_cache_value(key, lambda: flt(frappe.db.sql("""
 		select sum(gle.debit) - sum(gle.credit)
 		from `tabGL Entry` gle
 		where gle.account=%(account)s
@@ -267,9 +368,13 @@ def get_actual_expense(args):
 			and gle.company=%(company)s
 			and gle.docstatus=1
 			{condition2}
-	""".format(condition1=condition1, condition2=condition2), (args))[0][0])
+	""".format(condition1=condition1, condition2=condition2), (args))[0][0]))
 
 def get_accumulated_monthly_budget(monthly_distribution, posting_date, fiscal_year, annual_budget):
+	return get_budget_cache_value(("monthly_budget", monthly_distribution, posting_date, fiscal_year, annual_budget),
+		lambda: _get_accumulated_monthly_budget(monthly_distribution, posting_date, fiscal_year, annual_budget))
+
+def _get_accumulated_monthly_budget(monthly_distribution, posting_date, fiscal_year, annual_budget):
 	distribution = {}
 	if monthly_distribution:
 		for d in frappe.db.sql("""select mdp.month, mdp.percentage_allocation
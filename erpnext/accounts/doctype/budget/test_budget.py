@@ -152,6 +152,42 @@ class TestBudget(unittest.TestCase):
 
 		budget.cancel()
 
+	def test_yearly_budget_crossed_by_many_rows(self):
+		set_total_expense_zero("2013-02-28", "Cost Center")
+
+		budget = make_budget(budget_against="Cost Center")
+
+		def make_entry(amount, rows=50):
+			jv = frappe.new_doc("Journal Entry")
+			jv.posting_date = "2013-03-28"
+			jv.company = "_Test Company"
+			jv.user_remark = "test"
+			for i in range(rows):
+				jv.append("accounts", {
+					"account": "_Test Account Cost for Goods Sold - _TC",
+					"cost_center": "_Test Cost Center - _TC",
+					"debit_in_account_currency": amount
+				})
+
+			jv.append("accounts", {
+				"account": "_Test Bank - _TC",
+				"cost_center": "_Test Cost Center - _TC",
+				"credit_in_account_currency": amount * rows
+			})
+			jv.insert()
+			return jv
+
+		# each row is within the budget, all the rows together exceed it
+		jv = make_entry(2500)
+		self.assertRaises(BudgetError, jv.submit)
+
+		jv = make_entry(1000)
+		jv.submit()
+		jv.cancel()
+
+		budget.load_from_db()
+		budget.cancel()
+
 	def test_monthly_budget_on_cancellation1(self):
 		set_total_expense_zero("2013-02-28", "Cost Center")
 
@@ -8,6 +8,8 @@ from frappe.utils import getdate, add_days, add_years, cstr
 from dateutil.relativedelta import relativedelta
 
 from frappe.model.document import Document
+from erpnext.accounts.period_index import clear_fiscal_year_index
+from erpnext.utilities.site_index import update_modified_after_rename
 
 class FiscalYearIncorrectDate(frappe.ValidationError): pass
 
@@ -48,13 +50,17 @@ class FiscalYear(Document):
 
 	def on_update(self):
 		check_duplicate_fiscal_year(self)
-		frappe.cache().delete_value("fiscal_years")
+		clear_fiscal_year_index()
 	
 	def on_trash(self):
 		global_defaults = frappe.get_doc("Global Defaults")
 		if global_defaults.current_fiscal_year == self.name:
 			frappe.throw(_("You cannot delete Fiscal Year {0}. Fiscal Year {0} is set as default in Global Settings").format(self.name))
-		frappe.cache().delete_value("fiscal_years")
+		clear_fiscal_year_index()
+
+	def after_rename(self, old, new, merge):
+		update_modified_after_rename(self.doctype, new)
+		clear_fiscal_year_index()
 
 	def validate_overlap(self):
 		existing_fiscal_years = frappe.db.sql("""select name from `tabFiscal Year`
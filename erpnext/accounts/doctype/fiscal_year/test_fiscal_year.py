@@ -4,8 +4,10 @@
 from __future__ import unicode_literals
 
 import frappe, unittest
+from frappe.utils import getdate, add_days
 
 from erpnext.accounts.doctype.fiscal_year.fiscal_year import FiscalYearIncorrectDate
+from erpnext.accounts.utils import get_fiscal_year, FiscalYearError
 
 test_records = frappe.get_test_records('Fiscal Year')
 test_ignore = ["Company"]
@@ -23,3 +25,37 @@ class TestFiscalYear(unittest.TestCase):
 		})
 
 		self.assertRaises(FiscalYearIncorrectDate, fy.insert)
+
+	def test_fiscal_year_lookup(self):
+		"""fiscal year found in the index is the same as found by scanning all fiscal years"""
+		fiscal_years = frappe.db.sql("""select name, year_start_date, year_end_date from `tabFiscal Year`
+			where disabled = 0 order by year_start_date desc""", as_dict=1)
+
+		date = getdate("2011-12-25")
+		while date <= getdate("2017-01-05"):
+			expected = [fy.name for fy in fiscal_years
+				if getdate(fy.year_start_date) <= date <= getdate(fy.year_end_date)]
+			if expected:
+				self.assertEqual(get_fiscal_year(date)[0], expected[0])
+			else:
+				self.assertRaises(FiscalYearError, get_fiscal_year, date, verbose=0)
+			date = add_days(date, 3)
+
+		self.assertEqual(get_fiscal_year(fiscal_year="_Test Fiscal Year 2013")[1], getdate("2013-01-01"))
+
+	def test_fiscal_year_index_rebuilt(self):
+		if frappe.db.exists("Fiscal Year", "_Test Fiscal Year 1990"):
+			frappe.delete_doc("Fiscal Year", "_Test Fiscal Year 1990")
+
+		self.assertRaises(FiscalYearError, get_fiscal_year, "1990-06-01", verbose=0)
+
+		frappe.get_doc({
+			"doctype": "Fiscal Year",
+			"year": "_Test Fiscal Year 1990",
+			"year_start_date": "1990-01-01",
+			"year_end_date": "1990-12-31"
+		}).insert()
+		self.assertEqual(get_fiscal_year("1990-06-01")[0], "_Test Fiscal Year 1990")
+
+		frappe.delete_doc("Fiscal Year", "_Test Fiscal Year 1990")
+		self.assertRaises(FiscalYearError, get_fiscal_year, "1990-06-01", verbose=0)
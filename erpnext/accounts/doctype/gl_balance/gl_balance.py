@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import hashlib
+import frappe
+from frappe.utils import cint, cstr, flt, getdate, get_first_day, get_last_day, add_months, now
+from frappe.model.document import Document
+
+# GL Balance holds the debit and credit totals of GL Entry for each combination of
+# these columns and the month (period_start_date), the name is a hash of the values
+key_fields = ("company", "account", "cost_center", "party_type", "party", "finance_book",
+	"fiscal_year", "is_opening", "is_period_closing")
+
+amount_fields = ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency")
+
+class GLBalance(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_index("GL Balance", ["company", "account", "period_start_date"])
+	frappe.db.add_index("GL Balance", ["party_type", "party"])
+
+def is_gl_balance_valid():
+	"""GL Balance is valid once it has been built from the ledger (see `rebuild_gl_balances`)"""
+	return cint(frappe.db.get_default("gl_balance_valid"))
+
+def invalidate_gl_balances():
+	"""To be called when GL Entry is changed without updating GL Balance"""
+	frappe.db.set_default("gl_balance_valid", 0)
+
+def get_key(entry):
+	values = {
+		"is_opening": "Yes" if entry.get("is_opening") == "Yes" else "No",
+		"is_period_closing": 1 if entry.get("voucher_type") == "Period Closing Voucher" else 0,
+		"period_start_date": get_first_day(entry.get("posting_date"))
+	}
+
+	for fieldname in key_fields:
+		if fieldname not in values:
+			values[fieldname] = cstr(entry.get(fieldname))
+
+	return values
+
+def get_name(values):
+	"""same as the name set by `rebuild_gl_balances`"""
+	key = "|".join(cstr(values[fieldname]) for fieldname in key_fields + ("period_start_date",))
+	return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+def update_gl_balances(gl_entries, sign=1):
+	"""Add the amounts of the GL entries (or subtract, if `sign` is -1) to their GL Balance rows"""
+	balances = {}
+	for entry in gl_entries:
+		values = get_key(entry)
+		name = get_name(values)
+
+		if name not in balances:
+			values.update({
+				"name": name,
+				"account_currency": entry.get("account_currency")
+			})
+			values.update({fieldname: 0.0 for fieldname in amount_fields})
+			balances[name] = values
+
+		for fieldname in amount_fields:
+			balances[name][fieldname] += sign * flt(entry.get(fieldname))
+
+	if not balances:
+		return
+
+	invalidate_closing_balances_after(gl_entries)
+
+	fields = ("name",) + key_fields + ("period_start_date", "account_currency") + amount_fields
+	timestamp, user = now(), frappe.session.user
+
+	values = []
+	for d in balances.values():
+		values.extend([d[fieldname] for fieldname in fields] + [timestamp, timestamp, user, user])
+
+	placeholder = "({0})".format(", ".join(["%s"] * (len(fields) + 4)))
+	frappe.db.sql("""insert into `tabGL Balance` ({columns}, creation, modified, owner, modified_by)
+		values {values}
+		on duplicate key update {amounts}, modified = values(modified), modified_by = values(modified_by)""".format(
+			columns=", ".join(fields),
+			values=", ".join([placeholder] * len(balances)),
+			amounts=", ".join("{0} = {0} + values({0})".format(fieldname) for fieldname in amount_fields)),
+		tuple(values))
+
+def invalidate_closing_balances_after(gl_entries):
+	"""Closing balances as on or after the posting date of the entries do not include them"""
+	from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import invalidate_closing_balances
+
+	posting_dates = {}
+	for entry in gl_entries:
+		posting_date = getdate(entry.get("posting_date"))
+		if entry.get("company") not in posting_dates or posting_date < posting_dates[entry.get("company")]:
+			posting_dates[entry.get("company")] = posting_date
+
+	for company, posting_date in posting_dates.items():
+		invalidate_closing_balances(company, posting_date)
+
+def reverse_gl_balances(voucher_type, voucher_no):
+	"""Subtract the GL entries of the voucher from GL Balance, called before they are deleted"""
+	gl_entries = frappe.db.sql("""select {key_fields}, voucher_type, posting_date, account_currency,
+			{amount_fields}
+		from `tabGL Entry`
+		where voucher_type=%s and voucher_no=%s""".format(key_fields=", ".join(key_fields[:-1]),
+			amount_fields=", ".join(amount_fields)), (voucher_type, voucher_no), as_dict=1)
+
+	update_gl_balances(gl_entries, sign=-1)
+
+def rebuild_gl_balances():
+	"""Rebuild GL Balance from GL Entry"""
+	frappe.db.sql("delete from `tabGL Balance`")
+
+	key_values = """ifnull(company, ''), ifnull(account, ''), ifnull(cost_center, ''), ifnull(party_type, ''),
+		ifnull(party, ''), ifnull(finance_book, ''), ifnull(fiscal_year, ''),
+		if(is_opening = 'Yes', 'Yes', 'No'), if(voucher_type = 'Period Closing Voucher', 1, 0),
+		date_sub(posting_date, interval dayofmonth(posting_date) - 1 day)"""
+
+	frappe.db.sql("""insert into `tabGL Balance` (name, {key_fields}, period_start_date, account_currency,
+			{amount_fields}, creation, modified, owner, modified_by)
+		select md5(concat_ws('|', {key_values})), {key_values}, max(account_currency),
+			{sum_amount_fields}, now(), now(), %(user)s, %(user)s
+		from `tabGL Entry`
+		group by {key_values}""".format(key_fields=", ".join(key_fields), key_values=key_values,
+			amount_fields=", ".join(amount_fields),
+			sum_amount_fields=", ".join("sum({0})".format(fieldname) for fieldname in amount_fields)),
+		{"user": frappe.session.user})
+
+	frappe.db.set_default("gl_balance_valid", 1)
+
+def get_gl_balance_query(fields, conditions="", from_date=None, to_date=None, ignore_closing_entries=False):
+	"""Query of `fields` of the GL entries matching `conditions` posted between `from_date` and
+	`to_date`. Full months are read from GL Balance and the remaining days from GL Entry.
+
+	`fields` and `conditions` can use the key and amount columns (common to both tables),
+	aliased as `gle`. `{posting_date}` in `fields` is the posting date of GL Entry and
+	the period start date of GL Balance"""
+	from_date = getdate(from_date) if from_date else None
+	to_date = getdate(to_date) if to_date else None
+
+	# months covered by GL Balance
+	first_month = from_date
+	if from_date and from_date.day != 1:
+		first_month = get_first_day(add_months(from_date, 1))
+
+	last_month = None
+	if to_date:
+		last_month = get_first_day(to_date)
+		if to_date != get_last_day(to_date):
+			last_month = add_months(last_month, -1)
+
+	gl_balance_conditions, gl_entry_conditions = [], []
+	if not (first_month and last_month and first_month > last_month):
+		date_conditions = []
+		if first_month:
+			date_conditions.append("period_start_date >= '{0}'".format(first_month))
+		if last_month:
+			date_conditions.append("period_start_date <= '{0}'".format(last_month))
+		gl_balance_conditions.append(" and ".join(date_conditions) or "1=1")
+
+		if from_date and from_date < first_month:
+			gl_entry_conditions.append("posting_date >= '{0}' and posting_date < '{1}'".format(from_date,
+				first_month))
+		if to_date and last_month and to_date > get_last_day(last_month):
+			gl_entry_conditions.append("posting_date > '{0}' and posting_date <= '{1}'".format(
+				get_last_day(last_month), to_date))
+	else:
+		gl_entry_conditions.append("posting_date >= '{0}' and posting_date <= '{1}'".format(from_date, to_date))
+
+	if ignore_closing_entries:
+		closing_conditions = (" and is_period_closing = 0",
+			" and ifnull(voucher_type, '') != 'Period Closing Voucher'")
+	else:
+		closing_conditions = ("", "")
+
+	queries = []
+	for date_condition in gl_balance_conditions:
+		queries.append("""select {fields} from `tabGL Balance` gle
+			where {date_condition} {closing_condition} {conditions}""".format(
+				fields=fields.replace("{posting_date}", "period_start_date"),
+				date_condition=date_condition, closing_condition=closing_conditions[0], conditions=conditions))
+
+	for date_condition in gl_entry_conditions:
+		queries.append("""select {fields} from `tabGL Entry` gle
+			where {date_condition} {closing_condition} {conditions}""".format(
+				fields=fields.replace("{posting_date}", "posting_date"),
+				date_condition=date_condition, closing_condition=closing_conditions[1], conditions=conditions))
+
+	return " union all ".join(queries)
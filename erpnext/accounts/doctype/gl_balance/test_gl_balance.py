@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import nowdate, add_days, add_months, get_first_day
+from erpnext.accounts.utils import get_balance_on
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.gl_balance.gl_balance import rebuild_gl_balances
+
+class TestGLBalance(unittest.TestCase):
+	def setUp(self):
+		rebuild_gl_balances()
+
+	def tearDown(self):
+		frappe.db.set_default("gl_balance_valid", 1)
+
+	def test_gl_balance(self):
+		account = "_Test Bank - _TC"
+		dates = [add_months(nowdate(), -2), get_first_day(nowdate()), add_days(get_first_day(nowdate()), 5)]
+
+		for posting_date in dates:
+			make_journal_entry(account, "_Test Account Income - _TC", 100,
+				posting_date=posting_date, submit=True)
+
+		jv = make_journal_entry(account, "_Test Account Income - _TC", 50,
+			posting_date=add_months(nowdate(), -1), submit=True)
+		jv.cancel()
+
+		for date in dates + [add_days(nowdate(), -1), None]:
+			balance = get_balance_on(account, date=date)
+			bank_balance = get_balance_on(account, date=date, in_account_currency=False)
+
+			frappe.db.set_default("gl_balance_valid", 0)
+			self.assertEqual(get_balance_on(account, date=date), balance)
+			self.assertEqual(get_balance_on(account, date=date, in_account_currency=False), bank_balance)
+			frappe.db.set_default("gl_balance_valid", 1)
+
+		# rebuilt balances are the same as the ones updated by the transactions
+		balances = frappe.db.sql("""select name, debit, credit from `tabGL Balance`
+			where account=%s order by name""", account)
+		rebuild_gl_balances()
+		self.assertEqual(frappe.db.sql("""select name, debit, credit from `tabGL Balance`
+			where account=%s order by name""", account), balances)
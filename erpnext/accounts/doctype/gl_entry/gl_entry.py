@@ -13,6 +13,7 @@ from erpnext.accounts.utils import get_account_currency
 from erpnext.accounts.utils import get_fiscal_year
 from erpnext.exceptions import InvalidAccountCurrency
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_checks_for_pl_and_bs_accounts
+from erpnext.utilities.bulk_insert import get_master_details
 
 exclude_from_linked_with = True
 class GLEntry(Document):
@@ -32,8 +33,8 @@ class GLEntry(Document):
 
 		if not self.flags.from_repost:
 			self.check_pl_account()
-			self.validate_party()
 			self.validate_currency()
+			self.validate_party()
 
 	def on_update_with_args(self, adv_adj, update_outstanding = 'Yes', from_repost=False):
 		if not from_repost:
@@ -50,81 +51,30 @@ class GLEntry(Document):
 				update_outstanding_amt(self.account, self.party_type, self.party, self.against_voucher_type,
 					self.against_voucher)
 
+	def get_account_details(self):
+		if not getattr(self, "account_details", None) or self.account_details.name != self.account:
+			self.account_details = get_master_details("Account", [self.account],
+				account_fields).get(self.account) or frappe._dict()
+
+		return self.account_details
+
 	def check_mandatory(self):
-		mandatory = ['account','voucher_type','voucher_no','company']
-		for k in mandatory:
-			if not self.get(k):
-				frappe.throw(_("{0} is required").format(_(self.meta.get_label(k))))
-
-		account_type = frappe.db.get_value("Account", self.account, "account_type")
-		if not (self.party_type and self.party):
-			if account_type == "Receivable":
-				frappe.throw(_("{0} {1}: Customer is required against Receivable account {2}")
-					.format(self.voucher_type, self.voucher_no, self.account))
-			elif account_type == "Payable":
-				frappe.throw(_("{0} {1}: Supplier is required against Payable account {2}")
-					.format(self.voucher_type, self.voucher_no, self.account))
-
-		# Zero value transaction is not allowed
-		if not (flt(self.debit, self.precision("debit")) or flt(self.credit, self.precision("credit"))):
-			frappe.throw(_("{0} {1}: Either debit or credit amount is required for {2}")
-				.format(self.voucher_type, self.voucher_no, self.account))
+		validate_mandatory_fields(self, self.meta, self.get_account_details(), self.precision("debit"))
 
 	def pl_must_have_cost_center(self):
-		if frappe.db.get_value("Account", self.account, "report_type") == "Profit and Loss":
-			if not self.cost_center and self.voucher_type != 'Period Closing Voucher':
-				frappe.throw(_("{0} {1}: Cost Center is required for 'Profit and Loss' account {2}. Please set up a default Cost Center for the Company.")
-					.format(self.voucher_type, self.voucher_no, self.account))
-		else:
-			from erpnext.accounts.utils import get_allow_cost_center_in_entry_of_bs_account
-			if not get_allow_cost_center_in_entry_of_bs_account() and self.cost_center:
-				self.cost_center = None
-			if self.project:
-				self.project = None
+		from erpnext.accounts.utils import get_allow_cost_center_in_entry_of_bs_account
+		validate_cost_center_required(self, self.get_account_details(),
+			get_allow_cost_center_in_entry_of_bs_account())
 
 	def validate_dimensions_for_pl_and_bs(self):
-
-		account_type = frappe.db.get_value("Account", self.account, "report_type")
-
-		for dimension in get_checks_for_pl_and_bs_accounts():
-
-			if account_type == "Profit and Loss" \
-				and self.company == dimension.company and dimension.mandatory_for_pl and not dimension.disabled:
-				if not self.get(dimension.fieldname):
-					frappe.throw(_("Accounting Dimension <b>{0}</b> is required for 'Profit and Loss' account {1}.")
-						.format(dimension.label, self.account))
-
-			if account_type == "Balance Sheet" \
-				and self.company == dimension.company and dimension.mandatory_for_bs and not dimension.disabled:
-				if not self.get(dimension.fieldname):
-					frappe.throw(_("Accounting Dimension <b>{0}</b> is required for 'Balance Sheet' account {1}.")
-						.format(dimension.label, self.account))
-
+		validate_mandatory_dimensions(self, self.get_account_details(), get_checks_for_pl_and_bs_accounts())
 
 	def check_pl_account(self):
-		if self.is_opening=='Yes' and \
-				frappe.db.get_value("Account", self.account, "report_type")=="Profit and Loss" and \
-				self.voucher_type not in ['Purchase Invoice', 'Sales Invoice']:
-			frappe.throw(_("{0} {1}: 'Profit and Loss' type account {2} not allowed in Opening Entry")
-				.format(self.voucher_type, self.voucher_no, self.account))
+		validate_opening_account(self, self.get_account_details())
 
 	def validate_account_details(self, adv_adj):
 		"""Account must be ledger, active and not freezed"""
-
-		ret = frappe.db.sql("""select is_group, docstatus, company
-			from tabAccount where name=%s""", self.account, as_dict=1)[0]
-
-		if ret.is_group==1:
-			frappe.throw(_("{0} {1}: Account {2} cannot be a Group")
-				.format(self.voucher_type, self.voucher_no, self.account))
-
-		if ret.docstatus==2:
-			frappe.throw(_("{0} {1}: Account {2} is inactive")
-				.format(self.voucher_type, self.voucher_no, self.account))
-
-		if ret.company != self.company:
-			frappe.throw(_("{0} {1}: Account {2} does not belong to Company {3}")
-				.format(self.voucher_type, self.voucher_no, self.account, self.company))
+		validate_ledger_account(self, self.get_account_details())
 
 	def validate_cost_center(self):
 		if not hasattr(self, "cost_center_company"):
@@ -137,33 +87,154 @@ class GLEntry(Document):
 
 			return self.cost_center_company[self.cost_center]
 
-		if self.cost_center and _get_cost_center_company() != self.company:
-			frappe.throw(_("{0} {1}: Cost Center {2} does not belong to Company {3}")
-				.format(self.voucher_type, self.voucher_no, self.cost_center, self.company))
+		validate_cost_center_company(self, _get_cost_center_company() if self.cost_center else None)
 
 	def validate_party(self):
-		validate_party_frozen_disabled(self.party_type, self.party)
+		validate_party_details(self)
 
 	def validate_currency(self):
-		company_currency = erpnext.get_company_currency(self.company)
-		account_currency = get_account_currency(self.account)
-
-		if not self.account_currency:
-			self.account_currency = company_currency
-
-		if account_currency != self.account_currency:
-			frappe.throw(_("{0} {1}: Accounting Entry for {2} can only be made in currency: {3}")
-				.format(self.voucher_type, self.voucher_no, self.account,
-				(account_currency or company_currency)), InvalidAccountCurrency)
-
-		if self.party_type and self.party:
-			validate_party_gle_currency(self.party_type, self.party, self.company, self.account_currency)
-
+		validate_account_currency(self, get_account_currency(self.account),
+			erpnext.get_company_currency(self.company))
 
 	def validate_and_set_fiscal_year(self):
-		if not self.fiscal_year:
-			self.fiscal_year = get_fiscal_year(self.posting_date, company=self.company)[0]
-
+		set_fiscal_year_of_entry(self)
+
+# validations of the GL Entry controller, shared with the bulk insert path (`validate_gl_entries`),
+# `gle` is a GL Entry or a frappe._dict of its values
+account_fields = ["account_type", "report_type", "is_group", "docstatus", "company"]
+
+def validate_mandatory_fields(gle, meta, account, precision):
+	for k in ['account','voucher_type','voucher_no','company']:
+		if not gle.get(k):
+			frappe.throw(_("{0} is required").format(_(meta.get_label(k))))
+
+	if not (gle.party_type and gle.party):
+		if account.account_type == "Receivable":
+			frappe.throw(_("{0} {1}: Customer is required against Receivable account {2}")
+				.format(gle.voucher_type, gle.voucher_no, gle.account))
+		elif account.account_type == "Payable":
+			frappe.throw(_("{0} {1}: Supplier is required against Payable account {2}")
+				.format(gle.voucher_type, gle.voucher_no, gle.account))
+
+	# Zero value transaction is not allowed
+	if not (flt(gle.debit, precision) or flt(gle.credit, precision)):
+		frappe.throw(_("{0} {1}: Either debit or credit amount is required for {2}")
+			.format(gle.voucher_type, gle.voucher_no, gle.account))
+
+def set_fiscal_year_of_entry(gle):
+	if not gle.fiscal_year:
+		gle.fiscal_year = get_fiscal_year(gle.posting_date, company=gle.company)[0]
+
+def validate_cost_center_required(gle, account, allow_cost_center_in_entry_of_bs_account):
+	if account.report_type == "Profit and Loss":
+		if not gle.cost_center and gle.voucher_type != 'Period Closing Voucher':
+			frappe.throw(_("{0} {1}: Cost Center is required for 'Profit and Loss' account {2}. Please set up a default Cost Center for the Company.")
+				.format(gle.voucher_type, gle.voucher_no, gle.account))
+	else:
+		if not allow_cost_center_in_entry_of_bs_account and gle.cost_center:
+			gle.cost_center = None
+		if gle.project:
+			gle.project = None
+
+def validate_cost_center_company(gle, cost_center_company):
+	if gle.cost_center and cost_center_company != gle.company:
+		frappe.throw(_("{0} {1}: Cost Center {2} does not belong to Company {3}")
+			.format(gle.voucher_type, gle.voucher_no, gle.cost_center, gle.company))
+
+def validate_opening_account(gle, account):
+	if gle.is_opening=='Yes' and account.report_type=="Profit and Loss" and \
+			gle.voucher_type not in ['Purchase Invoice', 'Sales Invoice']:
+		frappe.throw(_("{0} {1}: 'Profit and Loss' type account {2} not allowed in Opening Entry")
+			.format(gle.voucher_type, gle.voucher_no, gle.account))
+
+def validate_party_details(gle):
+	validate_party_frozen_disabled(gle.party_type, gle.party)
+
+	if gle.party_type and gle.party:
+		validate_party_gle_currency(gle.party_type, gle.party, gle.company, gle.account_currency)
+
+def validate_account_currency(gle, account_currency, company_currency):
+	if not gle.account_currency:
+		gle.account_currency = company_currency
+
+	if account_currency != gle.account_currency:
+		frappe.throw(_("{0} {1}: Accounting Entry for {2} can only be made in currency: {3}")
+			.format(gle.voucher_type, gle.voucher_no, gle.account,
+			(account_currency or company_currency)), InvalidAccountCurrency)
+
+def validate_ledger_account(gle, account):
+	if account.is_group==1:
+		frappe.throw(_("{0} {1}: Account {2} cannot be a Group")
+			.format(gle.voucher_type, gle.voucher_no, gle.account))
+
+	if account.docstatus==2:
+		frappe.throw(_("{0} {1}: Account {2} is inactive")
+			.format(gle.voucher_type, gle.voucher_no, gle.account))
+
+	if account.company != gle.company:
+		frappe.throw(_("{0} {1}: Account {2} does not belong to Company {3}")
+			.format(gle.voucher_type, gle.voucher_no, gle.account, gle.company))
+
+def validate_mandatory_dimensions(gle, account, dimensions):
+	for dimension in dimensions:
+		if gle.company != dimension.company or dimension.disabled or gle.get(dimension.fieldname):
+			continue
+
+		if account.report_type == "Profit and Loss" and dimension.mandatory_for_pl:
+			frappe.throw(_("Accounting Dimension <b>{0}</b> is required for 'Profit and Loss' account {1}.")
+				.format(dimension.label, gle.account))
+
+		if account.report_type == "Balance Sheet" and dimension.mandatory_for_bs:
+			frappe.throw(_("Accounting Dimension <b>{0}</b> is required for 'Balance Sheet' account {1}.")
+				.format(dimension.label, gle.account))
+
+def validate_gl_entries(gl_entries, adv_adj=False, from_repost=False):
+	"""Run the validations of `GLEntry` (validate and on_update_with_args) for all the entries
+	of a voucher at once, with one query per master. Used by the bulk insert path of
+	`erpnext.accounts.general_ledger.save_entries`. Sets `fiscal_year` and `account_currency`
+	in the entries.
+
+	Balance type and outstanding amounts depend on the inserted entries and are not checked here"""
+	from erpnext.accounts.utils import get_allow_cost_center_in_entry_of_bs_account
+
+	meta = frappe.get_meta("GL Entry")
+	accounts = get_master_details("Account", [gle.account for gle in gl_entries], account_fields)
+	cost_centers = get_master_details("Cost Center", [gle.cost_center for gle in gl_entries], ["company"])
+	dimensions = get_checks_for_pl_and_bs_accounts() if not from_repost else []
+	allow_cost_center_in_entry_of_bs_account = get_allow_cost_center_in_entry_of_bs_account()
+
+	validated_parties = set()
+	for gle in gl_entries:
+		account = accounts.get(gle.account, frappe._dict())
+		company_currency = erpnext.get_company_currency(gle.company)
+
+		validate_mandatory_fields(gle, meta, account,
+			get_field_precision(meta.get_field("debit"), company_currency))
+		set_fiscal_year_of_entry(gle)
+		validate_cost_center_required(gle, account, allow_cost_center_in_entry_of_bs_account)
+		validate_cost_center_company(gle, cost_centers.get(gle.cost_center, {}).get("company"))
+
+		if from_repost:
+			continue
+
+		validate_opening_account(gle, account)
+		validate_account_currency(gle, get_account_currency(gle.account), company_currency)
+
+		# once per party and currency
+		party_key = (gle.party_type, gle.party, gle.company, gle.account_currency)
+		if party_key not in validated_parties:
+			validate_party_details(gle)
+			validated_parties.add(party_key)
+
+		validate_ledger_account(gle, account)
+		validate_mandatory_dimensions(gle, account, dimensions)
+
+	if not from_repost:
+		for posting_date in set(gle.posting_date for gle in gl_entries):
+			check_freezing_date(posting_date, adv_adj)
+
+	for account in set(gle.account for gle in gl_entries):
+		validate_frozen_account(account, adv_adj)
 
 def validate_balance_type(account, adv_adj=False):
 	if not adv_adj and account:
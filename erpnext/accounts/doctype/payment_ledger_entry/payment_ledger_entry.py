@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.model.document import Document
+from erpnext.utilities.bulk_insert import bulk_insert
+
+# Payment Ledger Entry is a copy of the GL Entry (with the same name) of a party
+# against a receivable or payable account
+gl_entry_fields = ("name", "company", "posting_date", "due_date", "account", "party_type", "party",
+	"cost_center", "finance_book", "voucher_type", "voucher_no", "against_voucher_type", "against_voucher",
+	"remarks", "debit", "credit", "account_currency", "debit_in_account_currency", "credit_in_account_currency")
+
+class PaymentLedgerEntry(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_index("Payment Ledger Entry", ["company", "account_type", "party_type", "party"])
+	frappe.db.add_index("Payment Ledger Entry", ["party_type", "party", "account"])
+	frappe.db.add_index("Payment Ledger Entry", ["against_voucher_type", "against_voucher"])
+	frappe.db.add_index("Payment Ledger Entry", ["voucher_type", "voucher_no"])
+
+def make_payment_ledger_entries(gl_entries):
+	"""Copy the GL entries of parties against receivable and payable accounts"""
+	accounts = list(set(gle.account for gle in gl_entries if gle.get("party_type") and gle.get("party")))
+	if not accounts:
+		return
+
+	account_types = dict(frappe.db.sql("""select name, account_type from `tabAccount`
+		where name in %s and account_type in ('Receivable', 'Payable')""", (accounts,)))
+
+	rows = []
+	for gle in gl_entries:
+		if gle.get("party_type") and gle.get("party") and gle.account in account_types:
+			row = {fieldname: gle.get(fieldname) for fieldname in gl_entry_fields}
+			row["account_type"] = account_types[gle.account]
+			rows.append(row)
+
+	bulk_insert("Payment Ledger Entry", rows)
+
+def delete_payment_ledger_entries(voucher_type, voucher_no):
+	frappe.db.sql("""delete from `tabPayment Ledger Entry`
+		where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
+
+def rebuild_payment_ledger(voucher_type=None, voucher_no=None):
+	"""Recreate the payment ledger (of the voucher, if given) from GL Entry"""
+	conditions = ""
+	if voucher_type and voucher_no:
+		conditions = " and gle.voucher_type=%(voucher_type)s and gle.voucher_no=%(voucher_no)s"
+		delete_payment_ledger_entries(voucher_type, voucher_no)
+	else:
+		frappe.db.sql("delete from `tabPayment Ledger Entry`")
+
+	frappe.db.sql("""insert into `tabPayment Ledger Entry` ({fields}, account_type,
+			creation, modified, owner, modified_by, docstatus)
+		select {gle_fields}, account.account_type, now(), now(), %(user)s, %(user)s, 0
+		from `tabGL Entry` gle, `tabAccount` account
+		where account.name = gle.account and account.account_type in ('Receivable', 'Payable')
+			and ifnull(gle.party_type, '') != '' and ifnull(gle.party, '') != '' {conditions}""".format(
+			fields=", ".join(gl_entry_fields),
+			gle_fields=", ".join("gle." + fieldname for fieldname in gl_entry_fields),
+			conditions=conditions),
+		{"user": frappe.session.user, "voucher_type": voucher_type, "voucher_no": voucher_no})
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from erpnext.accounts.utils import get_outstanding_invoices
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+from erpnext.accounts.doctype.payment_ledger_entry.payment_ledger_entry import rebuild_payment_ledger
+
+class TestPaymentLedgerEntry(unittest.TestCase):
+	def get_entries(self, voucher_type, voucher_no):
+		return frappe.db.sql("""select name, account, party, against_voucher, debit, credit
+			from `tabPayment Ledger Entry`
+			where voucher_type=%s and voucher_no=%s order by name""", (voucher_type, voucher_no), as_dict=1)
+
+	def test_payment_ledger_entries(self):
+		si = create_sales_invoice(rate=300)
+		gl_entries = frappe.db.sql("""select name, account, party, against_voucher, debit, credit
+			from `tabGL Entry`
+			where voucher_type='Sales Invoice' and voucher_no=%s and account='Debtors - _TC'
+			order by name""", si.name, as_dict=1)
+		self.assertEqual(self.get_entries("Sales Invoice", si.name), gl_entries)
+
+		pe = get_payment_entry("Sales Invoice", si.name, party_amount=100, bank_account="_Test Bank - _TC")
+		pe.reference_no = "1"
+		pe.reference_date = si.posting_date
+		pe.insert()
+		pe.submit()
+
+		payment_entries = self.get_entries("Payment Entry", pe.name)
+		self.assertEqual(len(payment_entries), 1)
+		self.assertEqual(payment_entries[0].against_voucher, si.name)
+		self.assertEqual(payment_entries[0].credit, 100)
+
+		outstanding_invoices = get_outstanding_invoices("Customer", si.customer, si.debit_to,
+			condition=" and voucher_no={0}".format(frappe.db.escape(si.name)))
+		self.assertEqual(outstanding_invoices[0].outstanding_amount, 200)
+
+		# rebuilt from GL Entry
+		rebuild_payment_ledger("Payment Entry", pe.name)
+		self.assertEqual(self.get_entries("Payment Entry", pe.name), payment_entries)
+
+		pe.cancel()
+		self.assertFalse(self.get_entries("Payment Entry", pe.name))
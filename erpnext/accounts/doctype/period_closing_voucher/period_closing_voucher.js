@@ -31,6 +31,18 @@ frappe.ui.form.on('Period Closing Voucher', {
 				};
 				frappe.set_route("query-report", "General Ledger");
 			}, "fa fa-table");
+
+			if(frm.doc.gl_entry_processing_status=="Failed") {
+				frm.add_custom_button(__('Retry'), function() {
+					frappe.call({
+						method: "erpnext.accounts.doctype.period_closing_voucher.period_closing_voucher.retry_closing_entries",
+						args: {voucher: frm.doc.name},
+						callback: function() {
+							frm.reload_doc();
+						}
+					});
+				});
+			}
 		}
 	}
 	
@@ -3,10 +3,22 @@
 
 from __future__ import unicode_literals
 import frappe
-from frappe.utils import flt
+from frappe.utils import flt, get_datetime, add_to_date, now_datetime
 from frappe import _
 from erpnext.accounts.utils import get_account_currency
 from erpnext.controllers.accounts_controller import AccountsController
+from erpnext.accounts.doctype.gl_balance.gl_balance import reverse_gl_balances
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import make_closing_balances, \
+	delete_closing_balances
+
+# accounts closed in one transaction, the closing entries of each chunk of accounts
+# are committed together with the last account closed
+ACCOUNTS_PER_CHUNK = 100
+
+# vouchers left "Processing" for longer than this are considered
+# abandoned by a crashed worker and are picked up again
+PROCESSING_TIMEOUT_IN_MINUTES = 120
 
 class PeriodClosingVoucher(AccountsController):
 	def validate(self):
@@ -14,11 +26,18 @@ class PeriodClosingVoucher(AccountsController):
 		self.validate_posting_date()
 
 	def on_submit(self):
-		self.make_gl_entries()
+		self.db_set("gl_entry_processing_status", "Queued")
+		enqueue_closing_entries(self.name)
 
 	def on_cancel(self):
+		if self.gl_entry_processing_status in ("Queued", "Processing"):
+			frappe.throw(_("Closing entries of {0} are being processed, please try again later")
+				.format(self.name))
+
+		reverse_gl_balances("Period Closing Voucher", self.name)
 		frappe.db.sql("""delete from `tabGL Entry`
 			where voucher_type = 'Period Closing Voucher' and voucher_no=%s""", self.name)
+		delete_closing_balances(self.name)
 
 	def validate_account_head(self):
 		closing_account_type = frappe.db.get_value("Account", self.closing_account_head, "root_type")
@@ -46,14 +65,32 @@ class PeriodClosingVoucher(AccountsController):
 			frappe.throw(_("Another Period Closing Entry {0} has been made after {1}")
 				.format(pce[0][0], self.posting_date))
 
-	def make_gl_entries(self):
+	def make_gl_entries(self, commit=False):
+		"""Post the closing entries of the Profit and Loss accounts in chunks of accounts, after
+		`last_processed_account`. Each chunk is balanced by an entry in the closing account"""
+		accounts = frappe.db.sql_list("""select name from `tabAccount`
+			where company = %s and report_type = 'Profit and Loss' and docstatus < 2 and name > %s
+			order by name""", (self.company, self.last_processed_account or ""))
+
+		for i in range(0, len(accounts), ACCOUNTS_PER_CHUNK):
+			chunk = accounts[i:i + ACCOUNTS_PER_CHUNK]
+			gl_entries = self.get_closing_entries(self.get_pl_balances(chunk))
+			if gl_entries:
+				from erpnext.accounts.general_ledger import make_gl_entries
+				make_gl_entries(gl_entries, merge_entries=False)
+
+			self.db_set("last_processed_account", chunk[-1])
+			if commit:
+				frappe.db.commit()
+
+	def get_closing_entries(self, pl_accounts):
 		gl_entries = []
 		net_pl_balance = 0
-		pl_accounts = self.get_pl_balances()
+		dimensions = get_accounting_dimensions()
 
 		for acc in pl_accounts:
 			if flt(acc.balance_in_company_currency):
-				gl_entries.append(self.get_gl_dict({
+				gl_entry = self.get_gl_dict({
 					"account": acc.account,
 					"cost_center": acc.cost_center,
 					"account_currency": acc.account_currency,
@@ -65,8 +102,12 @@ class PeriodClosingVoucher(AccountsController):
 						if flt(acc.balance_in_account_currency) > 0 else 0,
 					"credit": abs(flt(acc.balance_in_company_currency)) \
 						if flt(acc.balance_in_company_currency) > 0 else 0
-				}))
+				})
 
+				for dimension in dimensions:
+					gl_entry[dimension] = acc.get(dimension)
+
+				gl_entries.append(gl_entry)
 				net_pl_balance += flt(acc.balance_in_company_currency)
 
 		if net_pl_balance:
@@ -80,19 +121,100 @@ class PeriodClosingVoucher(AccountsController):
 				"cost_center": cost_center
 			}))
 
-		from erpnext.accounts.general_ledger import make_gl_entries
-		make_gl_entries(gl_entries)
+		return gl_entries
+
+	def get_pl_balances(self, accounts):
+		"""Get balance for pl accounts, by cost center and accounting dimensions"""
+		if not self.get("year_start_date"):
+			from erpnext.accounts.utils import get_fiscal_year
+			self.year_start_date = get_fiscal_year(self.posting_date, self.fiscal_year, company=self.company)[1]
+
+		dimension_fields = ", ".join(["t1.cost_center"] + ["t1.{0}".format(d) for d in get_accounting_dimensions()])
 
-	def get_pl_balances(self):
-		"""Get balance for pl accounts"""
 		return frappe.db.sql("""
 			select
-				t1.account, t1.cost_center, t2.account_currency,
+				t1.account, {dimension_fields}, t2.account_currency,
 				sum(t1.debit_in_account_currency) - sum(t1.credit_in_account_currency) as balance_in_account_currency,
 				sum(t1.debit) - sum(t1.credit) as balance_in_company_currency
 			from `tabGL Entry` t1, `tabAccount` t2
-			where t1.account = t2.name and t2.report_type = 'Profit and Loss'
-			and t2.docstatus < 2 and t2.company = %s
-			and t1.posting_date between %s and %s
-			group by t1.account, t1.cost_center
-		""", (self.company, self.get("year_start_date"), self.posting_date), as_dict=1)
+			where t1.account = t2.name and t1.account in %s
+			and t1.company = %s and t1.posting_date between %s and %s
+			group by t1.account, {dimension_fields}
+		""".format(dimension_fields=dimension_fields),
+			(accounts, self.company, self.get("year_start_date"), self.posting_date), as_dict=1)
+
+	def make_closing_balances(self):
+		"""Record the closing balances of all the accounts of the company, in chunks of accounts"""
+		delete_closing_balances(self.name)
+
+		accounts = frappe.db.sql_list("""select name from `tabAccount`
+			where company = %s and docstatus < 2 order by name""", self.company)
+
+		for i in range(0, len(accounts), ACCOUNTS_PER_CHUNK):
+			make_closing_balances(self, accounts[i:i + ACCOUNTS_PER_CHUNK])
+
+def enqueue_closing_entries(voucher):
+	# the job reads the submitted voucher, it is queued once the submit is committed
+	frappe.enqueue(process_closing_entries, queue="long", timeout=6000, voucher=voucher,
+		now=frappe.flags.in_test, enqueue_after_commit=True)
+
+def process_closing_entries(voucher, commit=None):
+	"""Background job, post the closing entries of the Period Closing Voucher and record the
+	closing balances of the accounts.
+
+	Closing entries are committed in chunks of accounts, a failed or interrupted job is
+	resumed after the last account closed (see `retry_closing_entries` and
+	`process_queued_closing_vouchers`)"""
+	# tests run the job within the transaction of the submit
+	if commit is None:
+		commit = not frappe.flags.in_test
+
+	status = frappe.db.sql("""select gl_entry_processing_status, modified from `tabPeriod Closing Voucher`
+		where name = %s and docstatus = 1 for update""", voucher, as_dict=1)
+	if not status or not (status[0].gl_entry_processing_status == "Queued"
+		or (status[0].gl_entry_processing_status == "Processing"
+			and get_datetime(status[0].modified) < get_abandoned_before())):
+		return
+
+	doc = frappe.get_doc("Period Closing Voucher", voucher)
+	doc.db_set("gl_entry_processing_status", "Processing")
+	if commit:
+		frappe.db.commit()
+
+	try:
+		doc.make_gl_entries(commit=commit)
+		doc.make_closing_balances()
+		doc.db_set("gl_entry_processing_status", "Completed")
+		doc.db_set("error_message", "")
+		if commit:
+			frappe.db.commit()
+	except Exception:
+		if not commit:
+			raise
+
+		frappe.db.rollback()
+		doc.db_set("gl_entry_processing_status", "Failed")
+		doc.db_set("error_message", frappe.get_traceback())
+		frappe.db.commit()
+
+def get_abandoned_before():
+	return add_to_date(now_datetime(), minutes=-PROCESSING_TIMEOUT_IN_MINUTES)
+
+def process_queued_closing_vouchers():
+	"""Scheduled job, process the vouchers not picked up by their job or abandoned by a crashed worker"""
+	for voucher in frappe.db.sql_list("""select name from `tabPeriod Closing Voucher`
+		where docstatus = 1 and (gl_entry_processing_status = 'Queued'
+			or (gl_entry_processing_status = 'Processing' and modified < %s))
+		order by posting_date, creation""", get_abandoned_before()):
+		process_closing_entries(voucher)
+
+@frappe.whitelist()
+def retry_closing_entries(voucher):
+	doc = frappe.get_doc("Period Closing Voucher", voucher)
+	doc.check_permission("submit")
+
+	if doc.gl_entry_processing_status != "Failed":
+		frappe.throw(_("Only failed vouchers can be processed again"))
+
+	doc.db_set("gl_entry_processing_status", "Queued")
+	enqueue_closing_entries(doc.name)
@@ -5,7 +5,7 @@
 from __future__ import unicode_literals
 import unittest
 import frappe
-from frappe.utils import flt, today
+from frappe.utils import flt, today, add_days
 from erpnext.accounts.utils import get_fiscal_year, now
 from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
 
@@ -43,7 +43,7 @@ class TestPeriodClosingVoucher(unittest.TestCase):
 		pcv = self.make_period_closing_voucher()
 
 		# Check value for closing account
-		gle_amount_for_closing_account = frappe.db.sql("""select debit - credit
+		gle_amount_for_closing_account = frappe.db.sql("""select sum(debit - credit)
 			from `tabGL Entry` where voucher_type='Period Closing Voucher' and voucher_no=%s
 			and account = '_Test Account Reserves and Surplus - _TC'""", pcv.name)
 
@@ -65,6 +65,169 @@ class TestPeriodClosingVoucher(unittest.TestCase):
 			self.assertEqual(gle_for_random_expense_account[0].amount_in_account_currency,
 				-1*random_expense_account[0].balance_in_account_currency)
 
+	def test_closing_balances(self):
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400,
+			"_Test Cost Center - _TC", posting_date=now(), submit=True)
+
+		pcv = self.make_period_closing_voucher()
+		self.assertEqual(frappe.db.get_value("Period Closing Voucher", pcv.name, "gl_entry_processing_status"),
+			"Completed")
+
+		closing_balances = frappe.db.sql("""select account, sum(debit - credit)
+			from `tabAccount Closing Balance` where period_closing_voucher=%s
+			group by account""", pcv.name)
+
+		gl_balances = frappe.db.sql("""select account, sum(debit - credit)
+			from `tabGL Entry` where company='_Test Company' and posting_date <= %s
+			group by account""", pcv.posting_date)
+
+		self.assertEqual(self.get_non_zero_balances(closing_balances), self.get_non_zero_balances(gl_balances))
+
+	def test_resume_closing_entries(self):
+		from erpnext.accounts.doctype.period_closing_voucher import period_closing_voucher
+
+		make_journal_entry("_Test Account Cost for Goods Sold - _TC",
+			"_Test Bank - _TC", 600, "_Test Cost Center - _TC", posting_date=now(), submit=True)
+
+		accounts_per_chunk = period_closing_voucher.ACCOUNTS_PER_CHUNK
+		period_closing_voucher.ACCOUNTS_PER_CHUNK = 2
+		try:
+			pcv = self.make_period_closing_voucher()
+			gl_entries = frappe.db.count("GL Entry", {"voucher_no": pcv.name})
+			closing_balances = frappe.db.count("Account Closing Balance", {"period_closing_voucher": pcv.name})
+
+			# voucher abandoned after the last chunk, only the closing balances are recorded again
+			frappe.db.sql("""update `tabPeriod Closing Voucher`
+				set gl_entry_processing_status='Processing', modified='2000-01-01' where name=%s""", pcv.name)
+			period_closing_voucher.process_queued_closing_vouchers()
+		finally:
+			period_closing_voucher.ACCOUNTS_PER_CHUNK = accounts_per_chunk
+
+		self.assertEqual(frappe.db.get_value("Period Closing Voucher", pcv.name, "gl_entry_processing_status"),
+			"Completed")
+		self.assertEqual(frappe.db.count("GL Entry", {"voucher_no": pcv.name}), gl_entries)
+		self.assertEqual(frappe.db.count("Account Closing Balance", {"period_closing_voucher": pcv.name}),
+			closing_balances)
+
+		# closing entries of each chunk are balanced
+		self.assertEqual(flt(frappe.db.sql("""select sum(debit - credit) from `tabGL Entry`
+			where voucher_no=%s""", pcv.name)[0][0], 2), 0)
+
+	def test_retry_after_failed_chunk(self):
+		from erpnext.accounts.doctype.period_closing_voucher import period_closing_voucher
+		from erpnext.accounts.doctype.period_closing_voucher.period_closing_voucher import PeriodClosingVoucher
+		from erpnext.accounts.doctype.gl_balance.gl_balance import reverse_gl_balances
+
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400,
+			"_Test Cost Center - _TC", posting_date=now(), submit=True)
+		make_journal_entry("_Test Account Cost for Goods Sold - _TC",
+			"_Test Bank - _TC", 600, "_Test Cost Center - _TC", posting_date=now(), submit=True)
+
+		pcv = self.make_period_closing_voucher()
+		closing_entries = self.get_closing_entries(pcv.name)
+
+		# process the voucher again from the start, the second chunk of accounts fails
+		reverse_gl_balances("Period Closing Voucher", pcv.name)
+		frappe.db.sql("""delete from `tabGL Entry` where voucher_no=%s""", pcv.name)
+		frappe.db.sql("""delete from `tabAccount Closing Balance` where period_closing_voucher=%s""", pcv.name)
+		frappe.db.sql("""update `tabPeriod Closing Voucher` set gl_entry_processing_status='Queued',
+			last_processed_account=null where name=%s""", pcv.name)
+
+		get_pl_balances = PeriodClosingVoucher.get_pl_balances
+		processed_chunks = []
+		def get_pl_balances_of_first_chunk(self, accounts):
+			processed_chunks.append(accounts)
+			if len(processed_chunks) > 1:
+				raise frappe.ValidationError("Closing failed")
+			return get_pl_balances(self, accounts)
+
+		# commits of the job are savepoints of the test transaction
+		frappe.db.commit = lambda: frappe.db.sql("savepoint closing_entries")
+		frappe.db.rollback = lambda: frappe.db.sql("rollback to savepoint closing_entries")
+		PeriodClosingVoucher.get_pl_balances = get_pl_balances_of_first_chunk
+
+		accounts_per_chunk = period_closing_voucher.ACCOUNTS_PER_CHUNK
+		period_closing_voucher.ACCOUNTS_PER_CHUNK = 2
+		try:
+			period_closing_voucher.process_closing_entries(pcv.name, commit=True)
+		finally:
+			del frappe.db.commit
+			del frappe.db.rollback
+			PeriodClosingVoucher.get_pl_balances = get_pl_balances
+
+		try:
+			status, last_processed_account = frappe.db.get_value("Period Closing Voucher", pcv.name,
+				["gl_entry_processing_status", "last_processed_account"])
+			self.assertEqual(status, "Failed")
+			self.assertEqual(last_processed_account, processed_chunks[0][-1])
+
+			period_closing_voucher.retry_closing_entries(pcv.name)
+		finally:
+			period_closing_voucher.ACCOUNTS_PER_CHUNK = accounts_per_chunk
+
+		self.assertEqual(frappe.db.get_value("Period Closing Voucher", pcv.name, "gl_entry_processing_status"),
+			"Completed")
+		self.assertEqual(self.get_closing_entries(pcv.name), closing_entries)
+
+	def test_opening_balances_from_closing_balances(self):
+		from erpnext.accounts.report.trial_balance.trial_balance import get_opening_balances
+
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400,
+			"_Test Cost Center - _TC", posting_date=now(), submit=True)
+
+		pcv = self.make_period_closing_voucher()
+		self.assertTrue(frappe.db.exists("Account Closing Balance", {"period_closing_voucher": pcv.name}))
+
+		for with_period_closing_entry in (0, 1):
+			filters = frappe._dict({
+				"company": "_Test Company",
+				"from_date": add_days(pcv.posting_date, 1),
+				"year_start_date": get_fiscal_year(today(), company="_Test Company")[1],
+				"with_period_closing_entry": with_period_closing_entry
+			})
+			opening_balances = get_opening_balances(filters)
+
+			frappe.flags.ignore_closing_balances = True
+			try:
+				opening_balances_from_ledger = get_opening_balances(filters)
+			finally:
+				frappe.flags.ignore_closing_balances = False
+
+			self.assertEqual(self.get_opening_balances(opening_balances),
+				self.get_opening_balances(opening_balances_from_ledger))
+
+	def test_closing_balances_invalidated_by_backdated_entry(self):
+		from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import rebuild_closing_balances
+
+		pcv = self.make_period_closing_voucher()
+		self.assertTrue(frappe.db.exists("Account Closing Balance", {"period_closing_voucher": pcv.name}))
+
+		make_journal_entry("_Test Bank - _TC", "_Test Cash - _TC", 100,
+			"_Test Cost Center - _TC", posting_date=pcv.posting_date, submit=True)
+		self.assertFalse(frappe.db.exists("Account Closing Balance", {"period_closing_voucher": pcv.name}))
+
+		rebuild_closing_balances()
+		closing_balance = frappe.db.sql("""select sum(debit - credit) from `tabAccount Closing Balance`
+			where period_closing_voucher=%s and account='_Test Bank - _TC'""", pcv.name)[0][0]
+		gl_balance = frappe.db.sql("""select sum(debit - credit) from `tabGL Entry`
+			where account='_Test Bank - _TC' and posting_date <= %s""", pcv.posting_date)[0][0]
+		self.assertEqual(flt(closing_balance, 2), flt(gl_balance, 2))
+
+	def get_closing_entries(self, voucher):
+		"""net closing entry of each account other than the closing account"""
+		return {(account, cost_center): (flt(amount, 2), entries) for account, cost_center, amount, entries
+			in frappe.db.sql("""select account, cost_center, sum(debit - credit), count(*)
+				from `tabGL Entry` where voucher_no=%s and account != '_Test Account Reserves and Surplus - _TC'
+				group by account, cost_center""", voucher)}
+
+	def get_opening_balances(self, opening_balances):
+		return {account: (flt(d.opening_debit, 2), flt(d.opening_credit, 2))
+			for account, d in opening_balances.items()
+			if flt(d.opening_debit, 2) or flt(d.opening_credit, 2)}
+
+	def get_non_zero_balances(self, balances):
+		return {account: flt(balance, 2) for account, balance in balances if flt(balance, 2)}
+
 	def make_period_closing_voucher(self):
 		pcv = frappe.get_doc({
 			"doctype": "Period Closing Voucher",
@@ -11,6 +11,7 @@ from frappe import throw, _
 from frappe.utils import flt, cint, getdate
 
 from frappe.model.document import Document
+from erpnext.utilities.site_index import clear_site_index_version, update_modified_after_rename
 
 from six import string_types
 
@@ -32,6 +33,16 @@ class PricingRule(Document):
 
 		if not self.margin_type: self.margin_rate_or_amount = 0.0
 
+	def on_update(self):
+		clear_site_index_version("pricing_rule_index")
+
+	def on_trash(self):
+		clear_site_index_version("pricing_rule_index")
+
+	def after_rename(self, old, new, merge):
+		update_modified_after_rename(self.doctype, new)
+		clear_site_index_version("pricing_rule_index")
+
 	def validate_duplicate_apply_on(self):
 		field = apply_on_dict.get(self.apply_on)
 		values = [d.get(frappe.scrub(self.apply_on)) for d in self.get(field) if field]
@@ -161,6 +172,15 @@ def apply_pricing_rule(args, doc=None):
 	set_serial_nos_based_on_fifo = frappe.db.get_single_value("Stock Settings",
 		"automatically_set_serial_nos_based_on_fifo")
 
+	# the document is loaded once for all the items, matching rules, rule items and mixed
+	# and cumulative quantities are memoised for the pass over the items
+	if isinstance(doc, string_types):
+		doc = json.loads(doc)
+
+	if doc:
+		doc = frappe.get_doc(doc)
+		doc.flags.pricing_rule_cache = frappe._dict(static_items=True)
+
 	for item in item_list:
 		args_copy = copy.deepcopy(args)
 		args_copy.update(item)
@@ -169,6 +189,9 @@ def apply_pricing_rule(args, doc=None):
 		if not item.get("serial_no") and set_serial_nos_based_on_fifo and not args.get('is_return'):
 			out[0].update(get_serial_no_for_item(args_copy))
 
+	if doc:
+		doc.flags.pricing_rule_cache = None
+
 	return out
 
 def get_serial_no_for_item(args):
@@ -185,7 +208,8 @@ def get_serial_no_for_item(args):
 
 def get_pricing_rule_for_item(args, price_list_rate=0, doc=None, for_validate=False):
 	from erpnext.accounts.doctype.pricing_rule.utils import (get_pricing_rules,
-		get_applied_pricing_rules, get_pricing_rule_items, get_product_discount_rule)
+		get_applied_pricing_rules, get_pricing_rule_items, get_product_discount_rule,
+		get_pricing_rule_cache_value)
 
 	if isinstance(doc, string_types):
 		doc = json.loads(doc)
@@ -225,7 +249,8 @@ def get_pricing_rule_for_item(args, price_list_rate=0, doc=None, for_validate=Fa
 
 			if isinstance(pricing_rule, string_types):
 				pricing_rule = frappe.get_cached_doc("Pricing Rule", pricing_rule)
-				pricing_rule.apply_rule_on_other_items = get_pricing_rule_items(pricing_rule)
+				pricing_rule.apply_rule_on_other_items = get_pricing_rule_cache_value(doc,
+					("items", pricing_rule.name), lambda: get_pricing_rule_items(pricing_rule))
 
 			if pricing_rule.get('suggestion'): continue
 
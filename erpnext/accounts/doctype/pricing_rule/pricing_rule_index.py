@@ -0,0 +1,137 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe import _
+from frappe.utils import cstr, getdate
+from erpnext.utilities.site_index import get_site_index
+
+apply_on_fields = ("item_code", "item_group", "brand")
+
+# fields matched with the value of the transaction, or blank in the rule
+party_fields = ("company", "customer", "supplier", "campaign", "sales_partner")
+
+# fields matched with the value of the transaction or its ancestors, or blank in the rule
+tree_fields = {
+	"customer_group": "Customer Group",
+	"territory": "Territory",
+	"supplier_group": "Supplier Group",
+	"warehouse": "Warehouse"
+}
+
+rule_fields = ("name", "disable", "selling", "buying", "valid_from", "valid_upto", "for_price_list",
+	"apply_rule_on_other", "other_item_code", "other_item_group", "other_brand") + party_fields + tuple(tree_fields)
+
+def get_pricing_rule_index():
+	"""Returns the enabled pricing rules of the site, with their Item Code, Item Group and Brand rows
+	keyed by value. Built once per process and rebuilt after a Pricing Rule is changed"""
+	return get_site_index("pricing_rule_index", "Pricing Rule", build_pricing_rule_index)
+
+def build_pricing_rule_index():
+	rules = {d.name: d for d in frappe.db.sql("""select {0} from `tabPricing Rule` where disable = 0"""
+		.format(", ".join("`{0}`".format(f) for f in rule_fields)), as_dict=1)}
+
+	index = frappe._dict(rules=rules, rows={}, rows_by_rule={}, rules_on_other={})
+	for apply_on_field in apply_on_fields:
+		rows, rows_by_rule, rules_on_other = {}, {}, {}
+		for d in frappe.db.sql("""select name, parent, `{0}` as value, uom from `tabPricing Rule {1}`
+			where parenttype = 'Pricing Rule'""".format(apply_on_field, frappe.unscrub(apply_on_field)), as_dict=1):
+			if d.parent in rules:
+				rows.setdefault(d.value, []).append(d)
+				rows_by_rule.setdefault(d.parent, []).append(d)
+
+		for rule in rules.values():
+			if rule.apply_rule_on_other is not None and rule.get("other_" + apply_on_field):
+				rules_on_other.setdefault(rule.get("other_" + apply_on_field), []).append(rule.name)
+
+		index.rows[apply_on_field] = rows
+		index.rows_by_rule[apply_on_field] = rows_by_rule
+		index.rules_on_other[apply_on_field] = rules_on_other
+
+	return index
+
+def get_matching_pricing_rules(apply_on_field, args):
+	"""Returns the pricing rules applicable on the Item Code, Item Group or Brand (`apply_on_field`)
+	of `args`, one row per matching Item Code, Item Group or Brand row of the rule, with the
+	value and uom of the row. Ordered by priority and name, descending.
+
+	Candidate rows are looked up in the index by value, the candidate rules are then checked
+	against the party, tree, price list and date conditions"""
+	index = get_pricing_rule_index()
+	value = args.get(apply_on_field)
+
+	if apply_on_field == "item_group":
+		values = get_ancestors("Item Group", value)
+	else:
+		values = [value]
+		if apply_on_field == "item_code" and args.variant_of:
+			values.append(args.variant_of)
+
+	candidate_rows = []
+	for d in values:
+		candidate_rows.extend(index.rows[apply_on_field].get(d, []))
+
+	for rule_name in index.rules_on_other[apply_on_field].get(value, []):
+		candidate_rows.extend(index.rows_by_rule[apply_on_field].get(rule_name, []))
+
+	rule_names = set(d.parent for d in candidate_rows if is_applicable(index.rules[d.parent], args))
+	if not rule_names:
+		return []
+
+	# rules are read again so that the values are current
+	rules = {d.name: d for d in frappe.db.sql("""select * from `tabPricing Rule` where name in %s""",
+		(list(rule_names),), as_dict=1) if is_applicable(d, args)}
+
+	pricing_rules, added_rows = [], set()
+	for d in candidate_rows:
+		if d.parent in rules and d.name not in added_rows:
+			added_rows.add(d.name)
+			pricing_rule = rules[d.parent].copy()
+			pricing_rule.update({apply_on_field: d.value, "uom": d.uom})
+			pricing_rules.append(pricing_rule)
+
+	# order by priority desc, name desc
+	pricing_rules.sort(key=lambda d: (d.priority is not None, cstr(d.priority), d.name), reverse=True)
+	return pricing_rules
+
+def is_applicable(rule, args):
+	if rule.disable or not rule.get(args.transaction_type):
+		return False
+
+	for field in party_fields:
+		if cstr(rule.get(field)) not in ((args.get(field), "") if args.get(field) else ("",)):
+			return False
+
+	for field, parenttype in tree_fields.items():
+		if args.get(field) and cstr(rule.get(field)) \
+			and rule.get(field) not in get_ancestors(parenttype, args.get(field)):
+			return False
+
+	if cstr(rule.for_price_list) not in (args.get("price_list"), ""):
+		return False
+
+	if args.get("transaction_date"):
+		transaction_date = getdate(args.get("transaction_date"))
+		if transaction_date < getdate(rule.valid_from or "2000-01-01") \
+			or transaction_date > getdate(rule.valid_upto or "2500-12-31"):
+			return False
+
+	return True
+
+def get_ancestors(parenttype, name):
+	"""Returns the set of ancestors of `name` (including itself), memoised for the request"""
+	if not frappe.flags.tree_ancestors:
+		frappe.flags.tree_ancestors = {}
+
+	key = (parenttype, name)
+	if key not in frappe.flags.tree_ancestors:
+		try:
+			lft, rgt = frappe.db.get_value(parenttype, name, ["lft", "rgt"])
+		except TypeError:
+			frappe.throw(_("Invalid {0}").format(name))
+
+		frappe.flags.tree_ancestors[key] = set(frappe.db.sql_list("""select name from `tab{0}`
+			where lft<=%s and rgt>=%s""".format(parenttype), (lft, rgt)))
+
+	return frappe.flags.tree_ancestors[key]
@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 import unittest
 import frappe
+from frappe.utils import nowdate
 from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
 from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
 from erpnext.stock.get_item_details import get_item_details
@@ -193,6 +194,57 @@ class TestPricingRule(unittest.TestCase):
 		details = get_item_details(args)
 		self.assertEquals(details.get("discount_percentage"), 10)
 
+	def test_mixed_conditions_for_document(self):
+		from erpnext.accounts.doctype.pricing_rule.pricing_rule import apply_pricing_rule
+
+		for item in ["Mixed Cond Item 1", "Mixed Cond Item 2"]:
+			make_item(item, {"item_group": "Products"})
+
+		frappe.get_doc({
+			"doctype": "Pricing Rule",
+			"title": "_Test Pricing Rule for Item Group",
+			"apply_on": "Item Group",
+			"item_groups": [{"item_group": "Products"}],
+			"selling": 1,
+			"mixed_conditions": 1,
+			"min_qty": 5,
+			"rate_or_discount": "Discount Percentage",
+			"discount_percentage": 10,
+			"company": "_Test Company"
+		}).insert()
+
+		def get_discounts(qty):
+			so = make_sales_order(item_list=[{"item_code": item_code, "item_group": item_group, "qty": qty,
+				"stock_qty": qty, "price_list_rate": 100, "rate": 100, "warehouse": "_Test Warehouse - _TC"}
+				for item_code, item_group in [("Mixed Cond Item 1", "Products"), ("Mixed Cond Item 2", "Products"),
+					("_Test Item", "_Test Item Group")]], do_not_save=True)
+
+			out = apply_pricing_rule({
+				"items": [{
+					"doctype": "Sales Order Item",
+					"name": "row{0}".format(i),
+					"item_code": d.item_code,
+					"item_group": d.item_group,
+					"qty": d.qty,
+					"stock_qty": d.stock_qty,
+					"price_list_rate": d.price_list_rate,
+					"parenttype": "Sales Order"
+				} for i, d in enumerate(so.items)],
+				"doctype": "Sales Order",
+				"customer": "_Test Customer",
+				"company": "_Test Company",
+				"transaction_date": nowdate(),
+				"price_list": "_Test Price List"
+			}, doc=so.as_dict())
+
+			return [d.get("discount_percentage") for d in out]
+
+		# mixed qty of the items of the group is 6
+		self.assertEqual(get_discounts(3), [10, 10, None])
+
+		# mixed qty of the items of the group is 4
+		self.assertEqual(get_discounts(2), [None, None, None])
+
 	def test_pricing_rule_for_variants(self):
 		from erpnext.stock.get_item_details import get_item_details
 		from frappe import MandatoryError
@@ -386,6 +438,58 @@ class TestPricingRule(unittest.TestCase):
 		self.assertEqual(so.items[1].is_free_item, 1)
 		self.assertEqual(so.items[1].item_code, "_Test Item 2")
 
+	def test_pricing_rule_index(self):
+		from erpnext.accounts.doctype.pricing_rule.pricing_rule_index import get_matching_pricing_rules
+
+		prule = frappe.get_doc({
+			"doctype": "Pricing Rule",
+			"title": "_Test Pricing Rule",
+			"apply_on": "Item Group",
+			"item_groups": [{
+				"item_group": "All Item Groups"
+			}],
+			"selling": 1,
+			"applicable_for": "Customer Group",
+			"customer_group": "All Customer Groups",
+			"rate_or_discount": "Discount Percentage",
+			"discount_percentage": 10,
+			"company": "_Test Company"
+		}).insert()
+
+		args = frappe._dict({
+			"item_group": "_Test Item Group",
+			"customer_group": "_Test Customer Group",
+			"company": "_Test Company",
+			"transaction_type": "selling",
+			"transaction_date": "2020-01-01"
+		})
+
+		pricing_rules = get_matching_pricing_rules("item_group", args)
+		self.assertEqual([(d.name, d.item_group) for d in pricing_rules], [(prule.name, "All Item Groups")])
+
+		args.transaction_type = "buying"
+		self.assertFalse(get_matching_pricing_rules("item_group", args))
+
+		# index is rebuilt after the rule is changed
+		args.transaction_type = "selling"
+		prule.valid_from = "2020-02-01"
+		prule.save()
+		self.assertFalse(get_matching_pricing_rules("item_group", args))
+
+		args.transaction_date = "2020-02-01"
+		self.assertEqual(len(get_matching_pricing_rules("item_group", args)), 1)
+
+		prule.disable = 1
+		prule.save()
+		self.assertFalse(get_matching_pricing_rules("item_group", args))
+
+		prule.disable = 0
+		prule.save()
+		self.assertEqual(len(get_matching_pricing_rules("item_group", args)), 1)
+
+		frappe.delete_doc("Pricing Rule", prule.name)
+		self.assertFalse(get_matching_pricing_rules("item_group", args))
+
 def make_pricing_rule(**args):
 	args = frappe._dict(args)
 
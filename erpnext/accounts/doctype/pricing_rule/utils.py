@@ -11,6 +11,8 @@ from frappe.utils import flt, cint, get_datetime, get_link_to_form, today
 from erpnext.setup.doctype.item_group.item_group import get_child_item_groups
 from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
 from erpnext.stock.get_item_details import get_conversion_factor
+from erpnext.accounts.doctype.pricing_rule.pricing_rule_index import (get_matching_pricing_rules,
+	party_fields, tree_fields)
 
 class MultiplePricingRuleConflict(frappe.ValidationError): pass
 
@@ -25,7 +27,7 @@ def get_pricing_rules(args, doc=None):
 	values =  {}
 
 	for apply_on in ['Item Code', 'Item Group', 'Brand']:
-		pricing_rules.extend(_get_pricing_rules(apply_on, args, values))
+		pricing_rules.extend(_get_pricing_rules(apply_on, args, values, doc))
 		if pricing_rules and not apply_multiple_pricing_rules(pricing_rules):
 			break
 
@@ -45,59 +47,40 @@ def get_pricing_rules(args, doc=None):
 
 	return rules
 
-def _get_pricing_rules(apply_on, args, values):
+def _get_pricing_rules(apply_on, args, values, doc=None):
 	apply_on_field = frappe.scrub(apply_on)
 
 	if not args.get(apply_on_field): return []
 
-	child_doc = '`tabPricing Rule {0}`'.format(apply_on)
+	if apply_on_field == 'item_code' and "variant_of" not in args:
+		args.variant_of = frappe.get_cached_value("Item", args.item_code, "variant_of")
 
-	conditions = item_variant_condition = item_conditions = ""
-	values[apply_on_field] = args.get(apply_on_field)
-	if apply_on_field in ['item_code', 'brand']:
-		item_conditions = "{child_doc}.{apply_on_field}= %({apply_on_field})s".format(child_doc=child_doc,
-			apply_on_field = apply_on_field)
+	if not args.price_list: args.price_list = None
 
-		if apply_on_field == 'item_code':
-			if "variant_of" not in args:
-				args.variant_of = frappe.get_cached_value("Item", args.item_code, "variant_of")
+	# rows of a document with the same item, party, warehouse and price list match the same rules
+	key = ("pricing_rules", apply_on_field, args.get(apply_on_field), args.variant_of, args.price_list,
+		args.transaction_type, args.transaction_date) + tuple(args.get(f) for f in party_fields + tuple(tree_fields))
 
-			if args.variant_of:
-				item_variant_condition = ' or {child_doc}.item_code=%(variant_of)s '.format(child_doc=child_doc)
-				values['variant_of'] = args.variant_of
-	elif apply_on_field == 'item_group':
-		item_conditions = _get_tree_conditions(args, "Item Group", child_doc, False)
+	pricing_rules = get_pricing_rule_cache_value(doc, key,
+		lambda: get_matching_pricing_rules(apply_on_field, args))
 
-	conditions += get_other_conditions(conditions, values, args)
-	warehouse_conditions = _get_tree_conditions(args, "Warehouse", '`tabPricing Rule`')
-	if warehouse_conditions:
-		warehouse_conditions = " and {0}".format(warehouse_conditions)
+	return [d.copy() for d in pricing_rules]
 
-	if not args.price_list: args.price_list = None
+def get_pricing_rule_cache_value(doc, key, generator, depends_on_items=False):
+	"""Returns `generator()`, memoised as `key` during a pass over the items of `doc`.
+
+	The cache is set in the flags of the document by `apply_pricing_rule` and
+	`set_missing_item_details`. Values that depend on the other items of the document
+	(`depends_on_items`) are memoised only if the items do not change during the pass"""
+	flags = getattr(doc, "flags", None)
+	cache = flags.pricing_rule_cache if flags is not None else None
+	if cache is None or (depends_on_items and not cache.static_items):
+		return generator()
 
-	conditions += " and ifnull(`tabPricing Rule`.for_price_list, '') in (%(price_list)s, '')"
-	values["price_list"] = args.get("price_list")
-
-	pricing_rules = frappe.db.sql("""select `tabPricing Rule`.*,
-			{child_doc}.{apply_on_field}, {child_doc}.uom
-		from `tabPricing Rule`, {child_doc}
-		where ({item_conditions} or (`tabPricing Rule`.apply_rule_on_other is not null
-			and `tabPricing Rule`.{apply_on_other_field}=%({apply_on_field})s) {item_variant_condition})
-			and {child_doc}.parent = `tabPricing Rule`.name
-			and `tabPricing Rule`.disable = 0 and
-			`tabPricing Rule`.{transaction_type} = 1 {warehouse_cond} {conditions}
-		order by `tabPricing Rule`.priority desc,
-			`tabPricing Rule`.name desc""".format(
-			child_doc = child_doc,
-			apply_on_field = apply_on_field,
-			item_conditions = item_conditions,
-			item_variant_condition = item_variant_condition,
-			transaction_type = args.transaction_type,
-			warehouse_cond = warehouse_conditions,
-			apply_on_other_field = "other_{0}".format(apply_on_field),
-			conditions = conditions), values, as_dict=1) or []
-
-	return pricing_rules
+	if key not in cache:
+		cache[key] = generator()
+
+	return cache[key]
 
 def apply_multiple_pricing_rules(pricing_rules):
 	apply_multiple_rule = [d.apply_multiple_pricing_rules
@@ -182,7 +165,9 @@ def filter_pricing_rules(args, pricing_rules, doc=None):
 
 		elif pricing_rules[0].is_cumulative:
 			items = [args.get(frappe.scrub(pr_doc.get('apply_on')))]
-			data = get_qty_amount_data_for_cumulative(pr_doc, args, items)
+			data = get_pricing_rule_cache_value(doc, ("cumulative", pr_doc.name, args.get('parenttype'),
+				args.get('transaction_date'), args.get('posting_date')) + tuple(items),
+				lambda: get_qty_amount_data_for_cumulative(pr_doc, args, items))
 
 			if data:
 				stock_qty += data[0]
@@ -319,23 +304,24 @@ def apply_internal_priority(pricing_rules, field_set, args):
 
 def get_qty_and_rate_for_mixed_conditions(doc, pr_doc, args):
 	sum_qty, sum_amt = [0, 0]
-	items = get_pricing_rule_items(pr_doc) or []
+	items = get_pricing_rule_cache_value(doc, ("items", pr_doc.name),
+		lambda: get_pricing_rule_items(pr_doc)) or []
 	apply_on = frappe.scrub(pr_doc.get('apply_on'))
 
 	if items and doc.get("items"):
-		for row in doc.get('items'):
-			if row.get(apply_on) not in items: continue
-
-			if pr_doc.mixed_conditions:
-				amt = args.get('qty') * args.get("price_list_rate")
-				if args.get("item_code") != row.get("item_code"):
-					amt = row.get('qty') * row.get("price_list_rate")
+		if pr_doc.mixed_conditions:
+			totals = get_pricing_rule_cache_value(doc, ("mixed_conditions", pr_doc.name),
+				lambda: get_mixed_conditions_totals(doc, apply_on, items), depends_on_items=True)
 
-				sum_qty += row.get("stock_qty") or args.get("stock_qty")
-				sum_amt += amt
+			# rows of the item of args are taken with the qty and rate of args
+			item_code = args.get("item_code")
+			sum_qty = totals.stock_qty + totals.rows_without_stock_qty * flt(args.get("stock_qty"))
+			sum_amt = (totals.amount - totals.amount_by_item.get(item_code, 0)
+				+ totals.rows_by_item.get(item_code, 0) * flt(args.get('qty')) * flt(args.get("price_list_rate")))
 
 		if pr_doc.is_cumulative:
-			data = get_qty_amount_data_for_cumulative(pr_doc, doc, items)
+			data = get_pricing_rule_cache_value(doc, ("cumulative", pr_doc.name),
+				lambda: get_qty_amount_data_for_cumulative(pr_doc, doc, items))
 
 			if data and data[0]:
 				sum_qty += data[0]
@@ -343,8 +329,30 @@ def get_qty_and_rate_for_mixed_conditions(doc, pr_doc, args):
 
 	return sum_qty, sum_amt, items
 
+def get_mixed_conditions_totals(doc, apply_on, items):
+	"""Qty and amount of the rows of `doc` with the items of a mixed conditions pricing rule,
+	amounts and number of rows by item code"""
+	totals = frappe._dict(stock_qty=0, rows_without_stock_qty=0, amount=0,
+		amount_by_item={}, rows_by_item={})
+
+	for row in doc.get('items'):
+		if row.get(apply_on) not in items: continue
+
+		if row.get("stock_qty"):
+			totals.stock_qty += row.get("stock_qty")
+		else:
+			totals.rows_without_stock_qty += 1
+
+		amt = flt(row.get('qty')) * flt(row.get("price_list_rate"))
+		totals.amount += amt
+		totals.amount_by_item[row.get("item_code")] = totals.amount_by_item.get(row.get("item_code"), 0) + amt
+		totals.rows_by_item[row.get("item_code")] = totals.rows_by_item.get(row.get("item_code"), 0) + 1
+
+	return totals
+
 def get_qty_and_rate_for_other_item(doc, pr_doc, pricing_rules):
-	items = get_pricing_rule_items(pr_doc)
+	items = get_pricing_rule_cache_value(doc, ("items", pr_doc.name),
+		lambda: get_pricing_rule_items(pr_doc))
 
 	for row in doc.items:
 		if row.get(frappe.scrub(pr_doc.apply_rule_on_other)) in items:
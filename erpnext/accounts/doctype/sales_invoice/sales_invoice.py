@@ -737,7 +737,7 @@ class SalesInvoice(SellingController):
 					self.doctype, self.return_against if cint(self.is_return) and self.return_against else self.name)
 
 			if (repost_future_gle or self.flags.repost_future_gle) and cint(self.update_stock) \
-				and cint(auto_accounting_for_stock):
+				and cint(auto_accounting_for_stock) and not self.flags.future_repost_queued:
 					items, warehouses = self.get_items_and_warehouses()
 					update_gl_entries_after(self.posting_date, self.posting_time,
 						warehouses, items, company = self.company)
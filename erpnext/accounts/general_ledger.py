@@ -3,12 +3,18 @@
 
 from __future__ import unicode_literals
 import frappe, erpnext
-from frappe.utils import flt, cstr, cint, comma_and
+from frappe.utils import flt, cstr, cint, comma_and, now, get_datetime
 from frappe import _
 from erpnext.accounts.utils import get_stock_and_account_balance
+from erpnext.accounts.period_index import find_closed_accounting_period
 from frappe.model.meta import get_field_precision
-from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget
+from erpnext.accounts.doctype.budget.budget import validate_expenses_against_budget
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+from erpnext.accounts.doctype.gl_balance.gl_balance import update_gl_balances, reverse_gl_balances
+from erpnext.accounts.doctype.payment_ledger_entry.payment_ledger_entry import (make_payment_ledger_entries,
+	delete_payment_ledger_entries)
+from erpnext.utilities.bulk_insert import bulk_insert
+from datetime import timedelta
 
 
 class ClosedAccountingPeriod(frappe.ValidationError): pass
@@ -28,25 +34,12 @@ def make_gl_entries(gl_map, cancel=False, adv_adj=False, merge_entries=True, upd
 			delete_gl_entries(gl_map, adv_adj=adv_adj, update_outstanding=update_outstanding)
 
 def validate_accounting_period(gl_map):
-	accounting_periods = frappe.db.sql(""" SELECT
-			ap.name as name
-		FROM
-			`tabAccounting Period` ap, `tabClosed Document` cd
-		WHERE
-			ap.name = cd.parent
-			AND ap.company = %(company)s
-			AND cd.closed = 1
-			AND cd.document_type = %(voucher_type)s
-			AND %(date)s between ap.start_date and ap.end_date
-			""", {
-				'date': gl_map[0].posting_date,
-				'company': gl_map[0].company,
-				'voucher_type': gl_map[0].voucher_type
-			}, as_dict=1)
-
-	if accounting_periods:
+	accounting_period = find_closed_accounting_period(gl_map[0].company, gl_map[0].voucher_type,
+		gl_map[0].posting_date)
+
+	if accounting_period:
 		frappe.throw(_("You can't create accounting entries in the closed accounting period {0}")
-			.format(accounting_periods[0].name), ClosedAccountingPeriod)
+			.format(accounting_period), ClosedAccountingPeriod)
 
 def process_gl_map(gl_map, merge_entries=True):
 	if merge_entries:
@@ -75,11 +68,13 @@ def process_gl_map(gl_map, merge_entries=True):
 
 def merge_similar_entries(gl_map):
 	merged_gl_map = []
+	merged_entries = {}
 	accounting_dimensions = get_accounting_dimensions()
 	for entry in gl_map:
 		# if there is already an entry in this account then just add it
 		# to that entry
-		same_head = check_if_in_list(entry, merged_gl_map, accounting_dimensions)
+		key = get_merge_key(entry, accounting_dimensions)
+		same_head = merged_entries.get(key)
 		if same_head:
 			same_head.debit	= flt(same_head.debit) + flt(entry.debit)
 			same_head.debit_in_account_currency	= \
@@ -89,6 +84,7 @@ def merge_similar_entries(gl_map):
 				flt(same_head.credit_in_account_currency) + flt(entry.credit_in_account_currency)
 		else:
 			merged_gl_map.append(entry)
+			merged_entries[key] = entry
 
 	company = gl_map[0].company if gl_map else erpnext.get_default_company()
 	company_currency = erpnext.get_company_currency(company)
@@ -100,23 +96,21 @@ def merge_similar_entries(gl_map):
 
 	return merged_gl_map
 
-def check_if_in_list(gle, gl_map, dimensions=None):
+def get_merge_key(gle, dimensions=None):
+	"""Entries with the same account, party, against voucher, cost center, project and
+	accounting dimensions are merged"""
 	account_head_fieldnames = ['party_type', 'party', 'against_voucher', 'against_voucher_type',
 		'cost_center', 'project']
 
 	if dimensions:
 		account_head_fieldnames = account_head_fieldnames + dimensions
 
-	for e in gl_map:
-		same_head = True
-		if e.account != gle.account:
-			same_head = False
-
-		for fieldname in account_head_fieldnames:
-			if cstr(e.get(fieldname)) != cstr(gle.get(fieldname)):
-				same_head = False
+	return (gle.account,) + tuple(cstr(gle.get(fieldname)) for fieldname in account_head_fieldnames)
 
-		if same_head:
+def check_if_in_list(gle, gl_map, dimensions=None):
+	key = get_merge_key(gle, dimensions)
+	for e in gl_map:
+		if get_merge_key(e, dimensions) == key:
 			return e
 
 def save_entries(gl_map, adv_adj, update_outstanding, from_repost=False):
@@ -124,12 +118,19 @@ def save_entries(gl_map, adv_adj, update_outstanding, from_repost=False):
 		validate_cwip_accounts(gl_map)
 
 	round_off_debit_credit(gl_map)
-	for entry in gl_map:
-		make_entry(entry, adv_adj, update_outstanding, from_repost)
+	if can_make_entries_in_bulk(gl_map):
+		gl_entries = make_entries_in_bulk(gl_map, adv_adj, update_outstanding, from_repost)
+	else:
+		gl_entries = []
+		for entry in gl_map:
+			gl_entries.append(make_entry(entry, adv_adj, update_outstanding, from_repost))
 
 		# check against budget
 		if not from_repost:
-			validate_expense_against_budget(entry)
+			validate_expenses_against_budget(gl_map)
+
+	update_gl_balances(gl_entries)
+	make_payment_ledger_entries(gl_entries)
 
 	if not from_repost:
 		validate_account_for_perpetual_inventory(gl_map)
@@ -146,6 +147,63 @@ def make_entry(args, adv_adj, update_outstanding, from_repost=False):
 	gle.flags.ignore_validate = True
 	gle.submit()
 
+	return gle
+
+def can_make_entries_in_bulk(gl_map):
+	"""GL Entry doc_events hooks need the per-row path"""
+	if frappe.flags.disable_bulk_gl_entries:
+		return False
+
+	doc_events = frappe.get_hooks("doc_events")
+	return not (doc_events.get("GL Entry") or doc_events.get("*"))
+
+def make_entries_in_bulk(gl_map, adv_adj, update_outstanding, from_repost=False):
+	"""Insert the GL entries of a voucher with multi-row inserts and update the outstanding
+	amount of each against voucher once, returns the inserted entries.
+
+	Produces the same ledger as `make_entry` for each entry, the validations of the
+	GL Entry controller are run for all the entries at once."""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import validate_gl_entries, \
+		validate_balance_type, update_outstanding_amt
+
+	validate_gl_entries(gl_map, adv_adj, from_repost)
+
+	creation = get_datetime(now())
+	gl_entries, rows = [], []
+	for i, entry in enumerate(gl_map):
+		gle = frappe.new_doc("GL Entry")
+		gle.update(entry)
+		gle.docstatus = 1
+		# entries of a voucher are ordered by creation, as if inserted one by one
+		gle.creation = gle.modified = creation + timedelta(microseconds=i)
+		gl_entries.append(gle)
+		rows.append(gle.get_valid_dict(convert_dates_to_str=True))
+
+	bulk_insert("GL Entry", rows, docstatus=1)
+	for gle, row in zip(gl_entries, rows):
+		gle.name = row["name"]
+
+	for account in set(gle.account for gle in gl_entries):
+		validate_balance_type(account, adv_adj)
+
+	if update_outstanding == 'Yes' and not from_repost:
+		against_vouchers = []
+		for gle in gl_entries:
+			if gle.against_voucher_type in ['Journal Entry', 'Sales Invoice', 'Purchase Invoice', 'Fees'] \
+				and gle.against_voucher:
+				key = (gle.account, gle.party_type, gle.party, gle.against_voucher_type, gle.against_voucher)
+				if key not in against_vouchers:
+					against_vouchers.append(key)
+
+		for args in against_vouchers:
+			update_outstanding_amt(*args)
+
+	# check against budget
+	if not from_repost:
+		validate_expenses_against_budget(gl_map)
+
+	return gl_entries
+
 def validate_account_for_perpetual_inventory(gl_map):
 	if cint(erpnext.is_perpetual_inventory_enabled(gl_map[0].company)):
 		account_list = [gl_entries.account for gl_entries in gl_map]
@@ -298,15 +356,22 @@ def delete_gl_entries(gl_entries=None, voucher_type=None, voucher_no=None,
 	if gl_entries:
 		check_freezing_date(gl_entries[0]["posting_date"], adv_adj)
 
+	voucher_type = voucher_type or gl_entries[0]["voucher_type"]
+	voucher_no = voucher_no or gl_entries[0]["voucher_no"]
+
+	reverse_gl_balances(voucher_type, voucher_no)
+	delete_payment_ledger_entries(voucher_type, voucher_no)
 	frappe.db.sql("""delete from `tabGL Entry` where voucher_type=%s and voucher_no=%s""",
-		(voucher_type or gl_entries[0]["voucher_type"], voucher_no or gl_entries[0]["voucher_no"]))
+		(voucher_type, voucher_no))
 
 	for entry in gl_entries:
 		validate_frozen_account(entry["account"], adv_adj)
 		validate_balance_type(entry["account"], adv_adj)
-		if not adv_adj:
-			validate_expense_against_budget(entry)
 
 		if entry.get("against_voucher") and update_outstanding == 'Yes' and not adv_adj:
 			update_outstanding_amt(entry["account"], entry.get("party_type"), entry.get("party"), entry.get("against_voucher_type"),
 				entry.get("against_voucher"), on_cancel=True)
+
+	# check against budget
+	if not adv_adj:
+		validate_expenses_against_budget(gl_entries)
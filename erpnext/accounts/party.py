@@ -605,7 +605,7 @@ def get_partywise_advanced_payment_amount(party_type, posting_date = None):
 		cond = "posting_date <= '{0}'".format(posting_date)
 
 	data = frappe.db.sql(""" SELECT party, sum({0}) as amount
-		FROM `tabGL Entry`
+		FROM `tabPayment Ledger Entry`
 		WHERE
 			party_type = %s and against_voucher is null
 			and {1} GROUP BY party"""
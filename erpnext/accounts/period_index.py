@@ -0,0 +1,112 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import frappe
+from bisect import bisect_right
+from frappe.utils import getdate
+from erpnext.utilities.site_index import get_site_index, clear_site_index_version
+
+def clear_fiscal_year_index(doc=None, method=None):
+	clear_site_index_version("fiscal_year_index")
+
+def clear_closed_period_index(doc=None, method=None):
+	clear_site_index_version("closed_period_index")
+
+def get_fiscal_year_index(company=None):
+	"""Returns the active fiscal years of `company` (all fiscal years if not set) sorted by
+	start date, with their start dates and positions by name"""
+	index = get_site_index("fiscal_year_index", "Fiscal Year")
+	if company not in index:
+		cond = ""
+		if company:
+			cond = """
+				and (not exists (select name
+					from `tabFiscal Year Company` fyc
+					where fyc.parent = fy.name)
+				or exists(select company
+					from `tabFiscal Year Company` fyc
+					where fyc.parent = fy.name
+					and fyc.company=%(company)s)
+				)
+			"""
+
+		fiscal_years = frappe.db.sql("""
+			select
+				fy.name, fy.year_start_date, fy.year_end_date
+			from
+				`tabFiscal Year` fy
+			where
+				disabled = 0 {0}
+			order by
+				fy.year_start_date, fy.name""".format(cond), {
+				"company": company
+			}, as_dict=True)
+
+		index[company] = frappe._dict(
+			fiscal_years=fiscal_years,
+			start_dates=[getdate(fy.year_start_date) for fy in fiscal_years],
+			end_dates=[getdate(fy.year_end_date) for fy in fiscal_years],
+			positions={fy.name: i for i, fy in enumerate(fiscal_years)}
+		)
+
+	return index[company]
+
+def find_fiscal_year(transaction_date=None, fiscal_year=None, company=None):
+	"""Returns the fiscal year named `fiscal_year` or the one containing `transaction_date`,
+	whichever starts last, or None"""
+	index = get_fiscal_year_index(company)
+
+	matches = []
+	if fiscal_year and fiscal_year in index.positions:
+		matches.append(index.positions[fiscal_year])
+
+	if transaction_date:
+		transaction_date = getdate(transaction_date)
+
+		# fiscal years of different companies may overlap, look back from the last one
+		# starting on or before the date
+		i = bisect_right(index.start_dates, transaction_date) - 1
+		while i >= 0:
+			if index.end_dates[i] >= transaction_date:
+				matches.append(i)
+				break
+			i -= 1
+
+	if matches:
+		return index.fiscal_years[max(matches)].copy()
+
+def get_closed_period_index(company, voucher_type):
+	"""Returns the accounting periods of `company` in which `voucher_type` is closed, sorted by
+	start date, with their start dates"""
+	index = get_site_index("closed_period_index", "Accounting Period")
+	if company not in index:
+		periods_by_voucher_type = {}
+		for d in frappe.db.sql("""select ap.name, ap.start_date, ap.end_date, cd.document_type
+			from `tabAccounting Period` ap, `tabClosed Document` cd
+			where ap.name = cd.parent and ap.company = %s and cd.closed = 1
+			order by ap.start_date, ap.name""", company, as_dict=1):
+			periods_by_voucher_type.setdefault(d.document_type, []).append(d)
+
+		index[company] = {}
+		for document_type, periods in periods_by_voucher_type.items():
+			index[company][document_type] = frappe._dict(
+				periods=periods,
+				start_dates=[getdate(d.start_date) for d in periods]
+			)
+
+	return index[company].get(voucher_type)
+
+def find_closed_accounting_period(company, voucher_type, date):
+	"""Returns the name of the accounting period of `company` containing `date` in which
+	`voucher_type` is closed, or None"""
+	index = get_closed_period_index(company, voucher_type)
+	if not index:
+		return
+
+	date = getdate(date)
+
+	# accounting periods of a company do not overlap
+	i = bisect_right(index.start_dates, date) - 1
+	if i >= 0 and getdate(index.periods[i].end_date) >= date:
+		return index.periods[i].name
@@ -555,23 +555,43 @@ class ReceivablePayableReport(object):
 		order_by = self.get_order_by_condition()
 
 		if self.filters.get(scrub(self.party_type)):
-			select_fields = "debit_in_account_currency as debit, credit_in_account_currency as credit"
+			debit_field, credit_field = "debit_in_account_currency", "credit_in_account_currency"
 		else:
-			select_fields = "debit, credit"
-
-		self.gl_entries = frappe.db.sql("""
-			select
-				name, posting_date, account, party_type, party, voucher_type, voucher_no,
-				against_voucher_type, against_voucher, account_currency, remarks, {0}
-			from
-				`tabGL Entry`
-			where
-				docstatus < 2
-				and party_type=%s
-				and (party is not null and party != '')
-				and posting_date <= %s
-				{1} {2}"""
-			.format(select_fields, conditions, order_by), values, as_dict=True)
+			debit_field, credit_field = "debit", "credit"
+
+		if self.use_payment_ledger:
+			# debits and credits of a voucher against a voucher summed up separately
+			self.gl_entries = frappe.db.sql("""
+				select
+					posting_date, account, party_type, party, voucher_type, voucher_no,
+					against_voucher_type, against_voucher, account_currency, max(remarks) as remarks,
+					sum({debit}) as debit, sum({credit}) as credit
+				from
+					`tabPayment Ledger Entry`
+				where
+					party_type=%s
+					and (party is not null and party != '')
+					and posting_date <= %s
+					{conditions}
+				group by voucher_type, voucher_no, against_voucher_type, against_voucher, party_type, party,
+					account, account_currency, posting_date, {debit} > {credit}
+				{order_by}""".format(debit=debit_field, credit=credit_field, conditions=conditions,
+					order_by=order_by), values, as_dict=True)
+		else:
+			self.gl_entries = frappe.db.sql("""
+				select
+					name, posting_date, account, party_type, party, voucher_type, voucher_no,
+					against_voucher_type, against_voucher, account_currency, remarks,
+					{debit} as debit, {credit} as credit
+				from
+					`tabGL Entry`
+				where
+					docstatus < 2
+					and party_type=%s
+					and (party is not null and party != '')
+					and posting_date <= %s
+					{conditions} {order_by}""".format(debit=debit_field, credit=credit_field,
+					conditions=conditions, order_by=order_by), values, as_dict=True)
 
 	def get_sales_invoices_or_customers_based_on_sales_person(self):
 		if self.filters.get("sales_person"):
@@ -590,6 +610,7 @@ class ReceivablePayableReport(object):
 				self.sales_person_records.setdefault(d.parenttype, set()).add(d.parent)
 
 	def prepare_conditions(self):
+		self.use_payment_ledger = True
 		conditions = [""]
 		values = [self.party_type, self.filters.report_date]
 		party_type_field = scrub(self.party_type)
@@ -670,6 +691,8 @@ class ReceivablePayableReport(object):
 		if accounting_dimensions:
 			for dimension in accounting_dimensions:
 				if self.filters.get(dimension.fieldname):
+					# accounting dimensions are only in GL Entry
+					self.use_payment_ledger = False
 					if frappe.get_cached_value('DocType', dimension.document_type, 'is_tree'):
 						self.filters[dimension.fieldname] = get_dimension_with_children(dimension.document_type,
 							self.filters.get(dimension.fieldname))
@@ -93,6 +93,12 @@ frappe.query_reports["Consolidated Financial Statement"] = {
 			"label": __("Include Default Book Entries"),
 			"fieldtype": "Check",
 			"default": 1
+		},
+		{
+			"fieldname": "run_in_parallel",
+			"label": __("Aggregate Companies in Parallel"),
+			"fieldtype": "Check",
+			"default": 0
 		}
 	],
 	"formatter": function(value, row, column, data, default_formatter) {
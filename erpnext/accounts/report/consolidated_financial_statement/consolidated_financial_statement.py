@@ -2,6 +2,7 @@
 # For license information, please see license.txt
 
 from __future__ import unicode_literals
+import time
 import frappe, erpnext
 from frappe import _
 from frappe.utils import flt, cint, getdate
@@ -14,6 +15,18 @@ from erpnext.accounts.report.profit_and_loss_statement.profit_and_loss_statement
 from erpnext.accounts.report.cash_flow.cash_flow import (get_cash_flow_accounts, get_account_type_based_gl_data,
 	add_total_row_account, get_report_summary as get_cash_flow_summary)
 
+# background jobs aggregating the companies in parallel are stopped after this, the companies
+# whose job failed or was stopped are aggregated in the request
+PARALLEL_JOB_TIMEOUT = 300
+PARALLEL_JOB_RESULT_EXPIRY = 60
+
+# root types of the accounts aggregated by each report
+REPORT_ROOT_TYPES = {
+	"Balance Sheet": ("Asset", "Liability", "Equity"),
+	"Profit and Loss Statement": ("Income", "Expense"),
+	"Cash Flow": ("Income", "Expense")
+}
+
 def execute(filters=None):
 	columns, data, message, chart = [], [], [], []
 
@@ -24,16 +37,27 @@ def execute(filters=None):
 	companies_column, companies = get_companies(filters)
 	columns = get_columns(companies_column)
 
-	if filters.get('report') == "Balance Sheet":
-		data, message, chart, report_summary = get_balance_sheet_data(fiscal_year, companies, columns, filters)
-	elif filters.get('report') == "Profit and Loss Statement":
-		data, message, chart, report_summary = get_profit_loss_data(fiscal_year, companies, columns, filters)
-	else:
-		if cint(frappe.db.get_single_value('Accounts Settings', 'use_custom_cash_flow')):
-			from erpnext.accounts.report.cash_flow.custom_cash_flow import execute as execute_custom
-			return execute_custom(filters=filters)
-
-		data, report_summary = get_cash_flow_data(fiscal_year, companies, filters)
+	if filters.get('report') not in ("Balance Sheet", "Profit and Loss Statement") \
+		and cint(frappe.db.get_single_value('Accounts Settings', 'use_custom_cash_flow')):
+		from erpnext.accounts.report.cash_flow.custom_cash_flow import execute as execute_custom
+		return execute_custom(filters=filters)
+
+	subsidiaries = get_subsidiary_companies(filters.get('company'))
+	if cint(filters.get('run_in_parallel')) and len(subsidiaries) > 1:
+		start_date, end_date = get_period_dates(fiscal_year, filters)
+		frappe.flags.consolidated_balances = get_balances_in_parallel(subsidiaries,
+			REPORT_ROOT_TYPES.get(filters.get('report'), REPORT_ROOT_TYPES["Cash Flow"]),
+			start_date, end_date, filters)
+
+	try:
+		if filters.get('report') == "Balance Sheet":
+			data, message, chart, report_summary = get_balance_sheet_data(fiscal_year, companies, columns, filters)
+		elif filters.get('report') == "Profit and Loss Statement":
+			data, message, chart, report_summary = get_profit_loss_data(fiscal_year, companies, columns, filters)
+		else:
+			data, report_summary = get_cash_flow_data(fiscal_year, companies, filters)
+	finally:
+		frappe.flags.consolidated_balances = None
 
 	return columns, data, message, chart, report_summary
 
@@ -200,6 +224,12 @@ def get_columns(companies):
 
 	return columns
 
+def get_period_dates(fiscal_year, filters):
+	if filters.filter_based_on == 'Fiscal Year':
+		return fiscal_year.year_start_date, fiscal_year.year_end_date
+
+	return filters.period_start_date, filters.period_end_date
+
 def get_data(companies, root_type, balance_must_be, fiscal_year, filters=None, ignore_closing_entries=False):
 	accounts, accounts_by_name = get_account_heads(root_type,
 		companies, filters)
@@ -208,22 +238,13 @@ def get_data(companies, root_type, balance_must_be, fiscal_year, filters=None, i
 
 	company_currency = get_company_currency(filters)
 
-	if filters.filter_based_on == 'Fiscal Year':
-		start_date = fiscal_year.year_start_date
-		end_date = fiscal_year.year_end_date
-	else:
-		start_date = filters.period_start_date
-		end_date = filters.period_end_date
+	start_date, end_date = get_period_dates(fiscal_year, filters)
 
-	gl_entries_by_account = {}
-	for root in frappe.db.sql("""select lft, rgt from tabAccount
-			where root_type=%s and ifnull(parent_account, '') = ''""", root_type, as_dict=1):
+	balances_by_company = get_balances_by_company(root_type, start_date, end_date, filters)
+	for balances in balances_by_company.values():
+		validate_balances(balances, accounts_by_name)
 
-		set_gl_entries_by_account(start_date,
-			end_date, root.lft, root.rgt, filters,
-			gl_entries_by_account, accounts_by_name, ignore_closing_entries=False)
-
-	calculate_values(accounts_by_name, gl_entries_by_account, companies, start_date, filters)
+	calculate_values(accounts_by_name, balances_by_company, companies, filters)
 	accumulate_values_into_parents(accounts, accounts_by_name, companies)
 	out = prepare_data(accounts, start_date, end_date, balance_must_be, companies, company_currency)
 
@@ -236,20 +257,18 @@ def get_company_currency(filters=None):
 	return (filters.get('presentation_currency')
 		or frappe.get_cached_value('Company',  filters.company,  "default_currency"))
 
-def calculate_values(accounts_by_name, gl_entries_by_account, companies, start_date, filters):
-	for entries in gl_entries_by_account.values():
-		for entry in entries:
-			key = entry.account_number or entry.account_name
+def calculate_values(accounts_by_name, balances_by_company, companies, filters):
+	for entry_company, balances in balances_by_company.items():
+		for key, (balance, opening_balance) in balances.balances.items():
 			d = accounts_by_name.get(key)
 			if d:
 				for company in companies:
-					# check if posting date is within the period
-					if (entry.company == company or (filters.get('accumulated_in_group_company'))
-						and entry.company in companies.get(company)):
-						d[company] = d.get(company, 0.0) + flt(entry.debit) - flt(entry.credit)
+					if (entry_company == company or (filters.get('accumulated_in_group_company'))
+						and entry_company in companies.get(company)):
+						d[company] = d.get(company, 0.0) + balance
 
-				if entry.posting_date < getdate(start_date):
-					d["opening_balance"] = d.get("opening_balance", 0.0) + flt(entry.debit) - flt(entry.credit)
+				if opening_balance:
+					d["opening_balance"] = d.get("opening_balance", 0.0) + opening_balance
 
 def accumulate_values_into_parents(accounts, accounts_by_name, companies):
 	"""accumulate children's values in parent accounts"""
@@ -337,59 +356,141 @@ def prepare_data(accounts, start_date, end_date, balance_must_be, companies, com
 
 	return data
 
-def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account,
-	accounts_by_name, ignore_closing_entries=False):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+def get_balances_by_company(root_type, from_date, to_date, filters, ignore_closing_entries=False):
+	"""Returns the balances of the accounts of `root_type` of the company and its subsidiaries,
+	by company (see `get_company_balances`). With `run_in_parallel`, the balances are aggregated
+	by the background jobs started by `execute`"""
+	if frappe.flags.consolidated_balances and root_type in frappe.flags.consolidated_balances:
+		return frappe.flags.consolidated_balances[root_type]
+
+	return {company: get_company_balances(company, root_type, from_date, to_date, filters,
+		ignore_closing_entries) for company in get_subsidiary_companies(filters.get('company'))}
 
-	company_lft, company_rgt = frappe.get_cached_value('Company',
-		filters.get('company'),  ["lft", "rgt"])
+def get_balances_in_parallel(companies, root_types, from_date, to_date, filters):
+	"""Aggregate the accounts of `root_types` of each company in one background job, and wait for
+	all the jobs. The balances are passed back through the cache, as `{root type: {company: balances}}`.
+	Only the companies whose job failed or was stopped are aggregated in this process"""
+	result_key = "consolidated_financial_statement_balances|" + frappe.generate_hash(length=10)
 
+	jobs = {}
+	for company in companies:
+		jobs[company] = frappe.enqueue(set_company_balances, queue="short", timeout=PARALLEL_JOB_TIMEOUT,
+			result_key="{0}|{1}".format(result_key, company), company=company, root_types=root_types,
+			from_date=from_date, to_date=to_date, filters=filters, now=frappe.flags.in_test)
+
+	balances_by_root_type = {root_type: {} for root_type in root_types}
+	failed = []
+	pending = list(companies)
+	started = time.time()
+	while pending:
+		for company in list(pending):
+			# the status is read first, a job ended before the result is read has set it
+			ended = not jobs[company] or jobs[company].get_status() in ("finished", "failed", "stopped", "canceled")
+
+			key = "{0}|{1}".format(result_key, company)
+			balances = frappe.cache().get_value(key, expires=True)
+			if balances is not None:
+				frappe.cache().delete_value(key)
+				for root_type in root_types:
+					balances_by_root_type[root_type][company] = balances[root_type]
+				pending.remove(company)
+			elif ended:
+				failed.append(company)
+				pending.remove(company)
+
+		if not pending:
+			break
+
+		if time.time() - started >= PARALLEL_JOB_TIMEOUT:
+			# not picked up by a worker, the started jobs are stopped by the worker at the timeout
+			for company in pending:
+				if jobs[company].get_status() == "queued":
+					jobs[company].cancel()
+			failed.extend(pending)
+			break
+
+		time.sleep(0.1)
+
+	for company in failed:
+		for root_type in root_types:
+			balances_by_root_type[root_type][company] = get_company_balances(company, root_type,
+				from_date, to_date, filters)
+
+	return balances_by_root_type
+
+def set_company_balances(result_key, company, root_types, from_date, to_date, filters):
+	"""Background job of `get_balances_in_parallel`"""
+	frappe.cache().set_value(result_key, {root_type: get_company_balances(company, root_type,
+		from_date, to_date, filters) for root_type in root_types}, expires_in_sec=PARALLEL_JOB_RESULT_EXPIRY)
+
+def get_company_balances(company, root_type, from_date, to_date, filters, ignore_closing_entries=False):
+	"""Returns the balances of the accounts of `root_type` of the company in the presentation currency,
+	as `{account number or name: [balance, opening balance]}`, and the keys which are account numbers.
+	The opening balance is the balance of the entries before `from_date`"""
+	default_currency = frappe.get_cached_value('Company', company, "default_currency")
 	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
-	companies = frappe.db.sql(""" select name, default_currency from `tabCompany`
-		where lft >= %(company_lft)s and rgt <= %(company_rgt)s""", {
-			"company_lft": company_lft,
-			"company_rgt": company_rgt,
-		}, as_dict=1)
-
-	currency_info = frappe._dict({
-		'report_date': to_date,
-		'presentation_currency': filters.get('presentation_currency')
-	})
 
-	for d in companies:
+	query_filters = {
+		"from_date": from_date,
+		"to_date": to_date,
+		"root_type": root_type,
+		"company": company,
+		"finance_book": filters.get("finance_book"),
+		"company_fb": frappe.db.get_value("Company", company, 'default_finance_book')
+	}
+
+	if filters and filters.get('presentation_currency') != default_currency:
+		# converted by the date of each entry
 		gl_entries = frappe.db.sql("""select gl.posting_date, gl.account, gl.debit, gl.credit, gl.is_opening, gl.company,
 			gl.fiscal_year, gl.debit_in_account_currency, gl.credit_in_account_currency, gl.account_currency,
 			acc.account_name, acc.account_number
 			from `tabGL Entry` gl, `tabAccount` acc where acc.name = gl.account and gl.company = %(company)s
-			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.lft >= %(lft)s and acc.rgt <= %(rgt)s
+			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.root_type = %(root_type)s
 			order by gl.account, gl.posting_date""".format(additional_conditions=additional_conditions),
-			{
-				"from_date": from_date,
-				"to_date": to_date,
-				"lft": root_lft,
-				"rgt": root_rgt,
-				"company": d.name,
-				"finance_book": filters.get("finance_book"),
-				"company_fb": frappe.db.get_value("Company", d.name, 'default_finance_book')
-			},
-			as_dict=True)
-
-		if filters and filters.get('presentation_currency') != d.default_currency:
-			currency_info['company'] = d.name
-			currency_info['company_currency'] = d.default_currency
-			convert_to_presentation_currency(gl_entries, currency_info)
-
-		for entry in gl_entries:
-			key = entry.account_number or entry.account_name
-			validate_entries(key, entry, accounts_by_name)
-			gl_entries_by_account.setdefault(key, []).append(entry)
-
-	return gl_entries_by_account
-
-def validate_entries(key, entry, accounts_by_name):
-	if key not in accounts_by_name:
-		field = "Account number" if entry.account_number else "Account name"
-		frappe.throw(_("{0} {1} is not present in the parent company").format(field, key))
+			query_filters, as_dict=True)
+
+		convert_to_presentation_currency(gl_entries, frappe._dict({
+			'report_date': to_date,
+			'presentation_currency': filters.get('presentation_currency'),
+			'company': company,
+			'company_currency': default_currency
+		}))
+	else:
+		# one entry per account, opening, fiscal year and before or after the from date
+		gl_entries = frappe.db.sql("""select min(gl.posting_date) as posting_date, gl.account,
+			sum(gl.debit) as debit, sum(gl.credit) as credit, gl.is_opening, gl.company, gl.fiscal_year,
+			sum(gl.debit_in_account_currency) as debit_in_account_currency,
+			sum(gl.credit_in_account_currency) as credit_in_account_currency,
+			max(gl.account_currency) as account_currency,
+			max(acc.account_name) as account_name, max(acc.account_number) as account_number
+			from `tabGL Entry` gl, `tabAccount` acc where acc.name = gl.account and gl.company = %(company)s
+			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.root_type = %(root_type)s
+			group by gl.account, {before_from_date}, gl.is_opening, gl.company, gl.fiscal_year
+			order by gl.account, posting_date""".format(additional_conditions=additional_conditions,
+				before_from_date="gl.posting_date < %(from_date)s" if from_date else "0"),
+			query_filters, as_dict=True)
+
+	from_date = getdate(from_date) if from_date else None
+	balances = frappe._dict(balances={}, account_numbers=[])
+	for entry in gl_entries:
+		key = entry.account_number or entry.account_name
+		if key not in balances.balances:
+			balances.balances[key] = [0.0, 0.0]
+			if entry.account_number:
+				balances.account_numbers.append(key)
+
+		amount = flt(entry.debit) - flt(entry.credit)
+		balances.balances[key][0] += amount
+		if from_date and getdate(entry.posting_date) < from_date:
+			balances.balances[key][1] += amount
+
+	return balances
+
+def validate_balances(balances, accounts_by_name):
+	for key in balances.balances:
+		if key not in accounts_by_name:
+			field = "Account number" if key in balances.account_numbers else "Account name"
+			frappe.throw(_("{0} {1} is not present in the parent company").format(field, key))
 
 def get_additional_conditions(from_date, ignore_closing_entries, filters):
 	additional_conditions = []
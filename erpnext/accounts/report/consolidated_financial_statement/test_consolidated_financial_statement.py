@@ -0,0 +1,76 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+from frappe.utils import today
+from erpnext.accounts.utils import get_fiscal_year
+from erpnext.accounts.report.consolidated_financial_statement.consolidated_financial_statement import execute
+
+class TestConsolidatedFinancialStatement(unittest.TestCase):
+	def test_parallel_execution(self):
+		"""companies aggregated in parallel give the same statements as aggregated one by one"""
+		for report in ("Balance Sheet", "Profit and Loss Statement"):
+			filters = self.get_filters(report)
+
+			data = execute(filters)[1]
+			filters.run_in_parallel = 1
+			self.assertEqual(execute(filters)[1], data)
+
+	def test_one_job_per_company(self):
+		"""each company is aggregated in one job for all the root types of the report"""
+		enqueued = []
+		enqueue_job = frappe.enqueue
+		def enqueue(method, **kwargs):
+			enqueued.append(kwargs["company"])
+			return enqueue_job(method, **kwargs)
+
+		frappe.enqueue = enqueue
+		try:
+			filters = self.get_filters("Balance Sheet")
+			filters.run_in_parallel = 1
+			execute(filters)
+		finally:
+			frappe.enqueue = enqueue_job
+
+		self.assertTrue(enqueued)
+		self.assertEqual(sorted(enqueued), sorted(set(enqueued)))
+
+	def test_failed_jobs(self):
+		"""companies whose job failed are aggregated in the request"""
+		jobs = []
+		def enqueue(method, **kwargs):
+			jobs.append(FailedJob())
+			return jobs[-1]
+
+		filters = self.get_filters("Balance Sheet")
+		data = execute(filters)[1]
+
+		enqueue_job = frappe.enqueue
+		frappe.enqueue = enqueue
+		try:
+			filters.run_in_parallel = 1
+			self.assertEqual(execute(filters)[1], data)
+		finally:
+			frappe.enqueue = enqueue_job
+
+		self.assertTrue(jobs)
+
+	def get_filters(self, report):
+		fiscal_year = get_fiscal_year(today(), company="_Test Company 3")[0]
+
+		return frappe._dict({
+			"company": "_Test Company 3",
+			"filter_based_on": "Fiscal Year",
+			"from_fiscal_year": fiscal_year,
+			"to_fiscal_year": fiscal_year,
+			"report": report,
+			"presentation_currency": frappe.get_cached_value("Company", "_Test Company 3", "default_currency"),
+			"include_default_book_entries": 1
+		})
+
+class FailedJob(object):
+	"""a background job failed without a result"""
+	def get_status(self):
+		return "failed"
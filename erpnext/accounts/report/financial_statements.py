@@ -17,6 +17,7 @@ from frappe.utils import (flt, getdate, get_first_day, add_months, add_days, for
 
 from six import itervalues
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions, get_dimension_with_children
+from erpnext.accounts.doctype.gl_balance.gl_balance import is_gl_balance_valid, get_gl_balance_query
 
 def get_period_list(from_fiscal_year, to_fiscal_year, period_start_date, period_end_date, filter_based_on, periodicity, accumulated_values=False,
 	company=None, reset_period_on_fy_change=True):
@@ -152,6 +153,10 @@ def get_data(
 
 	company_currency = get_appropriate_currency(company, filters)
 
+	# GL Balance has monthly totals, usable if the periods start on the first of a month
+	use_gl_balance = all(getdate(d) == get_first_day(d)
+		for d in [period_list[0]["year_start_date"]] + [period.from_date for period in period_list])
+
 	gl_entries_by_account = {}
 	for root in frappe.db.sql("""select lft, rgt from tabAccount
 			where root_type=%s and ifnull(parent_account, '') = ''""", root_type, as_dict=1):
@@ -161,7 +166,8 @@ def get_data(
 			period_list[0]["year_start_date"] if only_current_fiscal_year else None,
 			period_list[-1]["to_date"],
 			root.lft, root.rgt, filters,
-			gl_entries_by_account, ignore_closing_entries=ignore_closing_entries
+			gl_entries_by_account, ignore_closing_entries=ignore_closing_entries,
+			use_gl_balance=use_gl_balance, period_list=period_list
 		)
 
 	calculate_values(
@@ -357,48 +363,114 @@ def sort_accounts(accounts, is_root=False, key="name"):
 	accounts.sort(key = functools.cmp_to_key(compare_accounts))
 
 def set_gl_entries_by_account(
-		company, from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account, ignore_closing_entries=False):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+		company, from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account, ignore_closing_entries=False,
+		use_gl_balance=False, period_list=None):
+	"""Returns a dict like { "account": [gl entries], ... }
 
-	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
+	If `use_gl_balance` is set, the entries of full months are the monthly totals
+	from GL Balance, posted on the first day of the month.
 
-	accounts = frappe.db.sql_list("""select name from `tabAccount`
-		where lft >= %s and rgt <= %s and company = %s""", (root_lft, root_rgt, company))
+	If `period_list` is set, the entries are summed up in the query, one entry per account,
+	period (see `get_period_bucket`), opening and fiscal year, posted on the first posting
+	date of the entries summed up"""
 
-	if accounts:
-		additional_conditions += " and account in ({})"\
-			.format(", ".join([frappe.db.escape(d) for d in accounts]))
+	use_gl_balance = use_gl_balance and can_use_gl_balance(filters)
+	if use_gl_balance:
+		additional_conditions = get_additional_conditions(None, False, filters)
+	else:
+		additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
 
-		gl_filters = {
-			"company": company,
-			"from_date": from_date,
-			"to_date": to_date,
-			"finance_book": cstr(filters.get("finance_book"))
-		}
+	additional_conditions += """ and account in (select name from `tabAccount`
+		where lft >= %(root_lft)s and rgt <= %(root_rgt)s and company = %(company)s)"""
 
-		if filters.get("include_default_book_entries"):
-			gl_filters["company_fb"] = frappe.db.get_value("Company",
-				company, 'default_finance_book')
+	gl_filters = {
+		"company": company,
+		"from_date": from_date,
+		"to_date": to_date,
+		"finance_book": cstr(filters.get("finance_book"))
+	}
+
+	if filters.get("include_default_book_entries"):
+		gl_filters["company_fb"] = frappe.db.get_value("Company",
+			company, 'default_finance_book')
+
+	for key, value in filters.items():
+		if value:
+			gl_filters.update({
+				key: value
+			})
+
+	gl_filters.update({
+		"root_lft": root_lft,
+		"root_rgt": root_rgt
+	})
+
+	# presentation currency is converted by the date of each entry
+	if filters.get('presentation_currency'):
+		period_list = None
+
+	if use_gl_balance:
+		query = get_gl_balance_query("""{posting_date} as posting_date, account, debit, credit, is_opening,
+			fiscal_year, debit_in_account_currency, credit_in_account_currency, account_currency""",
+			" and company=%(company)s " + additional_conditions, from_date=from_date, to_date=to_date,
+			ignore_closing_entries=ignore_closing_entries)
+		query, additional_conditions = "({0}) gle".format(query), ""
+	else:
+		query = "`tabGL Entry` gle"
+		additional_conditions = """ and company=%(company)s {0}
+			and posting_date <= %(to_date)s""".format(additional_conditions)
+
+	if period_list:
+		gl_entries = frappe.db.sql("""select min(posting_date) as posting_date, account,
+				sum(debit) as debit, sum(credit) as credit, is_opening, fiscal_year,
+				sum(debit_in_account_currency) as debit_in_account_currency,
+				sum(credit_in_account_currency) as credit_in_account_currency,
+				max(account_currency) as account_currency
+			from {query}
+			where 1=1 {additional_conditions}
+			group by account, {period_bucket}, is_opening, fiscal_year
+			order by account, posting_date""".format(query=query, additional_conditions=additional_conditions,
+				period_bucket=get_period_bucket(period_list)), gl_filters, as_dict=True) #nosec
+	else:
+		gl_entries = frappe.db.sql("""select posting_date, account, debit, credit, is_opening, fiscal_year, debit_in_account_currency, credit_in_account_currency, account_currency from {query}
+			where 1=1 {additional_conditions}
+			order by account, posting_date""".format(query=query, additional_conditions=additional_conditions), gl_filters, as_dict=True) #nosec
+
+	if filters and filters.get('presentation_currency'):
+		convert_to_presentation_currency(gl_entries, get_currency(filters))
+
+	for entry in gl_entries:
+		gl_entries_by_account.setdefault(entry.account, []).append(entry)
+
+	return gl_entries_by_account
+
+
+def get_period_bucket(period_list):
+	"""SQL expression numbering the date ranges between the start dates of the fiscal year and the
+	periods, entries in a range are in the same periods and before or after the year start date"""
+	dates = set([getdate(period_list[0]["year_start_date"])])
+	for period in period_list:
+		dates.add(getdate(period.from_date))
+		dates.add(add_days(period.to_date, 1))
+
+	dates = sorted(dates, reverse=True)
+	return "case {0} else 0 end".format(" ".join("when gle.posting_date >= '{0}' then {1}".format(d, len(dates) - i)
+		for i, d in enumerate(dates)))
 
-		for key, value in filters.items():
-			if value:
-				gl_filters.update({
-					key: value
-				})
 
-		gl_entries = frappe.db.sql("""select posting_date, account, debit, credit, is_opening, fiscal_year, debit_in_account_currency, credit_in_account_currency, account_currency from `tabGL Entry`
-			where company=%(company)s
-			{additional_conditions}
-			and posting_date <= %(to_date)s
-			order by account, posting_date""".format(additional_conditions=additional_conditions), gl_filters, as_dict=True) #nosec
+def can_use_gl_balance(filters):
+	"""GL Balance does not have the project and accounting dimensions of the entries"""
+	if not is_gl_balance_valid():
+		return False
 
-		if filters and filters.get('presentation_currency'):
-			convert_to_presentation_currency(gl_entries, get_currency(filters))
+	if filters and (filters.get("project") or filters.get("presentation_currency")):
+		return False
 
-		for entry in gl_entries:
-			gl_entries_by_account.setdefault(entry.account, []).append(entry)
+	for dimension in get_accounting_dimensions(as_list=False):
+		if filters and filters.get(dimension.fieldname):
+			return False
 
-		return gl_entries_by_account
+	return True
 
 
 def get_additional_conditions(from_date, ignore_closing_entries, filters):
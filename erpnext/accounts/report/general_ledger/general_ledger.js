@@ -157,7 +157,65 @@ frappe.query_reports["General Ledger"] = {
 			"fieldtype": "Check",
 			"default": 1
 		}
-	]
+	],
+
+	onload: function(report) {
+		report.page.add_inner_button(__("Export in Background"), function() {
+			frappe.prompt({
+				fieldname: "file_format",
+				label: __("File Format"),
+				fieldtype: "Select",
+				options: "CSV\nExcel",
+				default: "CSV",
+				reqd: 1
+			}, function(values) {
+				frappe.call({
+					method: "erpnext.accounts.report.general_ledger.general_ledger.export_general_ledger",
+					args: {
+						filters: report.get_values(),
+						file_format: values.file_format
+					},
+					callback: function() {
+						frappe.show_alert(__("The General Ledger is being exported, you will be notified when the file is ready"));
+					}
+				});
+			}, __("Export General Ledger"), __("Export"));
+		});
+
+		frappe.realtime.on("general_ledger_export", function(data) {
+			frappe.msgprint(__("The General Ledger has been exported: {0}",
+				['<a href="' + data.file_url + '" target="_blank">' + data.file_url + '</a>']));
+		});
+	},
+
+	after_datatable_render: function(datatable) {
+		frappe.query_reports["General Ledger"].set_load_more_button(frappe.query_report, datatable);
+	},
+
+	set_load_more_button: function(report, datatable) {
+		// grouped by account, the rows are loaded a page at a time
+		report.page.remove_inner_button(__("Load More"));
+
+		let last_row = report.data && report.data[report.data.length - 1];
+		if (!last_row || !last_row.next_cursor) return;
+
+		report.page.add_inner_button(__("Load More"), function() {
+			frappe.call({
+				method: "erpnext.accounts.report.general_ledger.general_ledger.get_general_ledger_page",
+				args: {
+					filters: report.get_values(),
+					cursor: last_row.next_cursor
+				},
+				freeze: true,
+				callback: function(r) {
+					delete last_row.next_cursor;
+					report.data = report.data.concat(r.message);
+					datatable.appendRows(r.message);
+					frappe.query_reports["General Ledger"].set_load_more_button(report, datatable);
+				}
+			});
+		});
+	}
 }
 
 erpnext.dimension_filters.forEach((dimension) => {
@@ -5,18 +5,32 @@ from __future__ import unicode_literals
 import frappe, erpnext
 from erpnext import get_company_currency, get_default_company
 from erpnext.accounts.report.utils import get_currency, convert_to_presentation_currency
-from frappe.utils import getdate, cstr, flt, fmt_money
-from frappe import _, _dict
+import io, csv
+from frappe.utils import getdate, cstr, flt, fmt_money, encode
+from frappe import _, _dict, scrub
 from erpnext.accounts.utils import get_account_currency
 from erpnext.accounts.report.financial_statements import get_cost_centers_with_children
-from six import iteritems
+from six import iteritems, PY2
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions, get_dimension_with_children
 from collections import OrderedDict
 
+# GL entries in each page of the General Ledger grouped by account shown in the report,
+# the next pages are loaded with get_general_ledger_page
+PAGE_LENGTH = 500
+
 def execute(filters=None):
 	if not filters:
 		return [], []
 
+	filters, account_details = prepare_filters(filters)
+
+	columns = get_columns(filters)
+
+	res = get_result(filters, account_details)
+
+	return columns, res
+
+def prepare_filters(filters):
 	account_details = {}
 
 	if filters and filters.get('print_in_account_currency') and \
@@ -35,11 +49,7 @@ def execute(filters=None):
 
 	filters = set_account_currency(filters)
 
-	columns = get_columns(filters)
-
-	res = get_result(filters, account_details)
-
-	return columns, res
+	return filters, account_details
 
 
 def validate_filters(filters, account_details):
@@ -106,6 +116,9 @@ def set_account_currency(filters):
 	return filters
 
 def get_result(filters, account_details):
+	if filters.get("group_by") == _("Group by Account"):
+		return get_page(filters)
+
 	gl_entries = get_gl_entries(filters)
 
 	data = get_data_with_opening_closing(filters, account_details, gl_entries)
@@ -150,7 +163,7 @@ def get_gl_entries(filters):
 		return gl_entries
 
 
-def get_conditions(filters):
+def get_conditions(filters, date_conditions=True):
 	conditions = []
 	if filters.get("account"):
 		lft, rgt = frappe.db.get_value("Account", filters["account"], ["lft", "rgt"])
@@ -173,11 +186,12 @@ def get_conditions(filters):
 	if filters.get("party"):
 		conditions.append("party in %(party)s")
 
-	if not (filters.get("account") or filters.get("party") or
-		filters.get("group_by") in ["Group by Account", "Group by Party"]):
-		conditions.append("posting_date >=%(from_date)s")
+	if date_conditions:
+		if not (filters.get("account") or filters.get("party") or
+			filters.get("group_by") in ["Group by Account", "Group by Party"]):
+			conditions.append("posting_date >=%(from_date)s")
 
-	conditions.append("(posting_date <=%(to_date)s or is_opening = 'Yes')")
+		conditions.append("(posting_date <=%(to_date)s or is_opening = 'Yes')")
 
 	if filters.get("project"):
 		conditions.append("project in %(project)s")
@@ -340,10 +354,15 @@ def get_result_as_list(data, filters):
 
 	return data
 
-def get_supplier_invoice_details():
+def get_supplier_invoice_details(invoices=None):
 	inv_details = {}
+	if invoices is not None and not invoices:
+		return inv_details
+
+	conditions = " and name in %(invoices)s" if invoices else ""
 	for d in frappe.db.sql(""" select name, bill_no from `tabPurchase Invoice`
-		where docstatus = 1 and bill_no is not null and bill_no != '' """, as_dict=1):
+		where docstatus = 1 and bill_no is not null and bill_no != '' {0}""".format(conditions),
+		{"invoices": invoices}, as_dict=1):
 		inv_details[d.name] = d.bill_no
 
 	return inv_details
@@ -353,6 +372,295 @@ def get_balance(row, balance, debit_field, credit_field):
 
 	return balance
 
+def iterate_general_ledger(filters, page_length=10000, cursor=None):
+	"""Yields the rows of the General Ledger grouped by account (opening, entries, total and closing
+	of each account, followed by the totals of all the accounts) with the running balance.
+
+	Only the opening balances and one page of GL entries at a time are kept in memory.
+
+	`cursor` is updated with the last GL entry yielded and the running balances, passed again
+	the rows after that entry are yielded"""
+	opening_balances = get_opening_balances(filters)
+
+	totals = get_totals_dict()
+	for opening in opening_balances.values():
+		update_totals(totals, "opening", opening)
+		update_totals(totals, "closing", opening)
+
+	state = _dict(balance=0)
+
+	def set_balance(row, inv_details=None):
+		if not row.get("posting_date"):
+			state.balance = 0
+
+		state.balance = get_balance(row, state.balance, "debit", "credit")
+		row["balance"] = state.balance
+		row["account_currency"] = filters.account_currency
+		row["bill_no"] = (inv_details or {}).get(row.get("against_voucher"), "")
+		return row
+
+	def get_account_totals(account):
+		account_totals = _dict(account=account, totals=get_totals_dict())
+		opening = opening_balances.get(account)
+		if opening:
+			update_totals(account_totals.totals, "opening", opening)
+			update_totals(account_totals.totals, "closing", opening)
+		return account_totals
+
+	account_totals = None
+	if cursor and cursor.get("last_name"):
+		# resumed after the last entry of the previous page
+		state.balance = flt(cursor.balance)
+		account_totals = get_account_totals(cursor.last_account)
+		for key in ("total", "closing"):
+			update_totals(totals, key, _dict(cursor.total))
+			update_totals(account_totals.totals, key, _dict(cursor.account_total))
+	else:
+		yield set_balance(totals.opening)
+
+	for gl_entries in iterate_gl_entries(filters, page_length=page_length, after=cursor):
+		inv_details = get_supplier_invoice_details([gle.against_voucher for gle in gl_entries
+			if gle.against_voucher_type == "Purchase Invoice"])
+
+		for gle in gl_entries:
+			if not account_totals or gle.account != account_totals.account:
+				if account_totals:
+					yield set_balance(account_totals.totals.total)
+					yield set_balance(account_totals.totals.closing)
+
+				account_totals = get_account_totals(gle.account)
+
+				yield set_balance({})
+				yield set_balance(account_totals.totals.opening)
+
+			update_totals(account_totals.totals, "total", gle)
+			update_totals(account_totals.totals, "closing", gle)
+			update_totals(totals, "total", gle)
+			update_totals(totals, "closing", gle)
+
+			row = set_balance(gle, inv_details)
+			if cursor is not None:
+				cursor.update({
+					"last_account": gle.account,
+					"last_posting_date": gle.posting_date,
+					"last_name": gle.name,
+					"balance": state.balance,
+					"account_total": get_amounts(account_totals.totals.total),
+					"total": get_amounts(totals.total)
+				})
+
+			yield row
+
+	if account_totals:
+		yield set_balance(account_totals.totals.total)
+		yield set_balance(account_totals.totals.closing)
+
+	yield set_balance({})
+	yield set_balance(totals.total)
+	yield set_balance(totals.closing)
+
+def get_amounts(gle):
+	return _dict((fieldname, gle[fieldname]) for fieldname in ("debit", "credit",
+		"debit_in_account_currency", "credit_in_account_currency"))
+
+def update_totals(totals, key, gle):
+	totals[key].debit += flt(gle.debit)
+	totals[key].credit += flt(gle.credit)
+	totals[key].debit_in_account_currency += flt(gle.debit_in_account_currency)
+	totals[key].credit_in_account_currency += flt(gle.credit_in_account_currency)
+
+def get_opening_condition(filters):
+	"""entries before the from date and opening entries (unless shown) are in the opening balance"""
+	if filters.get("show_opening_entries"):
+		return "posting_date < %(from_date)s"
+	else:
+		return "(posting_date < %(from_date)s or is_opening = 'Yes')"
+
+def get_opening_balances(filters):
+	"""Opening balance of each account, summed up by the database"""
+	if filters.get("include_default_book_entries"):
+		filters['company_fb'] = frappe.db.get_value("Company",
+			filters.get("company"), 'default_finance_book')
+
+	# presentation currency is converted by the date of each entry
+	# so the debits and credits of each date are summed up separately
+	group_by = "account"
+	if filters.get("presentation_currency"):
+		group_by = "account, posting_date, account_currency, debit > 0"
+
+	gl_entries = frappe.db.sql("""
+		select
+			account, max(posting_date) as posting_date, max(account_currency) as account_currency,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from `tabGL Entry`
+		where company=%(company)s and {opening_condition} {conditions}
+		group by {group_by}""".format(opening_condition=get_opening_condition(filters),
+			conditions=get_conditions(filters, date_conditions=False), group_by=group_by), filters, as_dict=1)
+
+	if filters.get("presentation_currency"):
+		gl_entries = convert_to_presentation_currency(gl_entries, get_currency(filters))
+
+	opening_balances = {}
+	for gle in gl_entries:
+		if gle.account not in opening_balances:
+			opening_balances[gle.account] = get_totals_dict().opening
+		update_totals(opening_balances, gle.account, gle)
+
+	return opening_balances
+
+def iterate_gl_entries(filters, page_length=10000, after=None):
+	"""Yields pages of the GL entries between the from and to date (except the ones in the opening),
+	ordered by account, posting date and name. Each page starts after the last entry of the previous one,
+	the first one after the `last_account`, `last_posting_date` and `last_name` of `after` if set"""
+	if filters.get("include_default_book_entries"):
+		filters['company_fb'] = frappe.db.get_value("Company",
+			filters.get("company"), 'default_finance_book')
+
+	conditions = get_conditions(filters, date_conditions=False)
+	if not filters.get("show_opening_entries"):
+		conditions += " and ifnull(is_opening, 'No') != 'Yes'"
+
+	currency_map = get_currency(filters) if filters.get("presentation_currency") else None
+	values = frappe._dict(filters)
+
+	after_last_entry = ""
+	if after and after.get("last_name"):
+		values.update({
+			"last_account": after.last_account,
+			"last_posting_date": after.last_posting_date,
+			"last_name": after.last_name
+		})
+		after_last_entry = get_after_last_entry_condition()
+
+	while True:
+		gl_entries = frappe.db.sql("""
+			select
+				name as gl_entry, name, posting_date, account, party_type, party,
+				voucher_type, voucher_no, cost_center, project,
+				against_voucher_type, against_voucher, account_currency,
+				remarks, against, is_opening, debit, credit, debit_in_account_currency,
+				credit_in_account_currency
+			from `tabGL Entry`
+			where company=%(company)s and posting_date between %(from_date)s and %(to_date)s
+				{conditions} {after_last_entry}
+			order by account, posting_date, name
+			limit {page_length}""".format(conditions=conditions, after_last_entry=after_last_entry,
+				page_length=page_length), values, as_dict=1)
+
+		if not gl_entries:
+			break
+
+		last_entry = gl_entries[-1]
+		values.update({
+			"last_account": last_entry.account,
+			"last_posting_date": last_entry.posting_date,
+			"last_name": last_entry.name
+		})
+		after_last_entry = get_after_last_entry_condition()
+
+		if currency_map:
+			gl_entries = convert_to_presentation_currency(gl_entries, currency_map)
+
+		yield gl_entries
+
+		if len(gl_entries) < page_length:
+			break
+
+def get_after_last_entry_condition():
+	return """and (account > %(last_account)s or (account = %(last_account)s
+		and (posting_date > %(last_posting_date)s or (posting_date = %(last_posting_date)s
+		and name > %(last_name)s))))"""
+
+def get_page(filters, cursor=None, page_length=PAGE_LENGTH):
+	"""Rows of the General Ledger grouped by account up to `page_length` GL entries after `cursor`.
+	The last row of a page followed by more rows has the cursor of the next page as `next_cursor`"""
+	cursor = _dict(cursor or {})
+	rows, entries = [], 0
+	for row in iterate_general_ledger(filters, page_length=page_length, cursor=cursor):
+		rows.append(row)
+		if row.get("gl_entry"):
+			entries += 1
+			if entries == page_length:
+				# the totals follow the last entry
+				row["next_cursor"] = cursor
+				break
+
+	return rows
+
+@frappe.whitelist()
+def get_general_ledger_page(filters, cursor):
+	"""Next page of the General Ledger grouped by account shown in the report"""
+	check_permission()
+	filters, account_details = prepare_filters(frappe._dict(frappe.parse_json(filters)))
+
+	return get_page(filters, frappe.parse_json(cursor))
+
+@frappe.whitelist()
+def export_general_ledger(filters, file_format="CSV"):
+	"""Export the General Ledger grouped by account to a CSV or Excel file in a background job,
+	the user is notified with the file url when done"""
+	check_permission()
+	filters = frappe.parse_json(filters)
+
+	# validate before the job is queued
+	prepare_filters(frappe._dict(filters))
+
+	frappe.enqueue(build_general_ledger_file, queue="long", timeout=6000, filters=filters,
+		file_format=file_format, user=frappe.session.user)
+
+def check_permission():
+	if not frappe.has_permission("GL Entry", "report"):
+		frappe.throw(_("Not permitted"), frappe.PermissionError)
+
+def build_general_ledger_file(filters, file_format, user):
+	filters, account_details = prepare_filters(frappe._dict(filters))
+	columns = [d for d in get_columns(filters) if not d.get("hidden")]
+
+	file_name = "general_ledger_{0}_{1}_{2}.{3}".format(scrub(filters.company), filters.from_date,
+		filters.to_date, "xlsx" if file_format == "Excel" else "csv")
+	file_name = "{0}_{1}".format(frappe.generate_hash(length=6), file_name)
+	path = frappe.get_site_path("private", "files", file_name)
+
+	def get_values(row):
+		if not row.get("posting_date") and row.get("account"):
+			# labels of the opening, total and closing rows are quoted
+			row["account"] = cstr(row.get("account")).strip("'")
+		return [row.get(d["fieldname"]) for d in columns]
+
+	if file_format == "Excel":
+		from openpyxl import Workbook
+
+		workbook = Workbook(write_only=True)
+		sheet = workbook.create_sheet(_("General Ledger"))
+		sheet.append([d.get("label") for d in columns])
+		for row in iterate_general_ledger(filters):
+			sheet.append(get_values(row))
+		workbook.save(path)
+	else:
+		# the csv module of Python 2 writes byte strings
+		with (io.open(path, "wb") if PY2 else io.open(path, "w", encoding="utf-8", newline="")) as f:
+			writer = csv.writer(f)
+
+			def write_row(values):
+				writer.writerow(encode(values) if PY2 else values)
+
+			write_row([d.get("label") for d in columns])
+			for row in iterate_general_ledger(filters):
+				write_row(get_values(row))
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"file_url": "/private/files/" + file_name,
+		"is_private": 1
+	})
+	file_doc.flags.ignore_permissions = True
+	file_doc.insert()
+
+	frappe.publish_realtime("general_ledger_export", {"file_url": file_doc.file_url}, user=user)
+
 def get_columns(filters):
 	if filters.get("presentation_currency"):
 		currency = filters["presentation_currency"]
@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import add_days, add_months, nowdate, flt
+from erpnext.accounts.report.general_ledger.general_ledger import (prepare_filters,
+	iterate_general_ledger, build_general_ledger_file, get_gl_entries, get_data_with_opening_closing,
+	get_result_as_list, get_page, get_columns)
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+
+class TestGeneralLedger(unittest.TestCase):
+	def test_iterate_general_ledger(self):
+		make_journal_entry("_Test Bank - _TC", "_Test Account Sales - _TC", 100,
+			posting_date=add_months(nowdate(), -2), submit=True)
+		for days in (0, -1):
+			make_journal_entry("_Test Bank - _TC", "_Test Account Sales - _TC", 100,
+				posting_date=add_days(nowdate(), days), submit=True)
+
+		filters = frappe._dict({
+			"company": "_Test Company",
+			"from_date": add_months(nowdate(), -1),
+			"to_date": nowdate(),
+			"group_by": "Group by Account"
+		})
+
+		# rows of all the GL entries loaded at once
+		filters, account_details = prepare_filters(filters)
+		data = get_result_as_list(get_data_with_opening_closing(filters, account_details,
+			get_gl_entries(filters)), filters)
+
+		rows = list(iterate_general_ledger(filters, page_length=2))
+
+		# opening, total and closing of all the accounts
+		for i in (0, -2, -1):
+			self.assertEqual(rows[i].account, data[i].account)
+			self.assertAlmostEqual(rows[i].debit, data[i].debit)
+			self.assertAlmostEqual(rows[i].credit, data[i].credit)
+			self.assertAlmostEqual(rows[i].balance, data[i].balance)
+
+		gl_entries = [d.get("gl_entry") for d in data if d.get("gl_entry")]
+		self.assertEqual(sorted(d.get("gl_entry") for d in rows if d.get("gl_entry")), sorted(gl_entries))
+
+		# running balance of the entries of an account ends at its closing balance
+		for i, row in enumerate(rows):
+			if row.get("account") == "'{0}'".format("Closing (Opening + Total)") and i != len(rows) - 1:
+				self.assertAlmostEqual(rows[i - 2].balance, row.balance)
+
+	def test_pages(self):
+		"""pages resumed from the cursor of the previous page have the rows of the whole ledger"""
+		for days in (0, -1, -2):
+			make_journal_entry("_Test Bank - _TC", "_Test Account Sales - _TC", 100,
+				posting_date=add_days(nowdate(), days), submit=True)
+
+		filters = prepare_filters(frappe._dict({
+			"company": "_Test Company",
+			"from_date": add_days(nowdate(), -2),
+			"to_date": nowdate(),
+			"group_by": "Group by Account"
+		}))[0]
+
+		rows = list(iterate_general_ledger(filters))
+
+		pages = [get_page(filters, page_length=2)]
+		while pages[-1][-1].get("next_cursor"):
+			# passed through the client
+			cursor = frappe.parse_json(frappe.as_json(pages[-1][-1].pop("next_cursor")))
+			pages.append(get_page(filters, cursor, page_length=2))
+
+		self.assertTrue(len(pages) > 1)
+		paged_rows = [row for page in pages for row in page]
+		self.assertEqual(len(paged_rows), len(rows))
+		for paged_row, row in zip(paged_rows, rows):
+			self.assertEqual(paged_row.get("gl_entry"), row.get("gl_entry"))
+			self.assertEqual(paged_row.get("account"), row.get("account"))
+			self.assertAlmostEqual(flt(paged_row.get("debit")), flt(row.get("debit")))
+			self.assertAlmostEqual(flt(paged_row.get("credit")), flt(row.get("credit")))
+			self.assertAlmostEqual(paged_row.get("balance"), row.get("balance"))
+
+	def test_export_to_csv(self):
+		from frappe.utils.csvutils import read_csv_content
+
+		make_journal_entry("_Test Bank - _TC", "_Test Account Sales - _TC", 100, submit=True)
+		filters = {
+			"company": "_Test Company",
+			"from_date": nowdate(),
+			"to_date": nowdate(),
+			"group_by": "Group by Account"
+		}
+
+		build_general_ledger_file(filters, "CSV", "Administrator")
+
+		file_name = frappe.get_all("File", filters={"file_name": ("like", "%general_ledger_%.csv")},
+			order_by="creation desc", limit=1)[0].name
+		rows = read_csv_content(frappe.get_doc("File", file_name).get_content())
+
+		filters = prepare_filters(frappe._dict(filters))[0]
+		columns = get_columns(filters)
+		self.assertEqual(rows[0], [d.get("label") for d in columns if not d.get("hidden")])
+		self.assertEqual(len(rows), len(list(iterate_general_ledger(filters))) + 1)
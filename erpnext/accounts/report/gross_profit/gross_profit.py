@@ -2,9 +2,11 @@
 # License: GNU General Public License v3. See license.txt
 
 from __future__ import unicode_literals
-import frappe
+import frappe, erpnext
 from frappe import _, scrub
-from erpnext.stock.utils import get_incoming_rate
+from erpnext.stock.utils import get_incoming_rate, get_fifo_rate
+from erpnext.stock.stock_ledger import get_valuation_rate
+from erpnext.stock.valuation import FIFOQueue
 from erpnext.controllers.queries import get_match_cond
 from frappe.utils import flt, cint
 
@@ -95,10 +97,9 @@ class GrossProfitGenerator(object):
 		self.data = []
 		self.average_buying_rate = {}
 		self.filters = frappe._dict(filters)
-		self.load_invoice_items()
-		self.load_stock_ledger_entries()
 		self.load_product_bundle()
 		self.load_non_stock_items()
+		self.load_purchase_rates()
 		self.get_returned_invoice_items()
 		self.process()
 
@@ -109,60 +110,78 @@ class GrossProfitGenerator(object):
 		self.currency_precision = cint(frappe.db.get_default("currency_precision")) or 3
 		self.float_precision = cint(frappe.db.get_default("float_precision")) or 2
 
-		for row in self.si_list:
-			if self.skip_row(row, self.product_bundles):
-				continue
+		for si_list in self.get_invoice_items():
+			self.load_stock_ledger_entries(si_list)
+			self.load_incoming_rates(si_list)
+			for row in si_list:
+				self.process_row(row)
 
-			row.base_amount = flt(row.base_net_amount, self.currency_precision)
+		if self.grouped:
+			self.get_average_rate_based_on_group_by()
 
-			product_bundles = []
-			if row.update_stock:
-				product_bundles = self.product_bundles.get(row.parenttype, {}).get(row.parent, frappe._dict())
-			elif row.dn_detail:
-				product_bundles = self.product_bundles.get("Delivery Note", {})\
-					.get(row.delivery_note, frappe._dict())
-				row.item_row = row.dn_detail
-
-			# get buying amount
-			if row.item_code in product_bundles:
-				row.buying_amount = flt(self.get_buying_amount_from_product_bundle(row,
-					product_bundles[row.item_code]), self.currency_precision)
-			else:
-				row.buying_amount = flt(self.get_buying_amount(row, row.item_code),
-					self.currency_precision)
+	def process_row(self, row):
+		if self.skip_row(row, self.product_bundles):
+			return
 
-			# get buying rate
-			if row.qty:
-				row.buying_rate = flt(row.buying_amount / row.qty, self.float_precision)
-				row.base_rate = flt(row.base_amount / row.qty, self.float_precision)
-			else:
-				row.buying_rate, row.base_rate = 0.0, 0.0
+		row.base_amount = flt(row.base_net_amount, self.currency_precision)
 
-			# calculate gross profit
-			row.gross_profit = flt(row.base_amount - row.buying_amount, self.currency_precision)
-			if row.base_amount:
-				row.gross_profit_percent = flt((row.gross_profit / row.base_amount) * 100.0, self.currency_precision)
-			else:
-				row.gross_profit_percent = 0.0
+		product_bundles = self.get_product_bundles(row)
+		if not row.update_stock and row.dn_detail:
+			row.item_row = row.dn_detail
 
-			# add to grouped
-			self.grouped.setdefault(row.get(scrub(self.filters.group_by)), []).append(row)
+		# get buying amount
+		if row.item_code in product_bundles:
+			row.buying_amount = flt(self.get_buying_amount_from_product_bundle(row,
+				product_bundles[row.item_code]), self.currency_precision)
+		else:
+			row.buying_amount = flt(self.get_buying_amount(row, row.item_code),
+				self.currency_precision)
 
-		if self.grouped:
-			self.get_average_rate_based_on_group_by()
+		# get buying rate
+		if row.qty:
+			row.buying_rate = flt(row.buying_amount / row.qty, self.float_precision)
+			row.base_rate = flt(row.base_amount / row.qty, self.float_precision)
+		else:
+			row.buying_rate, row.base_rate = 0.0, 0.0
+
+		# calculate gross profit
+		row.gross_profit = flt(row.base_amount - row.buying_amount, self.currency_precision)
+		if row.base_amount:
+			row.gross_profit_percent = flt((row.gross_profit / row.base_amount) * 100.0, self.currency_precision)
+		else:
+			row.gross_profit_percent = 0.0
+
+		# add to grouped, totals of other groups are summed as the rows are processed
+		key = row.get(scrub(self.filters.group_by))
+		if self.filters.get("group_by") != "Invoice" and key in self.grouped:
+			new_row = self.grouped[key][0]
+			new_row.qty += row.qty
+			new_row.buying_amount += flt(row.buying_amount, self.currency_precision)
+			new_row.base_amount += flt(row.base_amount, self.currency_precision)
+		else:
+			self.grouped.setdefault(key, []).append(row)
+
+	def get_product_bundles(self, row):
+		if row.update_stock:
+			return self.product_bundles.get(row.parenttype, {}).get(row.parent, frappe._dict())
+		elif row.dn_detail:
+			return self.product_bundles.get("Delivery Note", {}).get(row.delivery_note, frappe._dict())
+
+		return []
+
+	def get_row_item_codes(self, row):
+		"""the item of the invoice item, or the packed items of a product bundle"""
+		product_bundles = self.get_product_bundles(row)
+		if row.item_code in product_bundles:
+			return [d.item_code for d in product_bundles[row.item_code]]
+
+		return [row.item_code]
 
 	def get_average_rate_based_on_group_by(self):
 		# sum buying / selling totals for group
 		for key in list(self.grouped):
 			if self.filters.get("group_by") != "Invoice":
-				for i, row in enumerate(self.grouped[key]):
-					if i==0:
-						new_row = row
-					else:
-						new_row.qty += row.qty
-						new_row.buying_amount += flt(row.buying_amount, self.currency_precision)
-						new_row.base_amount += flt(row.base_amount, self.currency_precision)
-				new_row = self.set_average_rate(new_row)
+				new_row = self.set_average_rate(self.grouped[key][0])
 				self.grouped_data.append(new_row)
 			else:
 				for i, row in enumerate(self.grouped[key]):
@@ -219,44 +238,46 @@ class GrossProfitGenerator(object):
 		return flt(buying_amount, self.currency_precision)
 
 	def get_buying_amount(self, row, item_code):
-		# IMP NOTE
-		# stock_ledger_entries should already be filtered by item_code and warehouse and
-		# sorted by posting_date desc, posting_time desc
 		if item_code in self.non_stock_items:
 			#Issue 6089-Get last purchasing rate for non-stock item
-			item_rate = self.get_last_purchase_rate(item_code)
+			item_rate = self.last_purchase_rate.get(item_code, 0.0)
 			return flt(row.qty) * item_rate
 
-		else:
-			my_sle = self.sle.get((item_code, row.warehouse))
-			if (row.update_stock or row.dn_detail) and my_sle:
-				parenttype, parent = row.parenttype, row.parent
-				if row.dn_detail:
-					parenttype, parent = "Delivery Note", row.delivery_note
-
-				for i, sle in enumerate(my_sle):
-					# find the stock valution rate from stock ledger entry
-					if sle.voucher_type == parenttype and parent == sle.voucher_no and \
-						sle.voucher_detail_no == row.item_row:
-							previous_stock_value = len(my_sle) > i+1 and \
-								flt(my_sle[i+1].stock_value) or 0.0
-							if previous_stock_value:
-								return (previous_stock_value - flt(sle.stock_value)) * flt(row.qty) / abs(flt(sle.qty))
-							else:
-								return flt(row.qty) * self.get_average_buying_rate(row, item_code)
-			else:
-				return flt(row.qty) * self.get_average_buying_rate(row, item_code)
+		elif self.uses_average_buying_rate(row, item_code):
+			return flt(row.qty) * self.get_average_buying_rate(row, item_code)
+
+		sle = self.get_stock_ledger_entry(row, item_code)
+		if not sle:
+			# the stock of the item in the warehouse was not moved by this row
+			return 0.0
+
+		# find the stock valution rate from stock ledger entry
+		return -1 * flt(sle.stock_value_difference) * flt(row.qty) / abs(flt(sle.qty))
+
+	def get_stock_ledger_entry(self, row, item_code):
+		"""stock ledger entry of the invoice item, or of its delivery note item"""
+		if row.update_stock:
+			return self.sle.get((row.parenttype, row.parent, row.item_row, item_code, row.warehouse))
+		elif row.dn_detail:
+			return self.sle.get(("Delivery Note", row.delivery_note, row.dn_detail, item_code, row.warehouse))
+
+	def uses_average_buying_rate(self, row, item_code):
+		"""stock items are valued at the average buying rate unless the stock ledger entry of the row
+		has a previous stock value, or the item and warehouse have stock ledger entries of other rows"""
+		if not (row.update_stock or row.dn_detail):
+			return True
+
+		sle = self.get_stock_ledger_entry(row, item_code)
+		if sle:
+			return not (flt(sle.stock_value) - flt(sle.stock_value_difference))
 
-		return 0.0
+		return (item_code, row.warehouse) not in self.sle_item_warehouses
 
 	def get_average_buying_rate(self, row, item_code):
 		args = row
 		if not item_code in self.average_buying_rate:
 			if item_code in self.non_stock_items:
-				self.average_buying_rate[item_code] = flt(frappe.db.sql("""
-					select sum(base_net_amount) / sum(qty * conversion_factor)
-					from `tabPurchase Invoice Item`
-					where item_code = %s and docstatus=1""", item_code)[0][0])
+				self.average_buying_rate[item_code] = 0.0
 			else:
 				args.update({
 					'voucher_type': row.parenttype,
@@ -270,23 +291,83 @@ class GrossProfitGenerator(object):
 
 		return self.average_buying_rate[item_code]
 
-	def get_last_purchase_rate(self, item_code):
-		if self.filters.to_date:
-			last_purchase_rate = frappe.db.sql("""
-			select (a.base_rate / a.conversion_factor)
+	def load_incoming_rates(self, si_list):
+		"""Average buying rates of the stock items of the invoice items not loaded yet, the incoming
+		rate (see `get_incoming_rate`) of the first invoice item valued at the average buying rate.
+		The previous stock ledger entries of all the items are read in one query"""
+		rows_by_item = {}
+		for row in si_list:
+			for item_code in self.get_row_item_codes(row):
+				if (item_code not in rows_by_item and item_code not in self.average_buying_rate
+					and item_code not in self.non_stock_items and self.uses_average_buying_rate(row, item_code)):
+					rows_by_item[item_code] = row
+
+		if not rows_by_item:
+			return
+
+		args, values = [], []
+		for item_code, row in rows_by_item.items():
+			args.append("select %s as item_code, %s as warehouse, %s as posting_date, %s as posting_time")
+			values.extend([item_code, row.warehouse, row.posting_date or "1900-01-01", row.posting_time or "00:00"])
+
+		default_valuation_method = frappe.db.get_value("Stock Settings", None, "valuation_method") or "FIFO"
+		company_currency = erpnext.get_company_currency(self.filters.company)
+
+		for d in frappe.db.sql("""
+			select args.item_code, item.valuation_method, sle.stock_queue, sle.valuation_rate
+			from ({args}) args
+				inner join `tabItem` item on item.name = args.item_code
+				left join `tabStock Ledger Entry` sle on sle.name = (
+					select previous_sle.name from `tabStock Ledger Entry` previous_sle
+					where previous_sle.item_code = args.item_code
+						and (args.warehouse is null or previous_sle.warehouse = args.warehouse)
+						and ifnull(previous_sle.is_cancelled, 'No') = 'No'
+						and timestamp(previous_sle.posting_date, previous_sle.posting_time)
+							<= timestamp(args.posting_date, args.posting_time)
+					order by timestamp(previous_sle.posting_date, previous_sle.posting_time) desc,
+						previous_sle.creation desc
+					limit 1)""".format(args=" union all ".join(args)), tuple(values), as_dict=1):
+			row = rows_by_item[d.item_code]
+
+			rate = 0.0
+			valuation_method = d.valuation_method or default_valuation_method
+			if valuation_method == "FIFO":
+				stock_queue = FIFOQueue.loads(d.stock_queue)
+				rate = get_fifo_rate(stock_queue, row.qty or 0) if stock_queue else 0.0
+			elif valuation_method == "Moving Average":
+				rate = flt(d.valuation_rate)
+
+			if not rate:
+				rate = get_valuation_rate(d.item_code, row.warehouse, row.parenttype, row.parent,
+					True, currency=company_currency, company=self.filters.company)
+
+			self.average_buying_rate[d.item_code] = flt(rate)
+
+	def load_purchase_rates(self):
+		"""last and average purchase rates of all the non-stock items"""
+		conditions = " and modified <= %(to_date)s" if self.filters.to_date else ""
+
+		self.last_purchase_rate = {}
+		for d in frappe.db.sql("""
+			select a.item_code, (a.base_rate / a.conversion_factor) as rate
 			from `tabPurchase Invoice Item` a
-			where a.item_code = %s and a.docstatus=1
-			and modified <= %s
-			order by a.modified desc limit 1""", (item_code,self.filters.to_date))
-		else:
-			last_purchase_rate = frappe.db.sql("""
-			select (a.base_rate / a.conversion_factor)
-			from `tabPurchase Invoice Item` a
-			where a.item_code = %s and a.docstatus=1
-			order by a.modified desc limit 1""", item_code)
-		return flt(last_purchase_rate[0][0]) if last_purchase_rate else 0
-
-	def load_invoice_items(self):
+				inner join (select item_code, max(modified) as modified
+					from `tabPurchase Invoice Item`
+					where docstatus=1 and item_code in (select name from tabItem where is_stock_item=0) {0}
+					group by item_code) latest
+				on a.item_code = latest.item_code and a.modified = latest.modified
+			where a.docstatus=1""".format(conditions), self.filters, as_dict=1):
+			self.last_purchase_rate.setdefault(d.item_code, flt(d.rate))
+
+		for item_code, rate in frappe.db.sql("""
+			select item_code, sum(base_net_amount) / sum(qty * conversion_factor)
+			from `tabPurchase Invoice Item`
+			where docstatus=1 and item_code in (select name from tabItem where is_stock_item=0)
+			group by item_code"""):
+			self.average_buying_rate[item_code] = flt(rate)
+
+	def get_invoice_items(self, page_length=10000):
+		"""invoice items in pages of `page_length` rows"""
 		conditions = ""
 		if self.filters.company:
 			conditions += " and company = %(company)s"
@@ -298,9 +379,11 @@ class GrossProfitGenerator(object):
 		if self.filters.group_by=="Sales Person":
 			sales_person_cols = ", sales.sales_person, sales.allocated_amount, sales.incentives"
 			sales_team_table = "left join `tabSales Team` sales on sales.parent = `tabSales Invoice`.name"
+			sales_team_order = ", sales.name"
 		else:
 			sales_person_cols = ""
 			sales_team_table = ""
+			sales_team_order = ""
 
 		if self.filters.get("sales_invoice"):
 			conditions += " and `tabSales Invoice`.name = %(sales_invoice)s"
@@ -308,7 +391,7 @@ class GrossProfitGenerator(object):
 		if self.filters.get("item_code"):
 			conditions += " and `tabSales Invoice Item`.item_code = %(item_code)s"
 
-		self.si_list = frappe.db.sql("""
+		query = """
 			select
 				`tabSales Invoice Item`.parenttype, `tabSales Invoice Item`.parent,
 				`tabSales Invoice`.posting_date, `tabSales Invoice`.posting_time,
@@ -329,24 +412,58 @@ class GrossProfitGenerator(object):
 			where
 				`tabSales Invoice`.docstatus=1 and `tabSales Invoice`.is_opening!='Yes' {conditions} {match_cond}
 			order by
-				`tabSales Invoice`.posting_date desc, `tabSales Invoice`.posting_time desc"""
-			.format(conditions=conditions, sales_person_cols=sales_person_cols,
-				sales_team_table=sales_team_table, match_cond = get_match_cond('Sales Invoice')), self.filters, as_dict=1)
+				`tabSales Invoice`.posting_date desc, `tabSales Invoice`.posting_time desc,
+				`tabSales Invoice Item`.name {sales_team_order}
+			limit %(start)s, %(page_length)s""".format(conditions=conditions, sales_person_cols=sales_person_cols,
+				sales_team_table=sales_team_table, sales_team_order=sales_team_order,
+				match_cond = get_match_cond('Sales Invoice'))
+
+		start = 0
+		while True:
+			si_list = frappe.db.sql(query, dict(self.filters, start=start, page_length=page_length), as_dict=1)
+			if si_list:
+				yield si_list
+
+			if len(si_list) < page_length:
+				break
+
+			start += page_length
+
+	def load_stock_ledger_entries(self, si_list):
+		"""Index the stock ledger entries of the invoices (or their delivery notes)
+		by (voucher_type, voucher_no, voucher_detail_no, item_code, warehouse), and load
+		the items and warehouses with stock ledger entries of the rows without one"""
+		vouchers = set()
+		for row in si_list:
+			if row.update_stock:
+				vouchers.add(row.parent)
+			elif row.dn_detail:
+				vouchers.add(row.delivery_note)
 
-	def load_stock_ledger_entries(self):
-		res = frappe.db.sql("""select item_code, voucher_type, voucher_no,
-				voucher_detail_no, stock_value, warehouse, actual_qty as qty
+		self.sle = {}
+		self.sle_item_warehouses = set()
+		if not vouchers:
+			return
+
+		for d in frappe.db.sql("""select item_code, voucher_type, voucher_no, voucher_detail_no,
+				stock_value, stock_value_difference, warehouse, actual_qty as qty
 			from `tabStock Ledger Entry`
-			where company=%(company)s
+			where company=%s and voucher_type in ('Sales Invoice', 'Delivery Note') and voucher_no in %s
 			order by
-				item_code desc, warehouse desc, posting_date desc,
-				posting_time desc, creation desc""", self.filters, as_dict=True)
-		self.sle = {}
-		for r in res:
-			if (r.item_code, r.warehouse) not in self.sle:
-				self.sle[(r.item_code, r.warehouse)] = []
+				posting_date desc, posting_time desc, creation desc""",
+			(self.filters.company, list(vouchers)), as_dict=True):
+			self.sle.setdefault((d.voucher_type, d.voucher_no, d.voucher_detail_no, d.item_code, d.warehouse), d)
+
+		item_codes = set()
+		for row in si_list:
+			if row.update_stock or row.dn_detail:
+				item_codes.update(item_code for item_code in self.get_row_item_codes(row)
+					if not self.get_stock_ledger_entry(row, item_code))
 
-			self.sle[(r.item_code, r.warehouse)].append(r)
+		if item_codes:
+			self.sle_item_warehouses = set(frappe.db.sql("""select distinct item_code, warehouse
+				from `tabStock Ledger Entry` where company=%s and item_code in %s""",
+				(self.filters.company, list(item_codes))))
 
 	def load_product_bundle(self):
 		self.product_bundles = {}
@@ -358,5 +475,5 @@ class GrossProfitGenerator(object):
 				frappe._dict()).setdefault(d.parent_item, []).append(d)
 
 	def load_non_stock_items(self):
-		self.non_stock_items = frappe.db.sql_list("""select name from tabItem
-			where is_stock_item=0""")
+		self.non_stock_items = set(frappe.db.sql_list("""select name from tabItem
+			where is_stock_item=0"""))
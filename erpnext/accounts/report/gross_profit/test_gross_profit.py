@@ -0,0 +1,54 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+from frappe.utils import add_days, nowdate
+from erpnext.accounts.report.gross_profit.gross_profit import execute
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.delivery_note.delivery_note import make_sales_invoice
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+
+class TestGrossProfit(unittest.TestCase):
+	def test_buying_amount(self):
+		item_code = "_Test Gross Profit Item {0}".format(frappe.generate_hash(length=5))
+		make_item(item_code, {"is_stock_item": 1, "valuation_method": "FIFO"})
+
+		for days, rate in ((-3, 100), (-2, 150)):
+			make_stock_entry(item_code=item_code, target="_Test Warehouse - _TC", qty=10,
+				basic_rate=rate, posting_date=add_days(nowdate(), days))
+
+		# 5 @ 100 delivered by the delivery note of the invoice
+		dn = create_delivery_note(item_code=item_code, qty=5, rate=300)
+		dn_invoice = make_sales_invoice(dn.name)
+		dn_invoice.insert()
+		dn_invoice.submit()
+
+		# 5 @ 100 and 5 @ 150 delivered by the invoice
+		stock_invoice = create_sales_invoice(item_code=item_code, qty=10, rate=300, update_stock=1)
+
+		# not delivered, at the incoming rate of the remaining 5 @ 150
+		invoice = create_sales_invoice(item_code=item_code, qty=2, rate=300)
+
+		filters = frappe._dict({
+			"company": "_Test Company",
+			"from_date": add_days(nowdate(), -3),
+			"to_date": nowdate(),
+			"item_code": item_code
+		})
+
+		filters.group_by = "Invoice"
+		buying_amounts = {row[0]: row[14] for row in execute(filters)[1]}
+		self.assertEqual(buying_amounts, {
+			dn_invoice.name: 500,
+			stock_invoice.name: 1250,
+			invoice.name: 300
+		})
+
+		filters.group_by = "Item Code"
+		data = execute(filters)[1]
+		self.assertEqual(len(data), 1)
+		self.assertEqual((data[0][0], data[0][4], data[0][8]), (item_code, 17, 2050))
@@ -0,0 +1,42 @@
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import add_days, nowdate
+from erpnext.accounts.utils import get_fiscal_year
+from erpnext.accounts.report.financial_statements import (get_period_list, set_gl_entries_by_account,
+	calculate_values)
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+
+class TestProfitAndLossStatement(unittest.TestCase):
+	def test_entries_summed_up_by_period(self):
+		for days in (0, -1, -40):
+			make_journal_entry("_Test Bank - _TC", "_Test Account Sales - _TC", 100,
+				posting_date=add_days(nowdate(), days), submit=True)
+
+		fiscal_year = get_fiscal_year(nowdate(), company="_Test Company")[0]
+		filters = frappe._dict({
+			"company": "_Test Company",
+			"from_fiscal_year": fiscal_year,
+			"to_fiscal_year": fiscal_year
+		})
+
+		period_list = get_period_list(fiscal_year, fiscal_year, None, None, "Fiscal Year", "Monthly",
+			company=filters.company)
+		root_lft, root_rgt = frappe.db.get_value("Account", "Income - _TC", ["lft", "rgt"])
+
+		values = []
+		for summed_up_period_list in (None, period_list):
+			gl_entries_by_account, accounts_by_name = {}, {}
+			set_gl_entries_by_account(filters.company, period_list[0]["year_start_date"],
+				period_list[-1]["to_date"], root_lft, root_rgt, filters, gl_entries_by_account,
+				ignore_closing_entries=True, period_list=summed_up_period_list)
+
+			for account in gl_entries_by_account:
+				accounts_by_name[account] = frappe._dict()
+
+			calculate_values(accounts_by_name, gl_entries_by_account, period_list, False, True)
+			values.append(accounts_by_name)
+
+		self.assertTrue(values[0].get("_Test Account Sales - _TC"))
+		self.assertEqual(values[0], values[1])
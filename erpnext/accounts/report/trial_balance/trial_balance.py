@@ -4,9 +4,11 @@
 from __future__ import unicode_literals
 import frappe, erpnext
 from frappe import _
-from frappe.utils import flt, getdate, formatdate, cstr
+from frappe.utils import flt, getdate, formatdate, cstr, add_days
 from erpnext.accounts.report.financial_statements \
-	import filter_accounts, set_gl_entries_by_account, filter_out_zero_value_rows
+	import filter_accounts, set_gl_entries_by_account, filter_out_zero_value_rows, can_use_gl_balance
+from erpnext.accounts.doctype.gl_balance.gl_balance import get_gl_balance_query
+from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import get_previous_closing
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions, get_dimension_with_children
 
 value_fields = ("opening_debit", "opening_credit", "debit", "credit", "closing_debit", "closing_credit")
@@ -70,7 +72,8 @@ def get_data(filters):
 
 	opening_balances = get_opening_balances(filters)
 	set_gl_entries_by_account(filters.company, filters.from_date,
-		filters.to_date, min_lft, max_rgt, filters, gl_entries_by_account, ignore_closing_entries=not flt(filters.with_period_closing_entry))
+		filters.to_date, min_lft, max_rgt, filters, gl_entries_by_account, ignore_closing_entries=not flt(filters.with_period_closing_entry),
+		use_gl_balance=True)
 
 	total_row = calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency)
 	accumulate_values_into_parents(accounts, accounts_by_name)
@@ -89,13 +92,13 @@ def get_opening_balances(filters):
 
 
 def get_rootwise_opening_balances(filters, report_type):
-	additional_conditions = ""
+	additional_conditions, date_conditions = "", ""
 	if not filters.show_unclosed_fy_pl_balances:
-		additional_conditions = " and posting_date >= %(year_start_date)s" \
+		date_conditions = " and posting_date >= %(year_start_date)s" \
 			if report_type == "Profit and Loss" else ""
 
 	if not flt(filters.with_period_closing_entry):
-		additional_conditions += " and ifnull(voucher_type, '')!='Period Closing Voucher'"
+		date_conditions += " and ifnull(voucher_type, '')!='Period Closing Voucher'"
 
 	if filters.cost_center:
 		lft, rgt = frappe.db.get_value('Cost Center', filters.cost_center, ['lft', 'rgt'])
@@ -134,16 +137,55 @@ def get_rootwise_opening_balances(filters, report_type):
 					dimension.fieldname: filters.get(dimension.fieldname)
 				})
 
+	# balances up to the latest period closing before the from date are read from its closing
+	# balances, only the entries posted after the closing are summed up
+	closing = None
+	if (report_type == "Balance Sheet" or filters.show_unclosed_fy_pl_balances) \
+		and not frappe.flags.ignore_closing_balances:
+		closing = get_previous_closing(filters.company, filters.from_date)
+
+	queries = []
+	if closing:
+		query_filters.update({
+			"period_closing_voucher": closing.name,
+			"closing_date": closing.posting_date
+		})
+
+		queries.append("""
+			select
+				account, debit, credit
+			from `tabAccount Closing Balance`
+			where
+				period_closing_voucher=%(period_closing_voucher)s
+				and company=%(company)s
+				{additional_conditions}
+				and account in (select name from `tabAccount` where report_type=%(report_type)s)""".format(
+				additional_conditions=("" if flt(filters.with_period_closing_entry) else " and is_period_closing = 0 ")
+					+ additional_conditions))
+
+	if can_use_gl_balance(filters):
+		queries.append(get_opening_balances_query_from_gl_balance(filters, report_type, additional_conditions,
+			closing))
+	else:
+		if closing:
+			date_conditions += " and posting_date > %(closing_date)s"
+
+		queries.append("""
+			select
+				account, debit, credit
+			from `tabGL Entry`
+			where
+				company=%(company)s
+				{additional_conditions}
+				and (posting_date < %(from_date)s or ifnull(is_opening, 'No') = 'Yes')
+				and account in (select name from `tabAccount` where report_type=%(report_type)s)""".format(
+				additional_conditions=date_conditions + additional_conditions))
+
 	gle = frappe.db.sql("""
 		select
 			account, sum(debit) as opening_debit, sum(credit) as opening_credit
-		from `tabGL Entry`
-		where
-			company=%(company)s
-			{additional_conditions}
-			and (posting_date < %(from_date)s or ifnull(is_opening, 'No') = 'Yes')
-			and account in (select name from `tabAccount` where report_type=%(report_type)s)
-		group by account""".format(additional_conditions=additional_conditions), query_filters , as_dict=True)
+		from ({query}) gle
+		group by account""".format(query=" union all ".join(queries)), query_filters, as_dict=True)
 
 	opening = frappe._dict()
 	for d in gle:
@@ -151,6 +193,26 @@ def get_rootwise_opening_balances(filters, report_type):
 
 	return opening
 
+def get_opening_balances_query_from_gl_balance(filters, report_type, additional_conditions, closing=None):
+	"""Opening balances from the monthly totals in GL Balance, entries before the from date
+	(and after the closing, if any) and opening entries after it"""
+	conditions = """ and company=%(company)s {0}
+		and account in (select name from `tabAccount` where report_type=%(report_type)s)""".format(additional_conditions)
+
+	from_date = None
+	if closing:
+		from_date = add_days(closing.posting_date, 1)
+	elif not filters.show_unclosed_fy_pl_balances and report_type == "Profit and Loss":
+		from_date = filters.year_start_date
+
+	ignore_closing_entries = not flt(filters.with_period_closing_entry)
+	return " union all ".join([
+		get_gl_balance_query("account, debit, credit", conditions, from_date=from_date,
+			to_date=add_days(filters.from_date, -1), ignore_closing_entries=ignore_closing_entries),
+		get_gl_balance_query("account, debit, credit", conditions + " and ifnull(is_opening, 'No') = 'Yes'",
+			from_date=filters.from_date, ignore_closing_entries=ignore_closing_entries)
+	])
+
 def calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency):
 	init = {
 		"opening_debit": 0.0,
@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 import frappe
 from erpnext import get_company_currency, get_default_company
-from erpnext.setup.utils import get_exchange_rate
+from erpnext.setup.utils import get_exchange_rate, get_exchange_rates
 from erpnext.accounts.doctype.fiscal_year.fiscal_year import get_from_and_to_date
 from frappe.utils import cint, get_datetime_str, formatdate, flt
 
@@ -74,6 +74,22 @@ def get_rate_as_at(date, from_currency, to_currency):
 	return rate
 
 
+def set_rates_as_at(keys):
+	"""
+	Gets exchange rates of (date, from_currency, to_currency) `keys` that are not memoised
+	in `__exchange_rates` at once, with one query per currency pair.
+	:param keys: list of (date, from_currency, to_currency)
+	"""
+	keys = [key for key in set(keys) if '{1}-{2}@{0}'.format(*key) not in __exchange_rates]
+	if not keys:
+		return
+
+	rates = get_exchange_rates([(from_currency, to_currency, date) for date, from_currency, to_currency in keys])
+	for date, from_currency, to_currency in keys:
+		__exchange_rates['{0}-{1}@{2}'.format(from_currency, to_currency, date)] = \
+			rates[(from_currency, to_currency, date)] or 1
+
+
 def is_p_or_l_account(account_name):
 	"""
 	Check if the given `account name` is an `Account` with `root_type` of either 'Income'
@@ -96,6 +112,9 @@ def convert_to_presentation_currency(gl_entries, currency_info):
 	presentation_currency = currency_info['presentation_currency']
 	company_currency = currency_info['company_currency']
 
+	set_rates_as_at([(get_conversion_date(entry, currency_info), presentation_currency, company_currency)
+		for entry in gl_entries if entry['account_currency'] != presentation_currency])
+
 	for entry in gl_entries:
 		account = entry['account']
 		debit = flt(entry['debit'])
@@ -107,7 +126,7 @@ def convert_to_presentation_currency(gl_entries, currency_info):
 		if account_currency != presentation_currency:
 			value = debit or credit
 
-			date = currency_info['report_date'] if not is_p_or_l_account(account) else entry['posting_date']
+			date = get_conversion_date(entry, currency_info)
 			converted_value = convert(value, presentation_currency, company_currency, date)
 
 			if entry.get('debit'):
@@ -128,6 +147,10 @@ def convert_to_presentation_currency(gl_entries, currency_info):
 	return converted_gl_list
 
 
+def get_conversion_date(entry, currency_info):
+	return currency_info['report_date'] if not is_p_or_l_account(entry['account']) else entry['posting_date']
+
+
 def get_appropriate_company(filters):
 	if filters.get('company'):
 		company = filters['company']
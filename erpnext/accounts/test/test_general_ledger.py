@@ -0,0 +1,131 @@
+from __future__ import unicode_literals
+
+import frappe
+import unittest, time
+from frappe.utils import nowdate
+from erpnext.accounts.general_ledger import save_entries, delete_gl_entries, merge_similar_entries
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.tests.utils import benchmark
+
+class TestGeneralLedger(unittest.TestCase):
+	def get_gl_entries(self, voucher_no):
+		return frappe.db.sql("""select account, party_type, party, cost_center, project, against,
+				against_voucher_type, against_voucher, debit, credit, debit_in_account_currency,
+				credit_in_account_currency, account_currency, fiscal_year, is_opening, is_advance,
+				remarks, to_rename, docstatus
+			from `tabGL Entry` where voucher_type='Journal Entry' and voucher_no=%s
+			order by creation""", voucher_no, as_dict=1)
+
+	def test_bulk_gl_entries(self):
+		"""ledger and outstanding amounts of the bulk insert path are the same as the per-row path"""
+		si = create_sales_invoice(rate=500)
+
+		def make_entry():
+			jv = frappe.new_doc("Journal Entry")
+			jv.posting_date = nowdate()
+			jv.company = "_Test Company"
+			jv.user_remark = "test"
+			for amount in (100, 50):
+				jv.append("accounts", {
+					"account": "Debtors - _TC",
+					"party_type": "Customer",
+					"party": "_Test Customer",
+					"reference_type": "Sales Invoice",
+					"reference_name": si.name,
+					"credit_in_account_currency": amount
+				})
+			jv.append("accounts", {"account": "_Test Bank - _TC", "debit_in_account_currency": 120})
+			jv.append("accounts", {"account": "_Test Cash - _TC", "debit_in_account_currency": 30})
+			jv.insert()
+			jv.submit()
+			return jv
+
+		jv = make_entry()
+		bulk_entries = self.get_gl_entries(jv.name)
+		self.assertEqual(frappe.db.get_value("Sales Invoice", si.name, "outstanding_amount"), 350)
+
+		frappe.flags.disable_bulk_gl_entries = True
+		try:
+			jv = make_entry()
+		finally:
+			frappe.flags.disable_bulk_gl_entries = False
+
+		self.assertEqual(self.get_gl_entries(jv.name), bulk_entries)
+		self.assertEqual(frappe.db.get_value("Sales Invoice", si.name, "outstanding_amount"), 200)
+
+	def test_bulk_gl_entries_of_gl_map(self):
+		"""entries saved from a gl map by the bulk insert path are the same as by the per-row path"""
+		entries = []
+		for disable_bulk_gl_entries in (1, 0):
+			voucher_no = "_Test GL Map {0}".format(disable_bulk_gl_entries)
+			gl_map = make_gl_map(voucher_no, 50)
+
+			frappe.flags.disable_bulk_gl_entries = disable_bulk_gl_entries
+			try:
+				save_entries(gl_map, False, "Yes")
+			finally:
+				frappe.flags.disable_bulk_gl_entries = False
+
+			entries.append(self.get_gl_entries(voucher_no))
+			delete_gl_entries(voucher_type="Journal Entry", voucher_no=voucher_no)
+
+		self.assertEqual(len(entries[1]), 50)
+		self.assertEqual(entries[1], entries[0])
+
+	@benchmark
+	def test_bulk_gl_entries_benchmark(self):
+		"""saving a gl map of 500 entries by the per-row path and by the bulk insert path"""
+		timings = []
+		for disable_bulk_gl_entries in (1, 0):
+			voucher_no = "_Test GL Benchmark {0}".format(disable_bulk_gl_entries)
+			gl_map = make_gl_map(voucher_no, 500)
+
+			frappe.flags.disable_bulk_gl_entries = disable_bulk_gl_entries
+			try:
+				start = time.time()
+				save_entries(gl_map, False, "Yes")
+				timings.append(time.time() - start)
+			finally:
+				frappe.flags.disable_bulk_gl_entries = False
+				frappe.db.rollback()
+
+		print("\nGL entries of a gl map of 500 entries, per row: {0:.3f}s, in bulk: {1:.3f}s".format(*timings))
+
+	def test_merge_similar_entries(self):
+		gl_map = []
+		for i in range(1000):
+			gl_map.append(frappe._dict({
+				"company": "_Test Company",
+				"account": "_Test Account Sales - _TC",
+				"cost_center": "_Test Cost Center - _TC" if i % 2 else "_Test Cost Center 2 - _TC",
+				"project": "_Test Project" if i % 3 else None,
+				"credit": 1,
+				"credit_in_account_currency": 1
+			}))
+
+		merged_gl_map = merge_similar_entries(gl_map)
+		self.assertEqual([(d.cost_center, d.project, d.credit) for d in merged_gl_map], [
+			("_Test Cost Center 2 - _TC", None, 167),
+			("_Test Cost Center - _TC", "_Test Project", 333),
+			("_Test Cost Center 2 - _TC", "_Test Project", 333),
+			("_Test Cost Center - _TC", None, 167)
+		])
+
+def make_gl_map(voucher_no, count):
+	gl_map = []
+	for i in range(count):
+		gl_map.append(frappe._dict({
+			"company": "_Test Company",
+			"posting_date": nowdate(),
+			"voucher_type": "Journal Entry",
+			"voucher_no": voucher_no,
+			"account": "_Test Bank - _TC" if i % 2 else "_Test Cash - _TC",
+			"debit": 10 if i % 2 else 0,
+			"credit": 0 if i % 2 else 10,
+			"debit_in_account_currency": 10 if i % 2 else 0,
+			"credit_in_account_currency": 0 if i % 2 else 10,
+			"remarks": "Entry {0}".format(i),
+			"is_opening": "No"
+		}))
+
+	return gl_map
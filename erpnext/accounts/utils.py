@@ -15,6 +15,9 @@ from erpnext.accounts.doctype.account.account import get_account_currency
 
 from erpnext.stock.utils import get_stock_value_on
 from erpnext.stock import get_warehouse_account_map
+from erpnext.accounts.period_index import find_fiscal_year
+from erpnext.accounts.doctype.gl_balance.gl_balance import is_gl_balance_valid, get_gl_balance_query
+from erpnext.accounts.doctype.payment_ledger_entry.payment_ledger_entry import rebuild_payment_ledger
 
 
 class FiscalYearError(frappe.ValidationError): pass
@@ -24,56 +27,12 @@ def get_fiscal_year(date=None, fiscal_year=None, label="Date", verbose=1, compan
 	return get_fiscal_years(date, fiscal_year, label, verbose, company, as_dict=as_dict)[0]
 
 def get_fiscal_years(transaction_date=None, fiscal_year=None, label="Date", verbose=1, company=None, as_dict=False):
-	fiscal_years = frappe.cache().hget("fiscal_years", company) or []
-
-	if not fiscal_years:
-		# if year start date is 2012-04-01, year end date should be 2013-03-31 (hence subdate)
-		cond = ""
-		if fiscal_year:
-			cond += " and fy.name = {0}".format(frappe.db.escape(fiscal_year))
-		if company:
-			cond += """
-				and (not exists (select name
-					from `tabFiscal Year Company` fyc
-					where fyc.parent = fy.name)
-				or exists(select company
-					from `tabFiscal Year Company` fyc
-					where fyc.parent = fy.name
-					and fyc.company=%(company)s)
-				)
-			"""
-
-		fiscal_years = frappe.db.sql("""
-			select
-				fy.name, fy.year_start_date, fy.year_end_date
-			from
-				`tabFiscal Year` fy
-			where
-				disabled = 0 {0}
-			order by
-				fy.year_start_date desc""".format(cond), {
-				"company": company
-			}, as_dict=True)
-
-		frappe.cache().hset("fiscal_years", company, fiscal_years)
-
-	if transaction_date:
-		transaction_date = getdate(transaction_date)
-
-	for fy in fiscal_years:
-		matched = False
-		if fiscal_year and fy.name == fiscal_year:
-			matched = True
-
-		if (transaction_date and getdate(fy.year_start_date) <= transaction_date
-			and getdate(fy.year_end_date) >= transaction_date):
-			matched = True
-
-		if matched:
-			if as_dict:
-				return (fy,)
-			else:
-				return ((fy.name, fy.year_start_date, fy.year_end_date),)
+	fy = find_fiscal_year(transaction_date, fiscal_year, company)
+	if fy:
+		if as_dict:
+			return (fy,)
+		else:
+			return ((fy.name, fy.year_start_date, fy.year_end_date),)
 
 	error_msg = _("""{0} {1} not in any active Fiscal Year.""").format(label, formatdate(transaction_date))
 	if verbose==1: frappe.msgprint(error_msg)
@@ -102,9 +61,10 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 		cost_center = frappe.form_dict.get("cost_center")
 
 
-	cond = []
+	cond, date_cond = [], []
+	to_date, from_date = date, None
 	if date:
-		cond.append("posting_date <= %s" % frappe.db.escape(cstr(date)))
+		date_cond.append("posting_date <= %s" % frappe.db.escape(cstr(date)))
 	else:
 		# get balance of all entries that exist
 		date = nowdate()
@@ -151,7 +111,8 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 
 		if report_type == 'Profit and Loss':
 			# for pl accounts, get balance within a fiscal year
-			cond.append("posting_date >= '%s' and voucher_type != 'Period Closing Voucher'" \
+			from_date = year_start_date
+			date_cond.append("posting_date >= '%s' and voucher_type != 'Period Closing Voucher'" \
 				% year_start_date)
 		# different filter for group and ledger - improved performance
 		if acc.is_group:
@@ -179,10 +140,20 @@ def get_balance_on(account=None, date=None, party_type=None, party=None, company
 			select_field = "sum(debit_in_account_currency) - sum(credit_in_account_currency)"
 		else:
 			select_field = "sum(debit) - sum(credit)"
-		bal = frappe.db.sql("""
-			SELECT {0}
-			FROM `tabGL Entry` gle
-			WHERE {1}""".format(select_field, " and ".join(cond)))[0][0]
+
+		if is_gl_balance_valid():
+			# full months from GL Balance
+			query = get_gl_balance_query("debit, credit, debit_in_account_currency, credit_in_account_currency",
+				"".join(" and " + c for c in cond), from_date=from_date, to_date=to_date,
+				ignore_closing_entries=bool(from_date))
+			bal = frappe.db.sql("""
+				SELECT {0}
+				FROM ({1}) gle""".format(select_field, query))[0][0]
+		else:
+			bal = frappe.db.sql("""
+				SELECT {0}
+				FROM `tabGL Entry` gle
+				WHERE {1}""".format(select_field, " and ".join(date_cond + cond) or "1=1"))[0][0]
 
 		# if bal is None, return 0
 		return flt(bal)
@@ -489,12 +460,13 @@ def unlink_ref_doc_from_payment_entries(ref_doc):
 	remove_ref_doc_link_from_jv(ref_doc.doctype, ref_doc.name)
 	remove_ref_doc_link_from_pe(ref_doc.doctype, ref_doc.name)
 
-	frappe.db.sql("""update `tabGL Entry`
-		set against_voucher_type=null, against_voucher=null,
-		modified=%s, modified_by=%s
-		where against_voucher_type=%s and against_voucher=%s
-		and voucher_no != ifnull(against_voucher, '')""",
-		(now(), frappe.session.user, ref_doc.doctype, ref_doc.name))
+	for doctype in ("GL Entry", "Payment Ledger Entry"):
+		frappe.db.sql("""update `tab{0}`
+			set against_voucher_type=null, against_voucher=null,
+			modified=%s, modified_by=%s
+			where against_voucher_type=%s and against_voucher=%s
+			and voucher_no != ifnull(against_voucher, '')""".format(doctype),
+			(now(), frappe.session.user, ref_doc.doctype, ref_doc.name))
 
 	if ref_doc.doctype in ("Sales Invoice", "Purchase Invoice"):
 		ref_doc.set("advances", [])
@@ -564,6 +536,14 @@ def fix_total_debit_credit():
 				(dr_or_cr, dr_or_cr, '%s', '%s', '%s', dr_or_cr),
 				(d.diff, d.voucher_type, d.voucher_no))
 
+			rebuild_payment_ledger(d.voucher_type, d.voucher_no)
+
+	if vouchers:
+		from erpnext.accounts.doctype.gl_balance.gl_balance import invalidate_gl_balances
+		from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import invalidate_closing_balances
+		invalidate_gl_balances()
+		invalidate_closing_balances()
+
 def get_stock_and_account_balance(account=None, posting_date=None, company=None):
 	if not posting_date: posting_date = nowdate()
 
@@ -660,7 +640,7 @@ def get_outstanding_invoices(party_type, party, account, condition=None, filters
 			voucher_no, voucher_type, posting_date, due_date,
 			ifnull(sum({dr_or_cr}), 0) as invoice_amount
 		from
-			`tabGL Entry`
+			`tabPayment Ledger Entry`
 		where
 			party_type = %(party_type)s and party = %(party)s
 			and account = %(account)s and {dr_or_cr} > 0
@@ -681,7 +661,7 @@ def get_outstanding_invoices(party_type, party, account, condition=None, filters
 	payment_entries = frappe.db.sql("""
 		select against_voucher_type, against_voucher,
 			ifnull(sum({payment_dr_or_cr}), 0) as payment_amount
-		from `tabGL Entry`
+		from `tabPayment Ledger Entry`
 		where party_type = %(party_type)s and party = %(party)s
 			and account = %(account)s
 			and {payment_dr_or_cr} > 0
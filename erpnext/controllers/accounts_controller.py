@@ -261,6 +261,9 @@ class AccountsController(TransactionBase):
 			if self.doctype == "Quotation" and self.quotation_to == "Customer" and parent_dict.get("party_name"):
 				parent_dict.update({"customer": parent_dict.get("party_name")})
 
+			# matching pricing rules are memoised for the pass over the items
+			self.flags.pricing_rule_cache = frappe._dict()
+
 			for item in self.get("items"):
 				if item.get("item_code"):
 					args = parent_dict.copy()
@@ -300,6 +303,8 @@ class AccountsController(TransactionBase):
 					if ret.get("pricing_rules"):
 						self.apply_pricing_rule_on_items(item, ret)
 
+			self.flags.pricing_rule_cache = None
+
 			if self.doctype == "Purchase Invoice":
 				self.set_expense_account(for_validate)
 
@@ -14,7 +14,7 @@ from erpnext.stock.doctype.stock_entry.stock_entry import get_used_alternative_i
 from erpnext.stock.doctype.serial_no.serial_no import get_auto_serial_nos, auto_make_serial_nos, get_serial_nos
 from frappe.contacts.doctype.address.address import get_address_display
 
-from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget
+from erpnext.accounts.doctype.budget.budget import validate_expenses_against_budget
 from erpnext.controllers.stock_controller import StockController
 
 class BuyingController(StockController):
@@ -655,6 +655,7 @@ class BuyingController(StockController):
 
 	def validate_budget(self):
 		if self.docstatus == 1:
+			args_list = []
 			for data in self.get('items'):
 				args = data.as_dict()
 				args.update({
@@ -664,7 +665,9 @@ class BuyingController(StockController):
 						if self.doctype == 'Material Request' else self.transaction_date)
 				})
 
-				validate_expense_against_budget(args)
+				args_list.append(args)
+
+			validate_expenses_against_budget(args_list)
 
 	def process_fixed_asset(self):
 		if self.doctype == 'Purchase Invoice' and not self.update_stock:
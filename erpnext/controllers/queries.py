@@ -308,31 +308,32 @@ def get_batch_no(doctype, txt, searchfield, start, page_len, filters):
 		"page_len": page_len
 	}
 
-	having_clause = "having sum(sle.actual_qty) > 0"
+	qty_condition = "and batch_bin.actual_qty > 0"
 	if filters.get("is_return"):
-		having_clause = ""
+		qty_condition = ""
 
 	if args.get('warehouse'):
-		batch_nos = frappe.db.sql("""select sle.batch_no, round(sum(sle.actual_qty),2), sle.stock_uom,
+		# qty of the batch in the warehouse kept in Batch Bin by the stock ledger
+		batch_nos = frappe.db.sql("""select batch_bin.batch_no, round(batch_bin.actual_qty, 2), batch.stock_uom,
 				concat('MFG-',batch.manufacturing_date), concat('EXP-',batch.expiry_date)
-			from `tabStock Ledger Entry` sle
-				INNER JOIN `tabBatch` batch on sle.batch_no = batch.name
+			from `tabBatch Bin` batch_bin
+				INNER JOIN `tabBatch` batch on batch_bin.batch_no = batch.name
 			where
 				batch.disabled = 0
-				and sle.item_code = %(item_code)s
-				and sle.warehouse = %(warehouse)s
-				and (sle.batch_no like %(txt)s
+				and batch_bin.item_code = %(item_code)s
+				and batch_bin.warehouse = %(warehouse)s
+				and (batch_bin.batch_no like %(txt)s
 				or batch.expiry_date like %(txt)s
 				or batch.manufacturing_date like %(txt)s)
 				and batch.docstatus < 2
+				{qty_condition}
 				{cond}
 				{match_conditions}
-			group by batch_no {having_clause}
-			order by batch.expiry_date, sle.batch_no desc
+			order by batch.expiry_date, batch_bin.batch_no desc
 			limit %(start)s, %(page_len)s""".format(
 				cond=cond,
 				match_conditions=get_match_cond(doctype),
-				having_clause = having_clause
+				qty_condition=qty_condition
 			), args)
 
 		return batch_nos
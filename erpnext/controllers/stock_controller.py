@@ -11,6 +11,8 @@ from erpnext.accounts.general_ledger import make_gl_entries, delete_gl_entries,
 from erpnext.controllers.accounts_controller import AccountsController
 from erpnext.stock.stock_ledger import get_valuation_rate
 from erpnext.stock import get_warehouse_account_map
+from erpnext.accounts.doctype.gl_balance.gl_balance import reverse_gl_balances
+from erpnext.accounts.doctype.payment_ledger_entry.payment_ledger_entry import delete_payment_ledger_entries
 
 class QualityInspectionRequiredError(frappe.ValidationError): pass
 class QualityInspectionRejectedError(frappe.ValidationError): pass
@@ -35,7 +37,7 @@ class StockController(AccountsController):
 					gl_entries = self.get_gl_entries(warehouse_account)
 				make_gl_entries(gl_entries, from_repost=from_repost)
 
-			if (repost_future_gle or self.flags.repost_future_gle):
+			if (repost_future_gle or self.flags.repost_future_gle) and not self.flags.future_repost_queued:
 				items, warehouses = self.get_items_and_warehouses()
 				update_gl_entries_after(self.posting_date, self.posting_time, warehouses, items,
 					warehouse_account, company=self.company)
@@ -276,7 +278,9 @@ class StockController(AccountsController):
 	def make_sl_entries(self, sl_entries, is_amended=None, allow_negative_stock=False,
 			via_landed_cost_voucher=False):
 		from erpnext.stock.stock_ledger import make_sl_entries
-		make_sl_entries(sl_entries, is_amended, allow_negative_stock, via_landed_cost_voucher)
+		if make_sl_entries(sl_entries, is_amended, allow_negative_stock, via_landed_cost_voucher):
+			# future entries and their gl entries are reposted by Repost Item Valuation
+			self.flags.future_repost_queued = True
 
 	def make_gl_entries_on_cancel(self, repost_future_gle=True):
 		if frappe.db.sql("""select name from `tabGL Entry` where voucher_type=%s
@@ -390,6 +394,8 @@ class StockController(AccountsController):
 def update_gl_entries_after(posting_date, posting_time, for_warehouses=None, for_items=None,
 		warehouse_account=None, company=None):
 	def _delete_gl_entries(voucher_type, voucher_no):
+		reverse_gl_balances(voucher_type, voucher_no)
+		delete_payment_ledger_entries(voucher_type, voucher_no)
 		frappe.db.sql("""delete from `tabGL Entry`
 			where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
 
@@ -157,6 +157,10 @@ class calculate_taxes_and_totals(object):
 		if not any((cint(tax.included_in_print_rate) for tax in self.doc.get("taxes"))):
 			return
 
+		if not frappe.flags.disable_tax_arrays:
+			self.determine_exclusive_rate_in_arrays()
+			return
+
 		for item in self.doc.get("items"):
 			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
 			cumulated_tax_fraction = 0
@@ -172,17 +176,84 @@ class calculate_taxes_and_totals(object):
 
 				cumulated_tax_fraction += tax.tax_fraction_for_current_item
 
-			if cumulated_tax_fraction and not self.discount_amount_applied and item.qty:
-				item.net_amount = flt(item.amount / (1 + cumulated_tax_fraction))
-				item.net_rate = flt(item.net_amount / item.qty, item.precision("net_rate"))
-				item.discount_percentage = flt(item.discount_percentage,
-					item.precision("discount_percentage"))
+			self.set_exclusive_net_amount(item, cumulated_tax_fraction)
+
+	def determine_exclusive_rate_in_arrays(self):
+		"""Same as the per item calculation of `determine_exclusive_rate`, with the fractions of
+		each tax computed for all the items at once, in the same order of operations"""
+		items, taxes = self.doc.get("items"), self.doc.get("taxes")
+		item_tax_maps = self.get_item_tax_maps()
+
+		tax_fractions, grand_total_fractions = [], []
+		cumulated_tax_fractions = [0] * len(items)
+
+		for i, tax in enumerate(taxes):
+			current_tax_fractions = [0] * len(items)
+
+			if cint(tax.included_in_print_rate):
+				tax_rates = self.get_tax_rates(tax, item_tax_maps)
+
+				if tax.charge_type == "On Net Total":
+					current_tax_fractions = [tax_rate / 100.0 for tax_rate in tax_rates]
+
+				elif tax.charge_type == "On Previous Row Amount":
+					current_tax_fractions = [(tax_rate / 100.0) * fraction for tax_rate, fraction
+						in zip(tax_rates, tax_fractions[cint(tax.row_id) - 1])]
+
+				elif tax.charge_type == "On Previous Row Total":
+					current_tax_fractions = [(tax_rate / 100.0) * fraction for tax_rate, fraction
+						in zip(tax_rates, grand_total_fractions[cint(tax.row_id) - 1])]
+
+			if getattr(tax, "add_deduct_tax", None):
+				factor = -1.0 if (tax.add_deduct_tax == "Deduct") else 1.0
+				current_tax_fractions = [fraction * factor for fraction in current_tax_fractions]
+
+			if i==0:
+				current_grand_total_fractions = [1 + fraction for fraction in current_tax_fractions]
+			else:
+				current_grand_total_fractions = [grand_total_fraction + fraction for grand_total_fraction, fraction
+					in zip(grand_total_fractions[i-1], current_tax_fractions)]
+
+			cumulated_tax_fractions = [cumulated_tax_fraction + fraction for cumulated_tax_fraction, fraction
+				in zip(cumulated_tax_fractions, current_tax_fractions)]
+
+			tax_fractions.append(current_tax_fractions)
+			grand_total_fractions.append(current_grand_total_fractions)
+
+			# values of the last item, as left by the per item calculation
+			tax.tax_fraction_for_current_item = current_tax_fractions[-1]
+			tax.grand_total_fraction_for_current_item = current_grand_total_fractions[-1]
 
-				self._set_in_company_currency(item, ["net_rate", "net_amount"])
+		for item, cumulated_tax_fraction in zip(items, cumulated_tax_fractions):
+			self.set_exclusive_net_amount(item, cumulated_tax_fraction)
+
+	def set_exclusive_net_amount(self, item, cumulated_tax_fraction):
+		if cumulated_tax_fraction and not self.discount_amount_applied and item.qty:
+			item.net_amount = flt(item.amount / (1 + cumulated_tax_fraction))
+			item.net_rate = flt(item.net_amount / item.qty, item.precision("net_rate"))
+			item.discount_percentage = flt(item.discount_percentage,
+				item.precision("discount_percentage"))
+
+			self._set_in_company_currency(item, ["net_rate", "net_amount"])
 
 	def _load_item_tax_rate(self, item_tax_rate):
 		return json.loads(item_tax_rate) if item_tax_rate else {}
 
+	def get_item_tax_maps(self):
+		"""Returns the item tax maps of the items, parsing each distinct `item_tax_rate` once"""
+		item_tax_maps = {}
+		for item in self.doc.get("items"):
+			if item.item_tax_rate not in item_tax_maps:
+				item_tax_maps[item.item_tax_rate] = self._load_item_tax_rate(item.item_tax_rate)
+
+		return [item_tax_maps[item.item_tax_rate] for item in self.doc.get("items")]
+
+	def get_tax_rates(self, tax, item_tax_maps):
+		"""Returns the rate of `tax` for each item, same as `_get_tax_rate`"""
+		precision = self.doc.precision("rate", tax)
+		return [flt(item_tax_map.get(tax.account_head), precision) if tax.account_head in item_tax_map
+			else tax.rate for item_tax_map in item_tax_maps]
+
 	def get_current_tax_fraction(self, tax, item_tax_map):
 		"""
 			Get tax fraction for calculating tax exclusive amount
@@ -230,6 +301,10 @@ class calculate_taxes_and_totals(object):
 			self.doc.pos_total_qty = self.doc.total_qty
 
 	def calculate_taxes(self):
+		if not frappe.flags.disable_tax_arrays:
+			self.calculate_taxes_in_arrays()
+			return
+
 		self.doc.rounding_adjustment = 0
 		# maintain actual tax rate based on idx
 		actual_tax_dict = dict([[tax.idx, flt(tax.tax_amount, tax.precision("tax_amount"))]
@@ -284,6 +359,101 @@ class calculate_taxes_and_totals(object):
 								- flt(self.doc.discount_amount) - tax.total,
 								self.doc.precision("rounding_adjustment"))
 
+	def calculate_taxes_in_arrays(self):
+		"""Same as the per item calculation of `calculate_taxes`, with the amounts of each tax
+		computed for all the items at once. Amounts are accumulated item by item in the same
+		order, so totals and rounding are the same as the per item calculation"""
+		self.doc.rounding_adjustment = 0
+
+		items, taxes = self.doc.get("items"), self.doc.get("taxes")
+		item_tax_maps = self.get_item_tax_maps()
+		item_keys = [item.item_code or item.item_name for item in items]
+		net_amounts = [item.net_amount for item in items]
+
+		# amount and grand total of each tax for each item
+		tax_amounts, grand_totals = [], []
+
+		for i, tax in enumerate(taxes):
+			tax_rates = self.get_tax_rates(tax, item_tax_maps)
+			current_tax_amounts = self.get_current_tax_amounts(tax, tax_rates, net_amounts, tax_amounts, grand_totals)
+			self.set_item_wise_taxes(tax, item_keys, tax_rates, current_tax_amounts)
+
+			# Adjust divisional loss to the last item
+			if tax.charge_type == "Actual":
+				actual_tax_amount = flt(tax.tax_amount, tax.precision("tax_amount"))
+				for current_tax_amount in current_tax_amounts:
+					actual_tax_amount -= current_tax_amount
+
+				current_tax_amounts = current_tax_amounts[:-1] + [current_tax_amounts[-1] + actual_tax_amount]
+
+			# accumulate tax amount into tax.tax_amount
+			if tax.charge_type != "Actual" and \
+				not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total"):
+					for current_tax_amount in current_tax_amounts:
+						tax.tax_amount += current_tax_amount
+
+			# set tax after discount
+			for current_tax_amount in current_tax_amounts:
+				tax.tax_amount_after_discount_amount += current_tax_amount
+
+			previous_grand_totals = grand_totals[i-1] if i else net_amounts
+			current_grand_totals = [flt(grand_total + self.get_tax_amount_if_for_valuation_or_deduction(current_tax_amount, tax))
+				for grand_total, current_tax_amount in zip(previous_grand_totals, current_tax_amounts)]
+
+			tax_amounts.append(current_tax_amounts)
+			grand_totals.append(current_grand_totals)
+
+			# values of the last item, as left by the per item calculation
+			tax.tax_amount_for_current_item = current_tax_amounts[-1]
+			tax.grand_total_for_current_item = current_grand_totals[-1]
+
+			self.round_off_totals(tax)
+			self.set_cumulative_total(i, tax)
+
+			self._set_in_company_currency(tax,
+				["total", "tax_amount", "tax_amount_after_discount_amount"])
+
+			# adjust Discount Amount loss in last tax iteration
+			if i == (len(taxes) - 1) and self.discount_amount_applied \
+				and self.doc.discount_amount and self.doc.apply_discount_on == "Grand Total":
+					self.doc.rounding_adjustment = flt(self.doc.grand_total
+						- flt(self.doc.discount_amount) - tax.total,
+						self.doc.precision("rounding_adjustment"))
+
+	def get_current_tax_amounts(self, tax, tax_rates, net_amounts, tax_amounts, grand_totals):
+		"""Returns the amount of `tax` for each item, same as `get_current_tax_amount`"""
+		if tax.charge_type == "Actual":
+			# distribute the tax amount proportionally to each item row
+			actual = flt(tax.tax_amount, tax.precision("tax_amount"))
+			return [net_amount*actual / self.doc.net_total if self.doc.net_total else 0.0
+				for net_amount in net_amounts]
+
+		elif tax.charge_type == "On Net Total":
+			return [(tax_rate / 100.0) * net_amount for tax_rate, net_amount in zip(tax_rates, net_amounts)]
+
+		elif tax.charge_type == "On Previous Row Amount":
+			return [(tax_rate / 100.0) * tax_amount for tax_rate, tax_amount
+				in zip(tax_rates, tax_amounts[cint(tax.row_id) - 1])]
+
+		elif tax.charge_type == "On Previous Row Total":
+			return [(tax_rate / 100.0) * grand_total for tax_rate, grand_total
+				in zip(tax_rates, grand_totals[cint(tax.row_id) - 1])]
+
+		elif tax.charge_type == "On Item Quantity":
+			return [tax_rate * item.stock_qty for tax_rate, item in zip(tax_rates, self.doc.get("items"))]
+
+		return [0.0] * len(net_amounts)
+
+	def set_item_wise_taxes(self, tax, item_keys, tax_rates, current_tax_amounts):
+		# store tax breakup for each item, same as `set_item_wise_tax`
+		item_wise_tax_detail = tax.item_wise_tax_detail
+		for key, tax_rate, current_tax_amount in zip(item_keys, tax_rates, current_tax_amounts):
+			item_wise_tax_amount = current_tax_amount*self.doc.conversion_rate
+			if item_wise_tax_detail.get(key):
+				item_wise_tax_amount += item_wise_tax_detail[key][1]
+
+			item_wise_tax_detail[key] = [tax_rate, flt(item_wise_tax_amount)]
+
 	def get_tax_amount_if_for_valuation_or_deduction(self, tax_amount, tax):
 		# if just for valuation, do not add the tax amount in total
 		# if tax/charges is for deduction, multiply by -1
@@ -0,0 +1,120 @@
+from __future__ import unicode_literals
+
+import json
+import unittest
+import frappe
+from erpnext.controllers.taxes_and_totals import calculate_taxes_and_totals
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.doctype.purchase_invoice.test_purchase_invoice import make_purchase_invoice
+
+item_codes = ["_Test Item", "_Test Item 2", "_Test Item Home Desktop 100"]
+
+class TestTaxesAndTotals(unittest.TestCase):
+	def assert_parity(self, make_doc):
+		"""taxes and totals calculated in arrays are the same as calculated per item"""
+		doc = make_doc()
+		calculate_taxes_and_totals(doc)
+
+		frappe.flags.disable_tax_arrays = True
+		try:
+			per_item_doc = make_doc()
+			calculate_taxes_and_totals(per_item_doc)
+		finally:
+			frappe.flags.disable_tax_arrays = False
+
+		self.assertEqual(self.get_values(doc), self.get_values(per_item_doc))
+		for tax, per_item_tax in zip(doc.taxes, per_item_doc.taxes):
+			for fieldname in ("tax_fraction_for_current_item", "grand_total_fraction_for_current_item",
+				"tax_amount_for_current_item", "grand_total_for_current_item"):
+				self.assertEqual(tax.get(fieldname), per_item_tax.get(fieldname))
+
+	def get_values(self, doc):
+		totals = {df.fieldname: doc.get(df.fieldname) for df in doc.meta.fields
+			if df.fieldtype in ("Currency", "Float", "Percent")}
+
+		return totals, [d.as_dict() for d in doc.items], [d.as_dict() for d in doc.taxes]
+
+	def append_items(self, doc, count=300):
+		doc.set("items", [])
+		for i in range(count):
+			doc.append("items", {
+				"item_code": item_codes[i % 3],
+				"qty": (i % 7) + 1,
+				"rate": 100.0 / ((i % 11) + 3),
+				"item_tax_rate": json.dumps({"_Test Account VAT - _TC": 5}) if i % 4 == 0 else None,
+				"income_account": "Sales - _TC",
+				"expense_account": "Cost of Goods Sold - _TC",
+				"cost_center": "_Test Cost Center - _TC"
+			})
+
+	def append_taxes(self, doc, taxes):
+		for idx, tax in enumerate(taxes, 1):
+			tax.setdefault("description", tax["account_head"])
+			tax.setdefault("cost_center", "_Test Cost Center - _TC")
+			tax["idx"] = idx
+			doc.append("taxes", tax)
+
+	def make_sales_invoice(self, discount_amount=0, apply_discount_on=None, included_in_print_rate=0):
+		si = create_sales_invoice(do_not_save=True)
+		self.append_items(si)
+
+		taxes = [
+			{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 12.5},
+			{"charge_type": "On Previous Row Amount", "account_head": "_Test Account Education Cess - _TC",
+				"rate": 2, "row_id": 1},
+			{"charge_type": "On Previous Row Total", "account_head": "_Test Account S&H Education Cess - _TC",
+				"rate": 1, "row_id": 2}
+		]
+
+		if included_in_print_rate:
+			for tax in taxes:
+				tax["included_in_print_rate"] = 1
+		else:
+			taxes.extend([
+				{"charge_type": "Actual", "account_head": "_Test Account Shipping Charges - _TC", "tax_amount": 100.27},
+				{"charge_type": "On Item Quantity", "account_head": "_Test Account Service Tax - _TC", "rate": 0.33}
+			])
+
+		self.append_taxes(si, taxes)
+
+		si.discount_amount = discount_amount
+		si.apply_discount_on = apply_discount_on
+		return si
+
+	def make_purchase_invoice(self):
+		pi = make_purchase_invoice(do_not_save=True)
+		self.append_items(pi)
+
+		self.append_taxes(pi, [
+			{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 12.5,
+				"category": "Total", "add_deduct_tax": "Add"},
+			{"charge_type": "Actual", "account_head": "_Test Account Shipping Charges - _TC", "tax_amount": 77.13,
+				"category": "Valuation", "add_deduct_tax": "Add"},
+			{"charge_type": "On Previous Row Total", "account_head": "_Test Account Discount - _TC", "rate": 3,
+				"row_id": 1, "category": "Total", "add_deduct_tax": "Deduct"},
+			{"charge_type": "On Previous Row Amount", "account_head": "_Test Account Education Cess - _TC",
+				"rate": 2, "row_id": 1, "category": "Valuation and Total", "add_deduct_tax": "Add"}
+		])
+
+		return pi
+
+	def test_exclusive_taxes(self):
+		self.assert_parity(self.make_sales_invoice)
+
+	def test_inclusive_taxes(self):
+		self.assert_parity(lambda: self.make_sales_invoice(included_in_print_rate=1))
+
+	def test_discount_on_grand_total(self):
+		self.assert_parity(lambda: self.make_sales_invoice(discount_amount=333.33,
+			apply_discount_on="Grand Total"))
+
+	def test_discount_on_net_total(self):
+		self.assert_parity(lambda: self.make_sales_invoice(discount_amount=333.33,
+			apply_discount_on="Net Total"))
+
+	def test_inclusive_taxes_with_discount(self):
+		self.assert_parity(lambda: self.make_sales_invoice(discount_amount=111.11,
+			apply_discount_on="Grand Total", included_in_print_rate=1))
+
+	def test_purchase_taxes(self):
+		self.assert_parity(self.make_purchase_invoice)
@@ -0,0 +1,7 @@
+from __future__ import unicode_literals
+import frappe
+from erpnext.stock.doctype.batch_bin.batch_bin import rebuild_batch_bins
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "batch_bin")
+	rebuild_batch_bins()
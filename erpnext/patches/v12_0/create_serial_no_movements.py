@@ -0,0 +1,25 @@
+from __future__ import unicode_literals
+import frappe
+from erpnext.stock.doctype.serial_no_movement.serial_no_movement import make_serial_no_movements
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "serial_no_movement")
+
+	if frappe.db.sql("select name from `tabSerial No Movement` limit 1"):
+		return
+
+	start, page_length = 0, 5000
+	while True:
+		sl_entries = frappe.db.sql("""select serial_no, item_code, warehouse, company, voucher_type,
+				voucher_no, voucher_detail_no, posting_date, posting_time, actual_qty, incoming_rate, is_cancelled
+			from `tabStock Ledger Entry`
+			where ifnull(serial_no, '') != '' and ifnull(is_cancelled, 'No') = 'No'
+			order by name
+			limit %s, %s""", (start, page_length), as_dict=1)
+
+		if not sl_entries:
+			break
+
+		make_serial_no_movements(sl_entries)
+		frappe.db.commit()
+		start += page_length
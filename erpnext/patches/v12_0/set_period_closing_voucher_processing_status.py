@@ -0,0 +1,27 @@
+from __future__ import unicode_literals
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+def execute():
+	frappe.reload_doc("accounts", "doctype", "period_closing_voucher")
+	frappe.reload_doc("accounts", "doctype", "account_closing_balance")
+
+	frappe.db.sql("""update `tabPeriod Closing Voucher`
+		set gl_entry_processing_status = 'Completed' where docstatus = 1""")
+
+	accounting_dimensions = frappe.db.sql("""select fieldname, label, document_type from
+		`tabAccounting Dimension`""", as_dict=1)
+
+	for count, d in enumerate(accounting_dimensions, 1):
+		if frappe.db.get_value("Custom Field", {"dt": "Account Closing Balance", "fieldname": d.fieldname}):
+			continue
+
+		create_custom_field("Account Closing Balance", {
+			"fieldname": d.fieldname,
+			"label": d.label,
+			"fieldtype": "Link",
+			"options": d.document_type,
+			"insert_after": "dimension_col_break" if count % 2 == 0 else "accounting_dimensions_section"
+		})
+
+	frappe.clear_cache(doctype="Account Closing Balance")
@@ -4,6 +4,7 @@ from __future__ import unicode_literals
 import frappe
 import unittest
 from erpnext.regional.report.irs_1099.irs_1099 import execute as execute_1099_report
+from erpnext.accounts.doctype.gl_balance.gl_balance import rebuild_gl_balances
 
 
 class TestUnitedStates(unittest.TestCase):
@@ -38,7 +39,9 @@ def make_payment_entry_to_irs_1099_supplier():
 
     frappe.db.sql("delete from `tabGL Entry` where party='_US 1099 Test Supplier'")
     frappe.db.sql("delete from `tabGL Entry` where against='_US 1099 Test Supplier'")
+    frappe.db.sql("delete from `tabPayment Ledger Entry` where party='_US 1099 Test Supplier'")
     frappe.db.sql("delete from `tabPayment Entry` where party='_US 1099 Test Supplier'")
+    rebuild_gl_balances()
 
     pe = frappe.new_doc("Payment Entry")
     pe.payment_type = "Pay"
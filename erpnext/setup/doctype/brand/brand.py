@@ -11,7 +11,8 @@ class Brand(Document):
 	pass
 
 def get_brand_defaults(item, company):
-	item = frappe.get_cached_doc("Item", item)
+	from erpnext.stock.doctype.item.item import get_prefetched_item
+	item = get_prefetched_item(item) or frappe.get_cached_doc("Item", item)
 	if item.brand:
 		brand = frappe.get_cached_doc("Brand", item.brand)
 
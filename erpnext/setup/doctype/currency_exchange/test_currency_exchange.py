@@ -3,7 +3,7 @@
 from __future__ import unicode_literals
 import frappe, unittest
 from frappe.utils import flt
-from erpnext.setup.utils import get_exchange_rate
+from erpnext.setup.utils import get_exchange_rate, get_exchange_rates
 from frappe.utils import cint
 
 test_records = frappe.get_test_records('Currency Exchange')
@@ -112,3 +112,17 @@ class TestCurrencyExchange(unittest.TestCase):
 		self.clear_cache()
 		exchange_rate = get_exchange_rate("USD", "INR", "2016-01-15", "for_buying")
 		self.assertEqual(flt(exchange_rate, 3), 67.79)
+
+	def test_exchange_rates(self):
+		save_new_records(test_records)
+
+		keys = [("USD", "INR", date) for date in ("2016-01-01", "2016-01-10", "2016-01-15", "2016-01-30", "2016-02-05")]
+		keys += [("INR", "NGN", "2016-01-10"), ("USD", "USD", "2016-01-10")]
+
+		for allow_stale in (1, 0):
+			frappe.db.set_value("Accounts Settings", None, "allow_stale", allow_stale)
+			frappe.db.set_value("Accounts Settings", None, "stale_days", 10)
+
+			exchange_rates = get_exchange_rates(keys, "for_buying")
+			for key in keys:
+				self.assertEqual(exchange_rates[key], get_exchange_rate(*key, args="for_buying"))
@@ -230,7 +230,8 @@ def invalidate_cache_for(doc, item_group=None):
 			clear_cache(frappe.db.get_value('Item Group', item_group_name, 'route'))
 
 def get_item_group_defaults(item, company):
-	item = frappe.get_cached_doc("Item", item)
+	from erpnext.stock.doctype.item.item import get_prefetched_item
+	item = get_prefetched_item(item) or frappe.get_cached_doc("Item", item)
 	item_group = frappe.get_cached_doc("Item Group", item.item_group)
 
 	for d in item_group.item_group_defaults or []:
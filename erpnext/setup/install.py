@@ -25,6 +25,7 @@ def after_install():
 	create_default_success_action()
 	create_default_energy_point_rules()
 	add_company_to_session_defaults()
+	frappe.db.set_default("gl_balance_valid", 1)
 	frappe.db.commit()
 
 
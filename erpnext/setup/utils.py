@@ -4,9 +4,11 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
-from frappe.utils import flt, add_days
+from frappe.utils import flt, cint, add_days, getdate
 from frappe.utils import get_datetime_str, nowdate
 from erpnext import get_default_company
+from bisect import bisect_right
+from six import iteritems
 
 def get_root_of(doctype):
 	"""Get root element of a DocType with a tree structure"""
@@ -114,6 +116,91 @@ def get_exchange_rate(from_currency, to_currency, transaction_date=None, args=No
 		frappe.msgprint(_("Unable to find exchange rate for {0} to {1} for key date {2}. Please create a Currency Exchange record manually").format(from_currency, to_currency, transaction_date))
 		return 0.0
 
+def get_exchange_rates(keys, args=None):
+	"""Returns a dict of exchange rates of (from_currency, to_currency, transaction_date) `keys`,
+	same as `get_exchange_rate` for each key"""
+	return ExchangeRates(args).get_rates(keys)
+
+class ExchangeRates(object):
+	"""Exchange rates as per Currency Exchange and Accounts Settings, as `get_exchange_rate`.
+
+	Currency Exchange records of a currency pair are loaded once for a range of dates and the
+	latest rate on or before a date is looked up with a binary search. Rates not found in
+	Currency Exchange are fetched with `get_exchange_rate`."""
+	def __init__(self, args=None):
+		self.args = args
+		currency_settings = frappe.get_doc("Accounts Settings").as_dict()
+		self.allow_stale_rates = currency_settings.get("allow_stale")
+		self.stale_days = cint(currency_settings.get("stale_days"))
+
+		# (from_currency, to_currency) -> (from_date, to_date), sorted dates and rates
+		self.loaded_periods, self.dates, self.rates = {}, {}, {}
+		self.fetched_rates = {}
+
+	def get_rate(self, from_currency, to_currency, transaction_date=None):
+		key = (from_currency, to_currency, transaction_date)
+		return self.get_rates([key])[key]
+
+	def get_rates(self, keys):
+		dates_by_pair = {}
+		for from_currency, to_currency, transaction_date in keys:
+			if from_currency and to_currency and from_currency != to_currency:
+				dates_by_pair.setdefault((from_currency, to_currency), []).append(
+					getdate(transaction_date or nowdate()))
+
+		for pair, dates in iteritems(dates_by_pair):
+			self.load_rates(pair, min(dates), max(dates))
+
+		return {key: self.get_rate_as_at(*key) for key in keys}
+
+	def load_rates(self, pair, from_date, to_date):
+		period = self.loaded_periods.get(pair)
+		if period:
+			if period[0] <= from_date and to_date <= period[1]:
+				return
+			from_date, to_date = min(period[0], from_date), max(period[1], to_date)
+
+		filters = [
+			["date", "<=", to_date],
+			["from_currency", "=", pair[0]],
+			["to_currency", "=", pair[1]]
+		]
+
+		if self.args == "for_buying":
+			filters.append(["for_buying", "=", "1"])
+		elif self.args == "for_selling":
+			filters.append(["for_selling", "=", "1"])
+
+		if not self.allow_stale_rates:
+			filters.append(["date", ">", add_days(from_date, -self.stale_days)])
+
+		entries = frappe.get_all("Currency Exchange", fields=["date", "exchange_rate"],
+			filters=filters, order_by="date asc")
+
+		self.dates[pair] = [getdate(d.date) for d in entries]
+		self.rates[pair] = [flt(d.exchange_rate) for d in entries]
+		self.loaded_periods[pair] = (from_date, to_date)
+
+	def get_rate_as_at(self, from_currency, to_currency, transaction_date=None):
+		if not (from_currency and to_currency):
+			return
+		if from_currency == to_currency:
+			return 1
+
+		pair, date = (from_currency, to_currency), getdate(transaction_date or nowdate())
+		dates = self.dates[pair]
+
+		# latest rate on or before the date
+		idx = bisect_right(dates, date) - 1
+		if idx >= 0 and (self.allow_stale_rates or dates[idx] > getdate(add_days(date, -self.stale_days))):
+			return self.rates[pair][idx]
+
+		key = (from_currency, to_currency, date)
+		if key not in self.fetched_rates:
+			self.fetched_rates[key] = get_exchange_rate(from_currency, to_currency, date, self.args)
+
+		return self.fetched_rates[key]
+
 def enable_all_roles_and_domains():
 	""" enable all roles and domain for testing """
 	# add all roles to users
@@ -155,22 +155,20 @@ def get_batch_qty(batch_no=None, warehouse=None, item_code=None):
 
 	out = 0
 	if batch_no and warehouse:
-		out = float(frappe.db.sql("""select sum(actual_qty)
-			from `tabStock Ledger Entry`
-			where warehouse=%s and batch_no=%s""",
-			(warehouse, batch_no))[0][0] or 0)
+		out = flt(frappe.db.get_value("Batch Bin", {"batch_no": batch_no, "warehouse": warehouse},
+			"actual_qty"))
 
 	if batch_no and not warehouse:
-		out = frappe.db.sql('''select warehouse, sum(actual_qty) as qty
-			from `tabStock Ledger Entry`
+		out = frappe.db.sql('''select warehouse, actual_qty as qty
+			from `tabBatch Bin`
 			where batch_no=%s
-			group by warehouse''', batch_no, as_dict=1)
+			order by warehouse''', batch_no, as_dict=1)
 
 	if not batch_no and item_code and warehouse:
-		out = frappe.db.sql('''select batch_no, sum(actual_qty) as qty
-			from `tabStock Ledger Entry`
+		out = frappe.db.sql('''select batch_no, actual_qty as qty
+			from `tabBatch Bin`
 			where item_code = %s and warehouse=%s
-			group by batch_no''', (item_code, warehouse), as_dict=1)
+			order by batch_no''', (item_code, warehouse), as_dict=1)
 
 	return out
 
@@ -189,7 +187,7 @@ def split_batch(batch_no, item_code, warehouse, qty, new_batch_id=None):
 	"""Split the batch into a new batch"""
 	batch = frappe.get_doc(dict(doctype='Batch', item=item_code, batch_id=new_batch_id)).insert()
 
-	company = frappe.db.get_value('Stock Ledger Entry', dict(
+	company = frappe.db.get_value('Batch Bin', dict(
 			item_code=item_code,
 			batch_no=batch_no,
 			warehouse=warehouse
@@ -280,12 +278,10 @@ def get_batches(item_code, warehouse, qty=1, throw=False, serial_no=None):
 		cond = " and `tabBatch`.name = %s" %(frappe.db.escape(batch[0].batch_no))
 
 	return frappe.db.sql("""
-		select batch_id, sum(`tabStock Ledger Entry`.actual_qty) as qty
+		select batch_id, `tabBatch Bin`.actual_qty as qty
 		from `tabBatch`
-			join `tabStock Ledger Entry` ignore index (item_code, warehouse)
-				on (`tabBatch`.batch_id = `tabStock Ledger Entry`.batch_no )
-		where `tabStock Ledger Entry`.item_code = %s and `tabStock Ledger Entry`.warehouse = %s
+			join `tabBatch Bin` on (`tabBatch`.batch_id = `tabBatch Bin`.batch_no)
+		where `tabBatch Bin`.item_code = %s and `tabBatch Bin`.warehouse = %s
 			and (`tabBatch`.expiry_date >= CURDATE() or `tabBatch`.expiry_date IS NULL) {0}
-		group by batch_id
 		order by `tabBatch`.expiry_date ASC, `tabBatch`.creation ASC
 	""".format(cond), (item_code, warehouse), as_dict=True)
\ No newline at end of file
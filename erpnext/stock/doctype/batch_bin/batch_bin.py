@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import flt, now
+from frappe.model.document import Document
+
+class BatchBin(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_unique("Batch Bin", ["batch_no", "warehouse"], constraint_name="unique_batch_warehouse")
+	frappe.db.add_index("Batch Bin", ["item_code", "warehouse"])
+
+def update_batch_bins(sl_entries):
+	"""Add the `actual_qty` of the stock ledger entries to the qty of their batch-warehouse,
+	one query for all the entries"""
+	batch_qty = {}
+	for sle in sl_entries:
+		if not sle.get("batch_no") or not flt(sle.get("actual_qty")):
+			continue
+
+		key = (sle.get("batch_no"), sle.get("warehouse"))
+		if key not in batch_qty:
+			batch_qty[key] = frappe._dict({
+				"item_code": sle.get("item_code"),
+				"company": sle.get("company"),
+				"actual_qty": 0.0
+			})
+		batch_qty[key].actual_qty += flt(sle.get("actual_qty"))
+
+	if not batch_qty:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	values = []
+	for (batch_no, warehouse), d in batch_qty.items():
+		values.extend([frappe.generate_hash(txt="", length=10), batch_no, d.item_code, warehouse,
+			d.company, d.actual_qty, timestamp, timestamp, user, user])
+
+	frappe.db.sql("""insert into `tabBatch Bin`
+			(name, batch_no, item_code, warehouse, company, actual_qty, creation, modified, owner, modified_by)
+		values {0}
+		on duplicate key update actual_qty = actual_qty + values(actual_qty), modified = values(modified),
+			modified_by = values(modified_by)""".format(", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch_qty))),
+		tuple(values))
+
+def reverse_batch_bins(voucher_type, voucher_no):
+	"""Remove the qty of the voucher's stock ledger entries from the batch-warehouses,
+	called before the entries are deleted"""
+	sl_entries = frappe.db.sql("""select batch_no, item_code, warehouse, company, -1 * sum(actual_qty) as actual_qty
+		from `tabStock Ledger Entry`
+		where voucher_type=%s and voucher_no=%s and ifnull(batch_no, '') != ''
+		group by batch_no, warehouse""", (voucher_type, voucher_no), as_dict=1)
+
+	update_batch_bins(sl_entries)
+
+def rebuild_batch_bins():
+	"""Recreate the batch-warehouse qty from the stock ledger"""
+	frappe.db.sql("delete from `tabBatch Bin`")
+
+	sl_entries = frappe.db.sql("""select batch_no, item_code, warehouse, company, sum(actual_qty) as actual_qty
+		from `tabStock Ledger Entry`
+		where ifnull(batch_no, '') != ''
+		group by batch_no, warehouse""", as_dict=1)
+
+	for i in range(0, len(sl_entries), 1000):
+		update_batch_bins(sl_entries[i:i + 1000])
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.batch_bin.batch_bin import rebuild_batch_bins
+
+class TestBatchBin(unittest.TestCase):
+	def test_batch_bin_matches_ledger(self):
+		receipt = make_batch_receipt()
+		batch_no, warehouse = receipt.items[0].batch_no, receipt.items[0].warehouse
+
+		self.assertEqual(get_batch_bin_qty(batch_no, warehouse), get_ledger_qty(batch_no, warehouse))
+
+		receipt.cancel()
+		self.assertEqual(get_batch_bin_qty(batch_no, warehouse), 0)
+		self.assertEqual(get_ledger_qty(batch_no, warehouse), 0)
+
+		rebuild_batch_bins()
+		self.assertEqual(get_batch_bin_qty(batch_no, warehouse), 0)
+
+	def test_batch_search_qty(self):
+		from erpnext.controllers.queries import get_batch_no
+
+		receipt = make_batch_receipt(qty=40)
+		batch_no, warehouse = receipt.items[0].batch_no, receipt.items[0].warehouse
+
+		batches = get_batch_no("Batch", batch_no, "name", 0, 20,
+			{"item_code": receipt.items[0].item_code, "warehouse": warehouse})
+		self.assertEqual([(d[0], d[1]) for d in batches], [(batch_no, 40)])
+
+		receipt.cancel()
+		self.assertFalse(get_batch_no("Batch", batch_no, "name", 0, 20,
+			{"item_code": receipt.items[0].item_code, "warehouse": warehouse}))
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+def make_batch_receipt(item_code="ITEM-BATCH-1", qty=100):
+	if not frappe.db.exists("Item", item_code):
+		make_item(item_code, dict(has_batch_no=1, create_new_batch=1, is_stock_item=1))
+
+	receipt = frappe.get_doc(dict(
+		doctype="Purchase Receipt",
+		supplier="_Test Supplier",
+		company="_Test Company",
+		items=[dict(item_code=item_code, qty=qty, rate=10, warehouse="Stores - _TC")]
+	)).insert()
+	receipt.submit()
+
+	return receipt
+
+def get_batch_bin_qty(batch_no, warehouse):
+	return frappe.db.get_value("Batch Bin", {"batch_no": batch_no, "warehouse": warehouse}, "actual_qty") or 0
+
+def get_ledger_qty(batch_no, warehouse):
+	return frappe.db.sql("""select ifnull(sum(actual_qty), 0) from `tabStock Ledger Entry`
+		where batch_no=%s and warehouse=%s""", (batch_no, warehouse))[0][0]
@@ -13,11 +13,14 @@ class Bin(Document):
 			self.stock_uom = frappe.get_cached_value('Item', self.item_code, 'stock_uom')
 		self.set_projected_qty()
 
-	def update_stock(self, args, allow_negative_stock=False, via_landed_cost_voucher=False):
-		'''Called from erpnext.stock.utils.update_bin'''
+	def update_stock(self, args, allow_negative_stock=False, via_landed_cost_voucher=False, repost=True):
+		'''Called from erpnext.stock.utils.update_bin
+
+		If `repost` is False, the caller is responsible for reposting the valuation
+		of future entries (see erpnext.stock.stock_ledger.repost_future_sle)'''
 		self.update_qty(args)
 
-		if args.get("actual_qty") or args.get("voucher_type") == "Stock Reconciliation":
+		if repost and (args.get("actual_qty") or args.get("voucher_type") == "Stock Reconciliation"):
 			from erpnext.stock.stock_ledger import update_entries_after
 
 			if not args.get("posting_date"):
@@ -35,17 +38,21 @@ class Bin(Document):
 			}, allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher)
 
 	def update_qty(self, args):
-		# update the stock values (for current quantities)
-		if args.get("voucher_type")=="Stock Reconciliation":
-			if args.get('is_cancelled') == 'No':
-				self.actual_qty = args.get("qty_after_transaction")
-		else:
-			self.actual_qty = flt(self.actual_qty) + flt(args.get("actual_qty"))
+		self.update_qty_for_entries([args])
 
-		self.ordered_qty = flt(self.ordered_qty) + flt(args.get("ordered_qty"))
-		self.reserved_qty = flt(self.reserved_qty) + flt(args.get("reserved_qty"))
-		self.indented_qty = flt(self.indented_qty) + flt(args.get("indented_qty"))
-		self.planned_qty = flt(self.planned_qty) + flt(args.get("planned_qty"))
+	def update_qty_for_entries(self, args_list):
+		# update the stock values (for current quantities)
+		for args in args_list:
+			if args.get("voucher_type")=="Stock Reconciliation":
+				if args.get('is_cancelled') == 'No':
+					self.actual_qty = args.get("qty_after_transaction")
+			else:
+				self.actual_qty = flt(self.actual_qty) + flt(args.get("actual_qty"))
+
+			self.ordered_qty = flt(self.ordered_qty) + flt(args.get("ordered_qty"))
+			self.reserved_qty = flt(self.reserved_qty) + flt(args.get("reserved_qty"))
+			self.indented_qty = flt(self.indented_qty) + flt(args.get("indented_qty"))
+			self.planned_qty = flt(self.planned_qty) + flt(args.get("planned_qty"))
 
 		self.set_projected_qty()
 		self.db_update()
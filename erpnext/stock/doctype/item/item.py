@@ -488,7 +488,7 @@ class Item(WebsiteGenerator):
 			self.show_in_website = False
 
 	def update_template_tables(self):
-		template = frappe.get_doc("Item", self.variant_of)
+		template = get_prefetched_item(self.variant_of) or frappe.get_doc("Item", self.variant_of)
 
 		# add item taxes from template
 		for d in template.get("taxes"):
@@ -1110,8 +1110,13 @@ def check_stock_uom_with_bin(item, stock_uom):
 		frappe.throw(
 			_("Default Unit of Measure for Item {0} cannot be changed directly because you have already made some transaction(s) with another UOM. You will need to create a new Item to use a different Default UOM.").format(item))
 
+def get_prefetched_item(item_code):
+	"""Returns the Item if it was prefetched by `get_items_details_bulk` for the request"""
+	prefetch = frappe.flags.item_details_prefetch
+	return prefetch.items.get(item_code) if prefetch else None
+
 def get_item_defaults(item_code, company):
-	item = frappe.get_cached_doc('Item', item_code)
+	item = get_prefetched_item(item_code) or frappe.get_cached_doc('Item', item_code)
 
 	out = item.as_dict()
 
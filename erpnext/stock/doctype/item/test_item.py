@@ -5,6 +5,7 @@ from __future__ import unicode_literals
 import unittest
 import frappe
 import json
+import time
 
 from frappe.test_runner import make_test_objects
 from erpnext.controllers.item_variant import (create_variant, ItemVariantExistsError,
@@ -12,7 +13,9 @@ from erpnext.controllers.item_variant import (create_variant, ItemVariantExistsE
 from erpnext.stock.doctype.item.item import StockExistsForTemplate, InvalidBarcode
 from erpnext.stock.doctype.item.item import get_uom_conv_factor
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
-from erpnext.stock.get_item_details import get_item_details
+from erpnext.stock.get_item_details import get_item_details, get_items_details_bulk
+from erpnext.utilities.bulk_insert import bulk_insert
+from erpnext.tests.utils import benchmark
 
 from six import iteritems
 
@@ -101,6 +104,72 @@ class TestItem(unittest.TestCase):
 		for key, value in iteritems(to_check):
 			self.assertEqual(value, details.get(key))
 
+	def get_bulk_item_details_args(self):
+		return {
+			"company": "_Test Company",
+			"price_list": "_Test Price List",
+			"currency": "_Test Currency",
+			"doctype": "Sales Order",
+			"conversion_rate": 1,
+			"price_list_currency": "_Test Currency",
+			"plc_conversion_rate": 1,
+			"order_type": "Sales",
+			"customer": "_Test Customer",
+			"transaction_date": "2017-04-20",
+			"qty": 2
+		}
+
+	def test_get_items_details_bulk(self):
+		make_test_objects("Item Price")
+		make_item_variant()
+
+		item_codes = ["_Test Item", "_Test Item 2", "_Test Item Home Desktop 100",
+			"_Test Non Stock Item", "_Test Variant Item-S", "_Test Item"]
+
+		expected = [get_item_details(dict(self.get_bulk_item_details_args(), item_code=item_code))
+			for item_code in item_codes]
+
+		self.assertEqual(get_items_details_bulk(self.get_bulk_item_details_args(), item_codes), expected)
+		self.assertEqual(expected[0].price_list_rate, 100)
+
+	def test_get_items_details_bulk_without_date(self):
+		"""bulk item details are the same as per item for the current date"""
+		make_test_objects("Item Price")
+
+		args = self.get_bulk_item_details_args()
+		args.pop("transaction_date")
+
+		item_codes = ["_Test Item", "_Test Item 2", "_Test Non Stock Item"]
+		expected = [get_item_details(dict(args, item_code=item_code)) for item_code in item_codes]
+
+		self.assertEqual(get_items_details_bulk(args, item_codes), expected)
+
+	@benchmark
+	def test_get_items_details_bulk_benchmark(self):
+		"""item details of 1000 items per item and in bulk"""
+		item_codes = ["_Test Bulk Details Item {0}".format(i) for i in range(1000)]
+
+		# left by an interrupted run
+		delete_bulk_details_items(item_codes)
+		try:
+			make_bulk_details_items(item_codes)
+
+			args = self.get_bulk_item_details_args()
+			args.pop("transaction_date")
+
+			start = time.time()
+			get_items_details_bulk(args, item_codes)
+			bulk_time = time.time() - start
+
+			start = time.time()
+			for item_code in item_codes:
+				get_item_details(dict(args, item_code=item_code))
+			per_item_time = time.time() - start
+		finally:
+			delete_bulk_details_items(item_codes)
+
+		print("\nItem details of 1000 items per item: {0:.3f}s, in bulk: {1:.3f}s".format(per_item_time, bulk_time))
+
 	def test_item_tax_template(self):
 		expected_item_tax_template = [
 			{"item_code": "_Test Item With Item Tax Template", "tax_category": "",
@@ -515,3 +584,36 @@ def create_item(item_code, is_stock_item=None, valuation_rate=0, warehouse=None,
 	else:
 		item = frappe.get_doc("Item", item_code)
 	return item
+
+def make_bulk_details_items(item_codes):
+	bulk_insert("Item", [{
+		"name": item_code,
+		"item_code": item_code,
+		"item_name": item_code,
+		"description": item_code,
+		"item_group": "_Test Item Group",
+		"stock_uom": "_Test UOM",
+		"is_stock_item": 1,
+		"end_of_life": "2099-12-31"
+	} for item_code in item_codes])
+
+	bulk_insert("Item Default", [{
+		"parent": item_code,
+		"parenttype": "Item",
+		"parentfield": "item_defaults",
+		"idx": 1,
+		"company": "_Test Company",
+		"default_warehouse": "_Test Warehouse - _TC"
+	} for item_code in item_codes])
+
+	bulk_insert("Item Price", [{
+		"item_code": item_code,
+		"item_name": item_code,
+		"price_list": "_Test Price List",
+		"selling": 1,
+		"price_list_rate": 100
+	} for item_code in item_codes])
+
+def delete_bulk_details_items(item_codes):
+	for doctype, fieldname in (("Item Price", "item_code"), ("Item Default", "parent"), ("Item", "name")):
+		frappe.db.sql("""delete from `tab{0}` where {1} in %s""".format(doctype, fieldname), (item_codes,))
@@ -191,25 +191,21 @@ def get_available_item_locations_for_serialized_item(item_code, from_warehouses,
 	return locations
 
 def get_available_item_locations_for_batched_item(item_code, from_warehouses, required_qty, company):
-	warehouse_condition = 'and warehouse in %(warehouses)s' if from_warehouses else ''
+	warehouse_condition = 'and batch_bin.warehouse in %(warehouses)s' if from_warehouses else ''
 	batch_locations = frappe.db.sql("""
 		SELECT
-			sle.`warehouse`,
-			sle.`batch_no`,
-			SUM(sle.`actual_qty`) AS `qty`
+			batch_bin.`warehouse`,
+			batch_bin.`batch_no`,
+			batch_bin.`actual_qty` AS `qty`
 		FROM
-			`tabStock Ledger Entry` sle, `tabBatch` batch
+			`tabBatch Bin` batch_bin, `tabBatch` batch
 		WHERE
-			sle.batch_no = batch.name
-			and sle.`item_code`=%(item_code)s
-			and sle.`company` = %(company)s
+			batch_bin.batch_no = batch.name
+			and batch_bin.`item_code`=%(item_code)s
+			and batch_bin.`company` = %(company)s
+			and batch_bin.`actual_qty` > 0
 			and IFNULL(batch.`expiry_date`, '2200-01-01') > %(today)s
 			{warehouse_condition}
-		GROUP BY
-			`warehouse`,
-			`batch_no`,
-			`item_code`
-		HAVING `qty` > 0
 		ORDER BY IFNULL(batch.`expiry_date`, '2200-01-01'), batch.`creation`
 	""".format(warehouse_condition=warehouse_condition), { #nosec
 		'item_code': item_code,
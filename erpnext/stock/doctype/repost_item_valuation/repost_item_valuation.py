@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe, erpnext
+from frappe import _
+from frappe.utils import cint, get_datetime, add_to_date, now_datetime
+from frappe.model.document import Document
+
+# entries left "In Progress" for longer than this are considered
+# abandoned by a crashed worker and are picked up again
+REPOST_TIMEOUT_IN_MINUTES = 120
+
+class RepostItemValuation(Document):
+	def validate(self):
+		if not self.status:
+			self.status = "Queued"
+
+	def set_status(self, status, error_log=None):
+		self.db_set("status", status)
+		if error_log is not None:
+			self.db_set("error_log", error_log)
+
+def is_reposting_deferred():
+	return cint(frappe.db.get_single_value("Stock Settings", "repost_future_entries_in_background"))
+
+def queue_repost_item_valuation(args_list, allow_negative_stock=False, via_landed_cost_voucher=False):
+	"""Record the earliest affected posting datetime of each item-warehouse,
+	future entries are reposted by `repost_entries`"""
+	for args in args_list:
+		frappe.get_doc({
+			"doctype": "Repost Item Valuation",
+			"voucher_type": args.get("voucher_type"),
+			"voucher_no": args.get("voucher_no"),
+			"company": args.get("company") or frappe.db.get_value("Warehouse", args.get("warehouse"), "company"),
+			"item_code": args.get("item_code"),
+			"warehouse": args.get("warehouse"),
+			"posting_date": args.get("posting_date"),
+			"posting_time": args.get("posting_time"),
+			"allow_negative_stock": cint(allow_negative_stock),
+			"via_landed_cost_voucher": cint(via_landed_cost_voucher)
+		}).insert(ignore_permissions=True)
+
+def repost_entries():
+	"""Scheduled job, repost the queued item-warehouses
+
+	Overlapping requests of the same item-warehouse are coalesced, valuation is
+	replayed once from the earliest posting datetime and the future GL entries of
+	the affected vouchers are reposted."""
+	abandoned_before = add_to_date(now_datetime(), minutes=-REPOST_TIMEOUT_IN_MINUTES)
+
+	entries = frappe.db.sql("""select name, company, item_code, warehouse, posting_date, posting_time,
+			voucher_type, voucher_no, allow_negative_stock, via_landed_cost_voucher
+		from `tabRepost Item Valuation`
+		where status = 'Queued' or (status = 'In Progress' and modified < %s)
+		order by creation""", abandoned_before, as_dict=1)
+
+	groups = {}
+	for d in entries:
+		groups.setdefault((d.company, d.allow_negative_stock, d.via_landed_cost_voucher), []).append(d)
+
+	for i, ((company, allow_negative_stock, via_landed_cost_voucher), group) in enumerate(groups.items()):
+		repost(company, group, allow_negative_stock=allow_negative_stock,
+			via_landed_cost_voucher=via_landed_cost_voucher)
+		frappe.publish_progress((i + 1) * 100 / len(groups), title=_("Reposting Item Valuation"))
+
+def repost(company, entries, allow_negative_stock=False, via_landed_cost_voucher=False):
+	from erpnext.stock.stock_ledger import repost_future_sle
+	from erpnext.controllers.stock_controller import update_gl_entries_after
+
+	names = [d.name for d in entries]
+	set_status(names, "In Progress")
+	frappe.db.commit()
+
+	try:
+		repost_future_sle(entries, allow_negative_stock=allow_negative_stock,
+			via_landed_cost_voucher=via_landed_cost_voucher, verbose=0)
+
+		if cint(erpnext.is_perpetual_inventory_enabled(company)):
+			earliest = min(entries, key=lambda d: get_datetime("{0} {1}".format(d.posting_date, d.posting_time)))
+			update_gl_entries_after(earliest.posting_date, earliest.posting_time,
+				for_warehouses=list(set(d.warehouse for d in entries)),
+				for_items=list(set(d.item_code for d in entries)), company=company)
+
+		set_status(names, "Completed")
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		set_status(names, "Failed", frappe.get_traceback())
+		frappe.db.commit()
+
+def set_status(names, status, error_log=None):
+	frappe.db.sql("""update `tabRepost Item Valuation`
+		set status = %s, error_log = ifnull(%s, error_log), modified = %s
+		where name in %s""", (status, error_log, now_datetime(), names))
+
+@frappe.whitelist()
+def restart_reposting(name):
+	frappe.only_for(["System Manager", "Stock Manager"])
+
+	doc = frappe.get_doc("Repost Item Valuation", name)
+	if doc.status != "Failed":
+		frappe.throw(_("Only failed entries can be requeued"))
+
+	# entries are reposted and marked failed together with the other entries of their group,
+	# requeue all the failed entries of the group
+	names = frappe.db.sql_list("""select name from `tabRepost Item Valuation`
+		where status = 'Failed' and company = %s and allow_negative_stock = %s
+			and via_landed_cost_voucher = %s""",
+		(doc.company, doc.allow_negative_stock, doc.via_landed_cost_voucher))
+
+	set_status(names, "Queued", "")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import add_days, nowdate
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import (repost_entries,
+	set_status, restart_reposting)
+
+class TestRepostItemValuation(unittest.TestCase):
+	def setUp(self):
+		frappe.db.set_value("Stock Settings", None, "repost_future_entries_in_background", 1)
+
+	def tearDown(self):
+		frappe.db.set_value("Stock Settings", None, "repost_future_entries_in_background", 0)
+
+	def test_backdated_entry_is_queued(self):
+		item_code, warehouse = "_Test Item", "_Test Warehouse - _TC"
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -5))
+		issue = make_stock_entry(item_code=item_code, source=warehouse, qty=5,
+			posting_date=add_days(nowdate(), -1))
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=400,
+			posting_date=add_days(nowdate(), -3))
+
+		status = frappe.db.get_value("Repost Item Valuation",
+			{"voucher_type": "Stock Entry", "voucher_no": receipt.name}, "status")
+		self.assertEqual(status, "Queued")
+
+		repost_entries()
+
+		status = frappe.db.get_value("Repost Item Valuation",
+			{"voucher_type": "Stock Entry", "voucher_no": receipt.name}, "status")
+		self.assertEqual(status, "Completed")
+
+		qty_after_transaction = frappe.db.get_value("Stock Ledger Entry",
+			{"voucher_type": "Stock Entry", "voucher_no": issue.name}, "qty_after_transaction")
+		actual_qty = frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty")
+		self.assertEqual(qty_after_transaction, actual_qty)
+
+	def test_restart_failed_group(self):
+		item_code = "_Test Item"
+		receipts = []
+		for warehouse in ("_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"):
+			make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=100,
+				posting_date=add_days(nowdate(), -5))
+			make_stock_entry(item_code=item_code, source=warehouse, qty=1,
+				posting_date=add_days(nowdate(), -1))
+			receipts.append(make_stock_entry(item_code=item_code, target=warehouse, qty=5,
+				basic_rate=100, posting_date=add_days(nowdate(), -3)))
+
+		names = [frappe.db.get_value("Repost Item Valuation",
+			{"voucher_type": "Stock Entry", "voucher_no": d.name}) for d in receipts]
+
+		# the entries of a group are reposted and marked failed together
+		set_status(names, "Failed", "Reposting failed")
+
+		restart_reposting(names[0])
+		for name in names:
+			self.assertEqual(frappe.db.get_value("Repost Item Valuation", name, "status"), "Queued")
+
+		repost_entries()
+		for name in names:
+			self.assertEqual(frappe.db.get_value("Repost Item Valuation", name, "status"), "Completed")
@@ -11,6 +11,7 @@ from erpnext.stock.get_item_details import get_reserved_qty_for_so
 from frappe import _, ValidationError
 
 from erpnext.controllers.stock_controller import StockController
+from erpnext.stock.doctype.serial_no_movement.serial_no_movement import get_serial_no_movements
 from six.moves import map
 class SerialNoCannotCreateDirectError(ValidationError): pass
 class SerialNoCannotCannotChangeError(ValidationError): pass
@@ -136,41 +137,16 @@ class SerialNo(StockController):
 		if not serial_no:
 			serial_no = self.name
 
-		for sle in frappe.db.sql("""
-			SELECT voucher_type, voucher_no,
-				posting_date, posting_time, incoming_rate, actual_qty, serial_no
-			FROM
-				`tabStock Ledger Entry`
-			WHERE
-				item_code=%s AND company = %s AND ifnull(is_cancelled, 'No')='No'
-				AND (serial_no = %s
-					OR serial_no like %s
-					OR serial_no like %s
-					OR serial_no like %s
-				)
-			ORDER BY
-				posting_date desc, posting_time desc, creation desc""",
-			(self.item_code, self.company,
-				serial_no, serial_no+'\n%', '%\n'+serial_no, '%\n'+serial_no+'\n%'), as_dict=1):
-				if serial_no.upper() in get_serial_nos(sle.serial_no):
-					if cint(sle.actual_qty) > 0:
-						sle_dict.setdefault("incoming", []).append(sle)
-					else:
-						sle_dict.setdefault("outgoing", []).append(sle)
+		for sle in get_serial_no_movements(serial_no, self.item_code, self.company):
+			if cint(sle.actual_qty) > 0:
+				sle_dict.setdefault("incoming", []).append(sle)
+			else:
+				sle_dict.setdefault("outgoing", []).append(sle)
 
 		return sle_dict
 
 	def on_trash(self):
-		sl_entries = frappe.db.sql("""select serial_no from `tabStock Ledger Entry`
-			where serial_no like %s and item_code=%s and ifnull(is_cancelled, 'No')='No'""",
-			("%%%s%%" % self.name, self.item_code), as_dict=True)
-
-		# Find the exact match
-		sle_exists = False
-		for d in sl_entries:
-			if self.name.upper() in get_serial_nos(d.serial_no):
-				sle_exists = True
-				break
+		sle_exists = frappe.db.exists("Serial No Movement", {"serial_no": self.name, "item_code": self.item_code})
 
 		if sle_exists:
 			frappe.throw(_("Cannot delete Serial No {0}, as it is used in stock transactions").format(self.name))
@@ -180,17 +156,24 @@ class SerialNo(StockController):
 			frappe.throw(_("Sorry, Serial Nos cannot be merged"))
 
 	def after_rename(self, old, new, merge=False):
-		"""rename serial_no text fields"""
-		for dt in frappe.db.sql("""select parent from tabDocField
+		"""rename serial_no text fields, of the stock transactions of the serial no found by
+		its movements, and of the other documents"""
+		frappe.db.sql("""update `tabSerial No Movement` set serial_no=%s where serial_no=%s""", (new, old))
+
+		# child tables of the stock transactions -> transactions with the serial no
+		voucher_tables = {}
+		for voucher_type, voucher_no in frappe.db.sql("""select distinct voucher_type, voucher_no
+			from `tabSerial No Movement` where serial_no=%s""", new):
+			for df in frappe.get_meta(voucher_type).get_table_fields():
+				voucher_tables.setdefault(df.options, {}).setdefault(voucher_type, []).append(voucher_no)
+
+		for dt in frappe.db.sql_list("""select parent from tabDocField
 			where fieldname='serial_no' and fieldtype in ('Text', 'Small Text')"""):
-
-			for item in frappe.db.sql("""select name, serial_no from `tab%s`
-				where serial_no like %s""" % (dt[0], frappe.db.escape('%' + old + '%'))):
-
-				serial_nos = map(lambda i: new if i.upper()==old.upper() else i, item[1].split('\n'))
-				frappe.db.sql("""update `tab%s` set serial_no = %s
-					where name=%s""" % (dt[0], '%s', '%s'),
-					('\n'.join(list(serial_nos)), item[0]))
+			if dt in voucher_tables:
+				for parenttype, parents in voucher_tables[dt].items():
+					rename_serial_no_field(dt, old, new, "and parenttype=%s and parent in %s", (parenttype, parents))
+			else:
+				rename_serial_no_field(dt, old, new)
 
 	def update_serial_no_reference(self, serial_no=None):
 		last_sle = self.get_last_sle(serial_no)
@@ -198,6 +181,14 @@ class SerialNo(StockController):
 		self.set_sales_details(last_sle.get("delivery_sle"))
 		self.set_maintenance_status()
 
+def rename_serial_no_field(doctype, old, new, conditions="", values=()):
+	for name, serial_no in frappe.db.sql("""select name, serial_no from `tab{0}`
+		where serial_no like %s {1}""".format(doctype, conditions), ("%" + old + "%",) + tuple(values)):
+
+		serial_nos = [new if d.upper() == old.upper() else d for d in serial_no.split('\n')]
+		frappe.db.sql("""update `tab{0}` set serial_no = %s where name=%s""".format(doctype),
+			('\n'.join(serial_nos), name))
+
 def process_serial_no(sle):
 	item_det = get_item_details(sle.item_code)
 	validate_serial_no(sle, item_det)
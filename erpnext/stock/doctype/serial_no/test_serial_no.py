@@ -54,5 +54,22 @@ class TestSerialNo(unittest.TestCase):
 		self.assertEqual(serial_no.warehouse, wh)
 		self.assertEqual(serial_no.company, "_Test Company 1")
 
+	def test_rename(self):
+		"""the serial no is renamed in the items of its stock transactions and in its movements"""
+		se = make_serialized_item(target_warehouse="_Test Warehouse - _TC")
+		serial_nos = get_serial_nos(se.get("items")[0].serial_no)
+		dn = create_delivery_note(item_code="_Test Serialized Item With Series", qty=1, serial_no=serial_nos[0])
+
+		new_serial_no = serial_nos[0] + "-RENAMED"
+		frappe.rename_doc("Serial No", serial_nos[0], new_serial_no)
+
+		self.assertEqual(get_serial_nos(frappe.db.get_value("Stock Entry Detail", se.get("items")[0].name,
+			"serial_no")), [new_serial_no, serial_nos[1]])
+		self.assertEqual(frappe.db.get_value("Delivery Note Item", dn.get("items")[0].name, "serial_no"),
+			new_serial_no)
+
+		self.assertFalse(frappe.db.exists("Serial No Movement", {"serial_no": serial_nos[0]}))
+		self.assertEqual(frappe.db.count("Serial No Movement", {"serial_no": new_serial_no}), 2)
+
 	def tearDown(self):
 		frappe.db.rollback()
\ No newline at end of file
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import flt
+from frappe.model.document import Document
+from erpnext.utilities.bulk_insert import bulk_insert
+
+class SerialNoMovement(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_index("Serial No Movement", ["serial_no", "item_code"])
+	frappe.db.add_index("Serial No Movement", ["item_code", "warehouse", "posting_date"])
+	frappe.db.add_index("Serial No Movement", ["voucher_no", "voucher_type"])
+
+def make_serial_no_movements(sl_entries):
+	"""index the serial nos of submitted stock ledger entries, one row per serial no"""
+	from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+
+	rows = []
+	for sle in sl_entries:
+		if not sle.get("serial_no") or sle.get("is_cancelled") == "Yes":
+			continue
+
+		for serial_no in get_serial_nos(sle.get("serial_no")):
+			rows.append({
+				"serial_no": serial_no,
+				"item_code": sle.get("item_code"),
+				"warehouse": sle.get("warehouse"),
+				"company": sle.get("company"),
+				"voucher_type": sle.get("voucher_type"),
+				"voucher_no": sle.get("voucher_no"),
+				"voucher_detail_no": sle.get("voucher_detail_no"),
+				"posting_date": sle.get("posting_date"),
+				"posting_time": sle.get("posting_time"),
+				"actual_qty": 1 if flt(sle.get("actual_qty")) > 0 else -1,
+				"incoming_rate": flt(sle.get("incoming_rate"))
+			})
+
+	bulk_insert("Serial No Movement", rows)
+
+def delete_serial_no_movements(voucher_type, voucher_no):
+	frappe.db.sql("""delete from `tabSerial No Movement`
+		where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
+
+def get_serial_no_movements(serial_no, item_code=None, company=None):
+	"""movements of the serial no, latest first"""
+	conditions = ""
+	if item_code:
+		conditions += " and item_code = %(item_code)s"
+	if company:
+		conditions += " and company = %(company)s"
+
+	return frappe.db.sql("""
+		select voucher_type, voucher_no, voucher_detail_no, warehouse, posting_date, posting_time,
+			incoming_rate, actual_qty, serial_no
+		from `tabSerial No Movement`
+		where serial_no = %(serial_no)s {0}
+		order by posting_date desc, posting_time desc, creation desc""".format(conditions), {
+			"serial_no": serial_no,
+			"item_code": item_code,
+			"company": company
+		}, as_dict=1)
+
+def get_serial_nos_in_stock(item_code, warehouse, posting_date, posting_time):
+	"""serial nos of the item in the warehouse before the posting datetime"""
+	return frappe.db.sql_list("""
+		select serial_no
+		from `tabSerial No Movement`
+		where item_code = %s and warehouse = %s
+			and timestamp(posting_date, posting_time) < timestamp(%s, %s)
+		group by serial_no
+		having sum(actual_qty) > 0
+		order by min(timestamp(posting_date, posting_time))""",
+		(item_code, warehouse, posting_date, posting_time))
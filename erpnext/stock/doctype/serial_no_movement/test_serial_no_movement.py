@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import nowdate, nowtime
+from erpnext.stock.doctype.stock_entry.test_stock_entry import make_serialized_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.stock_ledger import get_stock_ledger_entries
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.doctype.serial_no_movement.serial_no_movement import (get_serial_no_movements,
+	get_serial_nos_in_stock)
+
+class TestSerialNoMovement(unittest.TestCase):
+	def test_serial_no_movements(self):
+		se = make_serialized_item(target_warehouse="_Test Warehouse - _TC")
+		item_code = se.get("items")[0].item_code
+		serial_nos = get_serial_nos(se.get("items")[0].serial_no)
+
+		dn = create_delivery_note(item_code=item_code, qty=1, serial_no=serial_nos[0])
+
+		movements = get_serial_no_movements(serial_nos[0], item_code)
+		self.assertEqual([(d.voucher_no, d.actual_qty) for d in movements],
+			[(dn.name, -1), (se.name, 1)])
+
+		in_stock = get_serial_nos_in_stock(item_code, "_Test Warehouse - _TC", nowdate(), "23:59:59")
+		self.assertNotIn(serial_nos[0], in_stock)
+		self.assertIn(serial_nos[1], in_stock)
+
+		dn.cancel()
+		self.assertFalse(frappe.db.exists("Serial No Movement", {"voucher_no": dn.name}))
+
+	def test_serial_no_filter(self):
+		"""the serial no filter of the ledger matches the row of the voucher moving the serial no"""
+		item_code, warehouse = "_Test Serialized Item With Series", "_Test Warehouse - _TC"
+
+		se = make_stock_entry(item_code=item_code, target=warehouse, qty=1, basic_rate=100,
+			do_not_save=True)
+		se.append("items", {"item_code": item_code, "t_warehouse": warehouse, "qty": 1,
+			"basic_rate": 200, "conversion_factor": 1.0})
+		se.insert()
+		se.submit()
+
+		for d in se.get("items"):
+			entries = get_stock_ledger_entries({
+				"item_code": item_code,
+				"warehouse": warehouse,
+				"serial_no": get_serial_nos(d.serial_no)[0],
+				"posting_date": nowdate(),
+				"posting_time": nowtime()
+			}, "<=")
+			self.assertEqual([sle.voucher_detail_no for sle in entries if sle.voucher_no == se.name],
+				[d.name])
+
+	def tearDown(self):
+		frappe.db.rollback()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import getdate, get_last_day, add_days, add_months, nowdate, now
+from frappe.model.document import Document
+
+class StockClosingBalance(Document):
+	pass
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Closing Balance", ["period_end_date", "item_code", "warehouse"])
+	frappe.db.add_index("Stock Closing Balance", ["item_code", "warehouse", "period_end_date"],
+		index_name="item_warehouse_period")
+
+def get_closing_balance_date(date):
+	"""latest period end before `date`, for which the closing balances of all item-warehouses exist"""
+	valid_upto = frappe.db.get_default("stock_closing_balance_upto")
+	if not valid_upto:
+		return None
+
+	period_end_date = get_last_day(add_months(getdate(date), -1))
+	return min(period_end_date, getdate(valid_upto))
+
+def create_stock_closing_balances():
+	"""Scheduled job, create the monthly closing balance of each item-warehouse
+
+	Periods after `stock_closing_balance_upto` are (re)built from the previous period's
+	closing balance and the stock ledger entries posted within the period."""
+	first_posting_date = frappe.db.sql("""select min(posting_date) from `tabStock Ledger Entry`""")[0][0]
+	if not first_posting_date:
+		return
+
+	valid_upto = frappe.db.get_default("stock_closing_balance_upto")
+	period_end_date = get_last_day(first_posting_date)
+	if valid_upto:
+		period_end_date = max(period_end_date, get_last_day(add_months(getdate(valid_upto), 1)))
+	last_period_end_date = get_last_day(add_months(getdate(nowdate()), -1))
+
+	while period_end_date <= last_period_end_date:
+		create_closing_balances_for_period(period_end_date)
+		frappe.db.set_default("stock_closing_balance_upto", period_end_date)
+		frappe.db.commit()
+
+		period_end_date = get_last_day(add_days(period_end_date, 1))
+
+def create_closing_balances_for_period(period_end_date):
+	previous_period_end_date = get_last_day(add_months(period_end_date, -1))
+
+	closing_balances = {}
+	for d in frappe.db.sql("""select item_code, warehouse, company, qty_after_transaction,
+			valuation_rate, stock_value, stock_queue
+		from `tabStock Closing Balance`
+		where period_end_date = %s""", previous_period_end_date, as_dict=1):
+		closing_balances[(d.item_code, d.warehouse)] = d
+
+	# entries are ordered, so the last entry of each item-warehouse has its closing balance
+	for d in frappe.db.sql("""select item_code, warehouse, company, qty_after_transaction,
+			valuation_rate, stock_value, stock_queue
+		from `tabStock Ledger Entry`
+		where posting_date > %s and posting_date <= %s and ifnull(is_cancelled, 'No') = 'No'
+		order by timestamp(posting_date, posting_time), creation""",
+		(previous_period_end_date, period_end_date), as_dict=1):
+		closing_balances[(d.item_code, d.warehouse)] = d
+
+	existing = set(frappe.db.sql("""select item_code, warehouse from `tabStock Closing Balance`
+		where period_end_date = %s""", period_end_date))
+
+	for key, d in closing_balances.items():
+		if key in existing:
+			continue
+
+		doc = frappe.get_doc({
+			"doctype": "Stock Closing Balance",
+			"item_code": d.item_code,
+			"warehouse": d.warehouse,
+			"company": d.company,
+			"period_end_date": period_end_date,
+			"qty_after_transaction": d.qty_after_transaction,
+			"valuation_rate": d.valuation_rate,
+			"stock_value": d.stock_value,
+			"stock_queue": d.stock_queue
+		})
+		doc.owner = doc.modified_by = frappe.session.user
+		doc.creation = doc.modified = now()
+		doc.db_insert()
+
+def invalidate_stock_closing_balances(args_list):
+	"""Delete closing balances of the item-warehouses from the period of the backdated posting,
+	they are rebuilt by `create_stock_closing_balances`"""
+	valid_upto = frappe.db.get_default("stock_closing_balance_upto")
+	if not valid_upto or not args_list:
+		return
+
+	posting_dates = [getdate(d.get("posting_date") or "1900-01-01") for d in args_list]
+	if min(posting_dates) > getdate(valid_upto):
+		return
+
+	conditions, values = [], []
+	for d, posting_date in zip(args_list, posting_dates):
+		conditions.append("(item_code = %s and warehouse = %s and period_end_date >= %s)")
+		values.extend([d.get("item_code"), d.get("warehouse"), posting_date])
+
+	frappe.db.sql("""delete from `tabStock Closing Balance` where {0}""".format(" or ".join(conditions)),
+		tuple(values))
+
+	frappe.db.set_default("stock_closing_balance_upto", get_last_day(add_months(min(posting_dates), -1)))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from frappe.utils import add_months, nowdate, get_last_day
+from erpnext.stock.utils import get_stock_value_on
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_closing_balance.stock_closing_balance import create_stock_closing_balances
+
+class TestStockClosingBalance(unittest.TestCase):
+	def test_closing_balance(self):
+		item_code, warehouse = "_Test Item", "_Test Warehouse - _TC"
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_months(nowdate(), -3))
+
+		expected_value = get_stock_value_on(warehouse, nowdate(), item_code)
+		create_stock_closing_balances()
+
+		period_end_date = get_last_day(add_months(nowdate(), -1))
+		closing_balance = frappe.db.get_value("Stock Closing Balance", {"item_code": item_code,
+			"warehouse": warehouse, "period_end_date": period_end_date}, "stock_value")
+		self.assertEqual(get_stock_value_on(warehouse, period_end_date, item_code), closing_balance)
+		self.assertEqual(get_stock_value_on(warehouse, nowdate(), item_code), expected_value)
+
+		# backdated entry invalidates the closing balances after it
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=100,
+			posting_date=add_months(nowdate(), -2))
+		self.assertFalse(frappe.db.get_value("Stock Closing Balance", {"item_code": item_code,
+			"warehouse": warehouse, "period_end_date": period_end_date}))
+		self.assertEqual(get_stock_value_on(warehouse, nowdate(), item_code), expected_value + 500)
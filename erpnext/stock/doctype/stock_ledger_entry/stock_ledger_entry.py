@@ -9,7 +9,8 @@ from frappe.utils import flt, getdate, add_days, formatdate
 from frappe.model.document import Document
 from datetime import date
 from erpnext.controllers.item_variant import ItemTemplateCannotHaveStock
-from erpnext.accounts.utils import get_fiscal_year
+from erpnext.accounts.utils import get_fiscal_years
+from erpnext.utilities.bulk_insert import get_master_details
 
 class StockFreezeError(frappe.ValidationError): pass
 
@@ -25,14 +26,12 @@ class StockLedgerEntry(Document):
 
 	def validate(self):
 		self.flags.ignore_submit_comment = True
-		from erpnext.stock.utils import validate_warehouse_company
 		self.validate_mandatory()
 		self.validate_item()
 		self.validate_batch()
-		validate_warehouse_company(self.warehouse, self.company)
+		self.validate_warehouse()
 		self.scrub_posting_time()
 		self.validate_and_set_fiscal_year()
-		self.block_transactions_against_group_warehouse()
 
 	def on_submit(self):
 		self.check_stock_frozen_date()
@@ -43,100 +42,161 @@ class StockLedgerEntry(Document):
 			from erpnext.stock.doctype.serial_no.serial_no import process_serial_no
 			process_serial_no(self)
 
+		if self.serial_no:
+			from erpnext.stock.doctype.serial_no_movement.serial_no_movement import make_serial_no_movements
+			make_serial_no_movements([self])
+
 	def calculate_batch_qty(self):
 		if self.batch_no:
-			batch_qty = frappe.db.get_value("Stock Ledger Entry", 
-				{"docstatus": 1, "batch_no": self.batch_no, "is_cancelled": "No"},
-				"sum(actual_qty)") or 0
+			# Batch Bin is updated after the entry is submitted
+			batch_qty = flt(frappe.db.get_value("Batch Bin", {"batch_no": self.batch_no},
+				"sum(actual_qty)")) + flt(self.actual_qty)
 			frappe.db.set_value("Batch", self.batch_no, "batch_qty", batch_qty)
 
 	#check for item quantity available in stock
 	def actual_amt_check(self):
 		if self.batch_no and not self.get("allow_negative_stock"):
-			batch_bal_after_transaction = flt(frappe.db.sql("""select sum(actual_qty)
-				from `tabStock Ledger Entry`
-				where warehouse=%s and item_code=%s and batch_no=%s""",
-				(self.warehouse, self.item_code, self.batch_no))[0][0])
+			batch_bal_after_transaction = flt(frappe.db.get_value("Batch Bin",
+				{"batch_no": self.batch_no, "warehouse": self.warehouse}, "actual_qty")) + flt(self.actual_qty)
 
 			if batch_bal_after_transaction < 0:
 				frappe.throw(_("Stock balance in Batch {0} will become negative {1} for Item {2} at Warehouse {3}")
 					.format(self.batch_no, batch_bal_after_transaction, self.item_code, self.warehouse))
 
 	def validate_mandatory(self):
-		mandatory = ['warehouse','posting_date','voucher_type','voucher_no','company']
-		for k in mandatory:
-			if not self.get(k):
-				frappe.throw(_("{0} is required").format(self.meta.get_label(k)))
-
-		if self.voucher_type != "Stock Reconciliation" and not self.actual_qty:
-			frappe.throw(_("Actual Qty is mandatory"))
+		validate_mandatory_fields(self, self.meta)
 
 	def validate_item(self):
-		item_det = frappe.db.sql("""select name, has_batch_no, docstatus,
-			is_stock_item, has_variants, stock_uom, create_new_batch
-			from tabItem where name=%s""", self.item_code, as_dict=True)
-
-		if not item_det:
-			frappe.throw(_("Item {0} not found").format(self.item_code))
-
-		item_det = item_det[0]
-
-		if item_det.is_stock_item != 1:
-			frappe.throw(_("Item {0} must be a stock Item").format(self.item_code))
-
-		# check if batch number is required
-		if self.voucher_type != 'Stock Reconciliation':
-			if item_det.has_batch_no ==1:
-				if not self.batch_no:
-					frappe.throw(_("Batch number is mandatory for Item {0}").format(self.item_code))
-				elif not frappe.db.get_value("Batch",{"item": self.item_code, "name": self.batch_no}):
-					frappe.throw(_("{0} is not a valid Batch Number for Item {1}").format(self.batch_no, self.item_code))
-
-			elif item_det.has_batch_no ==0 and self.batch_no and self.is_cancelled == "No":
-				frappe.throw(_("The Item {0} cannot have Batch").format(self.item_code))
-
-		if item_det.has_variants:
-			frappe.throw(_("Stock cannot exist for Item {0} since has variants").format(self.item_code),
-				ItemTemplateCannotHaveStock)
-
+		item_det = get_master_details("Item", [self.item_code], item_fields).get(self.item_code)
+		validate_item_details(self, item_det, self.get_batch_details())
 		self.stock_uom = item_det.stock_uom
 
 	def check_stock_frozen_date(self):
-		stock_frozen_upto = frappe.db.get_value('Stock Settings', None, 'stock_frozen_upto') or ''
-		if stock_frozen_upto:
-			stock_auth_role = frappe.db.get_value('Stock Settings', None,'stock_auth_role')
-			if getdate(self.posting_date) <= getdate(stock_frozen_upto) and not stock_auth_role in frappe.get_roles():
-				frappe.throw(_("Stock transactions before {0} are frozen").format(formatdate(stock_frozen_upto)), StockFreezeError)
-
-		stock_frozen_upto_days = int(frappe.db.get_value('Stock Settings', None, 'stock_frozen_upto_days') or 0)
-		if stock_frozen_upto_days:
-			stock_auth_role = frappe.db.get_value('Stock Settings', None,'stock_auth_role')
-			older_than_x_days_ago = (add_days(getdate(self.posting_date), stock_frozen_upto_days) <= date.today())
-			if older_than_x_days_ago and not stock_auth_role in frappe.get_roles():
-				frappe.throw(_("Not allowed to update stock transactions older than {0}").format(stock_frozen_upto_days), StockFreezeError)
+		check_stock_frozen_date(self.posting_date)
 
 	def scrub_posting_time(self):
-		if not self.posting_time or self.posting_time == '00:0':
-			self.posting_time = '00:00'
+		self.posting_time = get_scrubbed_posting_time(self.posting_time)
 
 	def validate_batch(self):
-		if self.batch_no and self.voucher_type != "Stock Entry":
-			expiry_date = frappe.db.get_value("Batch", self.batch_no, "expiry_date")
-			if expiry_date:
-				if getdate(self.posting_date) > getdate(expiry_date):
-					frappe.throw(_("Batch {0} of Item {1} has expired.").format(self.batch_no, self.item_code))
+		validate_batch_expiry(self, self.get_batch_details())
+
+	def get_batch_details(self):
+		return get_master_details("Batch", [self.batch_no], batch_fields).get(self.batch_no)
 
 	def validate_and_set_fiscal_year(self):
-		if not self.fiscal_year:
-			self.fiscal_year = get_fiscal_year(self.posting_date, company=self.company)[0]
-		else:
-			from erpnext.accounts.utils import validate_fiscal_year
-			validate_fiscal_year(self.posting_date, self.fiscal_year, self.company,
-				self.meta.get_label("posting_date"), self)
-
-	def block_transactions_against_group_warehouse(self):
-		from erpnext.stock.utils import is_group_warehouse
-		is_group_warehouse(self.warehouse)
+		self.fiscal_year = get_fiscal_year_of_entry(self, self.meta)
+
+	def validate_warehouse(self):
+		validate_warehouse_details(self, get_master_details("Warehouse", [self.warehouse],
+			warehouse_fields).get(self.warehouse))
+
+# validations of the Stock Ledger Entry controller, shared with the bulk insert path
+# (`validate_sl_entries`), `sle` is a Stock Ledger Entry or a dict of its values
+item_fields = ["has_batch_no", "is_stock_item", "has_variants", "stock_uom"]
+batch_fields = ["item", "expiry_date"]
+warehouse_fields = ["company", "is_group"]
+
+def validate_mandatory_fields(sle, meta):
+	for k in ['warehouse','posting_date','voucher_type','voucher_no','company']:
+		if not sle.get(k):
+			frappe.throw(_("{0} is required").format(meta.get_label(k)))
+
+	if sle.get("voucher_type") != "Stock Reconciliation" and not sle.get("actual_qty"):
+		frappe.throw(_("Actual Qty is mandatory"))
+
+def validate_item_details(sle, item_det, batch=None):
+	item_code, batch_no = sle.get("item_code"), sle.get("batch_no")
+	if not item_det:
+		frappe.throw(_("Item {0} not found").format(item_code))
+
+	if item_det.is_stock_item != 1:
+		frappe.throw(_("Item {0} must be a stock Item").format(item_code))
+
+	# check if batch number is required
+	if sle.get("voucher_type") != 'Stock Reconciliation':
+		if item_det.has_batch_no ==1:
+			if not batch_no:
+				frappe.throw(_("Batch number is mandatory for Item {0}").format(item_code))
+			elif not batch or batch.item != item_code:
+				frappe.throw(_("{0} is not a valid Batch Number for Item {1}").format(batch_no, item_code))
+
+		elif item_det.has_batch_no ==0 and batch_no and sle.get("is_cancelled") == "No":
+			frappe.throw(_("The Item {0} cannot have Batch").format(item_code))
+
+	if item_det.has_variants:
+		frappe.throw(_("Stock cannot exist for Item {0} since has variants").format(item_code),
+			ItemTemplateCannotHaveStock)
+
+def validate_batch_expiry(sle, batch=None):
+	if sle.get("batch_no") and sle.get("voucher_type") != "Stock Entry":
+		expiry_date = batch.expiry_date if batch else None
+		if expiry_date and getdate(sle.get("posting_date")) > getdate(expiry_date):
+			frappe.throw(_("Batch {0} of Item {1} has expired.").format(sle.get("batch_no"), sle.get("item_code")))
+
+def validate_warehouse_details(sle, warehouse=None):
+	from erpnext.stock.utils import InvalidWarehouseCompany
+
+	warehouse = warehouse or {}
+	if warehouse.get("company") and warehouse.get("company") != sle.get("company"):
+		frappe.throw(_("Warehouse {0} does not belong to company {1}").format(sle.get("warehouse"),
+			sle.get("company")), InvalidWarehouseCompany)
+
+	if warehouse.get("is_group"):
+		frappe.throw(_("Group node warehouse is not allowed to select for transactions"))
+
+def get_scrubbed_posting_time(posting_time):
+	if not posting_time or posting_time == '00:0':
+		return '00:00'
+	return posting_time
+
+def get_fiscal_year_of_entry(sle, meta):
+	"""Returns the fiscal year of the entry if set and it contains the posting date,
+	else the fiscal year of the posting date"""
+	years = [f[0] for f in get_fiscal_years(sle.get("posting_date"),
+		label=_(meta.get_label("posting_date")), company=sle.get("company"))]
+
+	return sle.get("fiscal_year") if sle.get("fiscal_year") in years else years[0]
+
+def check_stock_frozen_date(posting_date):
+	stock_frozen_upto = frappe.db.get_value('Stock Settings', None, 'stock_frozen_upto') or ''
+	if stock_frozen_upto:
+		stock_auth_role = frappe.db.get_value('Stock Settings', None,'stock_auth_role')
+		if getdate(posting_date) <= getdate(stock_frozen_upto) and not stock_auth_role in frappe.get_roles():
+			frappe.throw(_("Stock transactions before {0} are frozen").format(formatdate(stock_frozen_upto)), StockFreezeError)
+
+	stock_frozen_upto_days = int(frappe.db.get_value('Stock Settings', None, 'stock_frozen_upto_days') or 0)
+	if stock_frozen_upto_days:
+		stock_auth_role = frappe.db.get_value('Stock Settings', None,'stock_auth_role')
+		older_than_x_days_ago = (add_days(getdate(posting_date), stock_frozen_upto_days) <= date.today())
+		if older_than_x_days_ago and not stock_auth_role in frappe.get_roles():
+			frappe.throw(_("Not allowed to update stock transactions older than {0}").format(stock_frozen_upto_days), StockFreezeError)
+
+def validate_sl_entries(sl_entries):
+	"""Run the validations of `StockLedgerEntry` (validate and on_submit) for all the entries
+	of a voucher at once, with one query per master. Used by the bulk insert path of
+	`erpnext.stock.stock_ledger.make_sl_entries`, for entries without serial nos and
+	batches. Sets `stock_uom`, `fiscal_year` and `posting_time` in the entries."""
+	meta = frappe.get_meta("Stock Ledger Entry")
+	for sle in sl_entries:
+		validate_mandatory_fields(sle, meta)
+
+	items = get_master_details("Item", [sle.get("item_code") for sle in sl_entries], item_fields)
+	batches = get_master_details("Batch", [sle.get("batch_no") for sle in sl_entries], batch_fields)
+	warehouses = get_master_details("Warehouse", [sle.get("warehouse") for sle in sl_entries],
+		warehouse_fields)
+
+	for sle in sl_entries:
+		item_det, batch = items.get(sle.get("item_code")), batches.get(sle.get("batch_no"))
+
+		validate_item_details(sle, item_det, batch)
+		sle["stock_uom"] = item_det.stock_uom
+
+		validate_batch_expiry(sle, batch)
+		validate_warehouse_details(sle, warehouses.get(sle.get("warehouse")))
+		sle["posting_time"] = get_scrubbed_posting_time(sle.get("posting_time"))
+		sle["fiscal_year"] = get_fiscal_year_of_entry(sle, meta)
+
+	check_stock_frozen_date(min(getdate(sle.get("posting_date")) for sle in sl_entries))
 
 def on_doctype_update():
 	if not frappe.db.has_index('tabStock Ledger Entry', 'posting_sort_index'):
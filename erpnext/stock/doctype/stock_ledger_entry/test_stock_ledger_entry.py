@@ -4,9 +4,197 @@
 from __future__ import unicode_literals
 
 import frappe
-import unittest
+import unittest, json, random, timeit
+from frappe.utils import add_days, nowdate
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.stock_ledger import (update_entries_after, repost_future_sle,
+	get_previous_sle_map, get_future_sle_map, can_make_entries_in_bulk)
+from erpnext.stock.valuation import FIFOQueue, COMPACT_QUEUE_PREFIX
+from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.tests.utils import benchmark
 
 # test_records = frappe.get_test_records('Stock Ledger Entry')
 
 class TestStockLedgerEntry(unittest.TestCase):
-	pass
+	def test_repost_future_sle(self):
+		item_code, warehouse = "_Test Item", "_Test Warehouse - _TC"
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=add_days(nowdate(), -5))
+		make_stock_entry(item_code=item_code, source=warehouse, qty=4,
+			posting_date=add_days(nowdate(), -2))
+
+		# backdated receipt, reposts the future issue
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=200,
+			posting_date=add_days(nowdate(), -3))
+
+		args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"posting_date": add_days(nowdate(), -5),
+			"posting_time": "00:00"
+		}
+
+		expected = get_ledger_values(item_code, warehouse)
+
+		update_entries_after(args)
+		self.assertEqual(get_ledger_values(item_code, warehouse), expected)
+
+		repost_future_sle([args, dict(args, posting_date=add_days(nowdate(), -3))])
+		self.assertEqual(get_ledger_values(item_code, warehouse), expected)
+
+		bin_values = frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
+			["actual_qty", "stock_value"], as_dict=1)
+		self.assertEqual(bin_values.actual_qty, expected[-1][0])
+		self.assertEqual(bin_values.stock_value, expected[-1][2])
+
+	def test_future_sle_map(self):
+		"""future entries of each item-warehouse are read from its own posting datetime"""
+		item_code = "_Test Item"
+		warehouses = ["_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"]
+
+		for warehouse in warehouses:
+			for days in (-6, -4, -2):
+				make_stock_entry(item_code=item_code, target=warehouse, qty=2, basic_rate=100,
+					posting_date=add_days(nowdate(), days))
+
+		args_list = [
+			frappe._dict(item_code=item_code, warehouse=warehouses[0],
+				posting_date=add_days(nowdate(), -5), posting_time="00:00"),
+			frappe._dict(item_code=item_code, warehouse=warehouses[1],
+				posting_date=add_days(nowdate(), -3), posting_time="00:00")
+		]
+		repost_map = {(d.item_code, d.warehouse): d for d in args_list}
+
+		previous_sle_map = get_previous_sle_map(args_list)
+		entries_map = get_future_sle_map(repost_map, previous_sle_map, chunk_size=1)
+
+		for args in args_list:
+			key = (args.item_code, args.warehouse)
+			expected = frappe.db.sql_list("""select name from `tabStock Ledger Entry`
+				where item_code=%s and warehouse=%s and is_cancelled='No'
+					and timestamp(posting_date, posting_time) > %s
+				order by timestamp(posting_date, posting_time), creation""",
+				(key[0], key[1], previous_sle_map[key].timestamp))
+
+			self.assertTrue(expected)
+			self.assertEqual([sle.name for sle in entries_map.get(key, [])], expected)
+
+	def test_bulk_sl_entries(self):
+		"""ledger of the bulk insert path is the same as the per-row path"""
+		item_code, warehouse = "_Test Item", "_Test Warehouse - _TC"
+		make_stock_entry(item_code=item_code, target=warehouse, qty=20, basic_rate=100,
+			posting_date=add_days(nowdate(), -5))
+
+		def make_entry():
+			se = make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=150,
+				posting_date=add_days(nowdate(), -4), do_not_save=True)
+			se.append("items", {"item_code": item_code, "t_warehouse": warehouse, "qty": 3,
+				"basic_rate": 200, "conversion_factor": 1.0})
+			se.append("items", {"item_code": item_code, "s_warehouse": warehouse, "qty": 12,
+				"conversion_factor": 1.0})
+			se.insert()
+			se.submit()
+			return se
+
+		se = make_entry()
+		bulk_values = get_ledger_values(item_code, warehouse)
+		se.cancel()
+
+		frappe.flags.disable_bulk_sl_entries = True
+		try:
+			make_entry()
+		finally:
+			frappe.flags.disable_bulk_sl_entries = False
+
+		self.assertEqual(get_ledger_values(item_code, warehouse), bulk_values)
+
+	def test_serialized_items_use_per_row_path(self):
+		"""serial nos of serialized items without serial nos are created by the per-row path"""
+		self.assertFalse(can_make_entries_in_bulk([{"item_code": "_Test Serialized Item With Series"}]))
+
+		se = make_stock_entry(item_code="_Test Serialized Item With Series", target="_Test Warehouse - _TC",
+			qty=2, basic_rate=100)
+		self.assertEqual(len(get_serial_nos(se.get("items")[0].serial_no)), 2)
+
+def get_ledger_values(item_code, warehouse):
+	return frappe.db.sql("""select qty_after_transaction, valuation_rate, stock_value, stock_value_difference
+		from `tabStock Ledger Entry`
+		where item_code=%s and warehouse=%s and is_cancelled='No'
+		order by timestamp(posting_date, posting_time), creation""", (item_code, warehouse))
+
+class TestFIFOQueue(unittest.TestCase):
+	def test_serialisation(self):
+		small = FIFOQueue([[1, 10], [2, 20]])
+		self.assertEqual(json.loads(small.dumps()), [[1, 10], [2, 20]])
+
+		layers = [[random.randint(1, 20), random.randint(100, 10000) / 100.0] for i in range(10000)]
+		large = FIFOQueue(layers)
+		data = large.dumps()
+
+		self.assertTrue(data.startswith(COMPACT_QUEUE_PREFIX))
+		self.assertTrue(len(data) < len(json.dumps(layers)))
+		self.assertEqual(FIFOQueue.loads(data), layers)
+
+		# existing entries are stored as JSON
+		self.assertEqual(FIFOQueue.loads(json.dumps(layers)), layers)
+		self.assertEqual(FIFOQueue.loads(None), [])
+
+	def test_consumption(self):
+		queue = FIFOQueue([[5, 10], [5, 20]])
+		queue.add_stock(5, 20)
+		queue.add_stock(5, 30)
+		self.assertEqual(queue, [[5, 10], [10, 20], [5, 30]])
+
+		queue.pop()
+		queue.pop(1)
+		self.assertEqual(queue, [[10, 20]])
+
+		queue.collapse(5, 30)
+		self.assertEqual(queue, [[5, 10]])
+
+	def test_replay(self):
+		"""replay of issues against a FIFOQueue is the same as against a list of layers"""
+		layers = [[1, 10 + i % 100] for i in range(1000)]
+
+		self.assertEqual(FIFOQueue.loads(replay_fifo_queue(layers)), json.loads(replay_list(layers)))
+
+	@benchmark
+	def test_replay_benchmark(self):
+		"""replay of 200 issues against a 10k layer queue, list + JSON vs FIFOQueue"""
+		layers = [[1, 10 + i % 100] for i in range(10000)]
+
+		list_time = min(timeit.repeat(lambda: replay_list(layers), number=1, repeat=3))
+		fifo_queue_time = min(timeit.repeat(lambda: replay_fifo_queue(layers), number=1, repeat=3))
+		print("\nFIFO replay of 10k layers, list + JSON: {0:.3f}s, FIFOQueue: {1:.3f}s".format(
+			list_time, fifo_queue_time))
+
+def replay_list(layers):
+	queue = json.loads(json.dumps(layers))
+	for i in range(200):
+		qty_to_pop = 5
+		while qty_to_pop:
+			batch = queue[0]
+			if qty_to_pop >= batch[0]:
+				qty_to_pop -= batch[0]
+				queue.pop(0)
+			else:
+				batch[0] -= qty_to_pop
+				qty_to_pop = 0
+		data = json.dumps(queue)
+	return data
+
+def replay_fifo_queue(layers):
+	queue = FIFOQueue.loads(FIFOQueue(layers).dumps())
+	for i in range(200):
+		qty_to_pop = 5
+		while qty_to_pop:
+			batch = queue[0]
+			if qty_to_pop >= batch[0]:
+				qty_to_pop -= batch[0]
+				queue.pop()
+			else:
+				batch[0] -= qty_to_pop
+				qty_to_pop = 0
+		data = queue.dumps()
+	return data
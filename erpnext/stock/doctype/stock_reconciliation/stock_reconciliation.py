@@ -6,7 +6,7 @@ import frappe, erpnext
 import frappe.defaults
 from frappe import msgprint, _
 from frappe.utils import cstr, flt, cint
-from erpnext.stock.stock_ledger import update_entries_after
+from erpnext.stock.stock_ledger import repost_future_sle, delete_cancelled_entry
 from erpnext.controllers.stock_controller import StockController
 from erpnext.accounts.utils import get_company_default
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
@@ -339,8 +339,7 @@ class StockReconciliation(StockController):
 			(self.doctype, self.name), as_dict=1)
 
 		# delete entries
-		frappe.db.sql("""delete from `tabStock Ledger Entry`
-			where voucher_type=%s and voucher_no=%s""", (self.doctype, self.name))
+		delete_cancelled_entry(self.doctype, self.name)
 
 		sl_entries = []
 
@@ -359,13 +358,12 @@ class StockReconciliation(StockController):
 			self.make_sl_entries(sl_entries, allow_negative_stock=allow_negative_stock)
 
 		# repost future entries for selected item_code, warehouse
-		for entries in existing_entries:
-			update_entries_after({
-				"item_code": entries.item_code,
-				"warehouse": entries.warehouse,
-				"posting_date": self.posting_date,
-				"posting_time": self.posting_time
-			})
+		repost_future_sle([{
+			"item_code": entries.item_code,
+			"warehouse": entries.warehouse,
+			"posting_date": self.posting_date,
+			"posting_time": self.posting_time
+		} for entries in existing_entries])
 
 	def merge_similar_item_serial_nos(self, sl_entries):
 		# If user has put the same item in multiple row with different serial no
@@ -11,7 +11,7 @@ from erpnext.setup.utils import get_exchange_rate
 from frappe.model.meta import get_field_precision
 from erpnext.stock.doctype.batch.batch import get_batch_no
 from erpnext import get_company_currency
-from erpnext.stock.doctype.item.item import get_item_defaults, get_uom_conv_factor
+from erpnext.stock.doctype.item.item import get_item_defaults, get_uom_conv_factor, get_prefetched_item
 from erpnext.stock.doctype.price_list.price_list import get_price_list_details
 from erpnext.setup.doctype.item_group.item_group import get_item_group_defaults
 from erpnext.setup.doctype.brand.brand import get_brand_defaults
@@ -47,7 +47,7 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 	"""
 
 	args = process_args(args)
-	item = frappe.get_cached_doc("Item", args.item_code)
+	item = get_prefetched_item(args.item_code) or frappe.get_cached_doc("Item", args.item_code)
 	validate_item_details(args, item)
 
 	out = get_basic_details(args, item, overwrite_warehouse)
@@ -106,6 +106,114 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 
 	return out
 
+@frappe.whitelist()
+def get_items_details_bulk(args, item_codes, doc=None, for_validate=False, overwrite_warehouse=True):
+	"""Returns the `get_item_details` of each of `item_codes` for the same transaction `args`,
+	in the order of `item_codes`.
+
+	The items (with their child tables and templates), item prices, bins, purchase valuation
+	rates, default BOMs and product bundles of the whole set are fetched with one query per
+	source before the items are resolved"""
+	if isinstance(args, string_types):
+		args = json.loads(args)
+
+	if isinstance(item_codes, string_types):
+		item_codes = json.loads(item_codes)
+
+	if isinstance(doc, string_types):
+		doc = json.loads(doc)
+
+	if doc:
+		doc = frappe.get_doc(doc)
+		# matching pricing rules are memoised for the pass over the items
+		doc.flags.pricing_rule_cache = frappe._dict()
+
+	frappe.flags.item_details_prefetch = prefetch_item_details(args, item_codes)
+
+	try:
+		return [get_item_details(dict(args, item_code=item_code), doc, for_validate=for_validate,
+			overwrite_warehouse=overwrite_warehouse) for item_code in item_codes]
+	finally:
+		frappe.flags.item_details_prefetch = None
+		if doc:
+			doc.flags.pricing_rule_cache = None
+
+def prefetch_item_details(args, item_codes):
+	prefetch = frappe._dict({
+		"items": get_items(item_codes),
+		"price_list": args.get("price_list") or args.get("selling_price_list") or args.get("buying_price_list"),
+		"item_prices": {},
+		"packing_units": {},
+		"bins": {},
+		"purchase_valuation_rates": {},
+		"default_boms": {},
+		"product_bundles": set()
+	})
+
+	item_codes = list(prefetch.items)
+	if not item_codes:
+		return prefetch
+
+	if prefetch.price_list:
+		for d in frappe.db.sql("""select name, item_code, price_list_rate, uom, customer, supplier,
+				valid_from, valid_upto, packing_unit
+			from `tabItem Price` where price_list=%s and item_code in %s""",
+			(prefetch.price_list, item_codes), as_dict=1):
+			prefetch.item_prices.setdefault(d.item_code, []).append(d)
+			prefetch.packing_units[d.name] = d.packing_unit
+
+	for d in frappe.db.sql("""select item_code, warehouse, projected_qty, actual_qty, reserved_qty, valuation_rate
+		from `tabBin` where item_code in %s""", (item_codes,), as_dict=1):
+		prefetch.bins[(d.item_code, d.warehouse)] = d
+
+	non_stock_items = [d.name for d in prefetch.items.values() if not d.is_stock_item]
+	if non_stock_items:
+		prefetch.purchase_valuation_rates = dict(frappe.db.sql("""
+			select item_code, sum(base_net_amount) / sum(qty*conversion_factor)
+			from `tabPurchase Invoice Item`
+			where item_code in %s and docstatus=1
+			group by item_code""", (non_stock_items,)))
+
+	prefetch.default_boms = dict(frappe.db.sql("""select item, name from `tabBOM`
+		where docstatus=1 and is_default=1 and is_active=1 and item in %s""", (item_codes,)))
+
+	prefetch.product_bundles = set(frappe.db.sql_list("""select name from `tabProduct Bundle`
+		where name in %s""", (item_codes,)))
+
+	return prefetch
+
+def get_items(item_codes):
+	"""Returns the Items of `item_codes` and their templates, with their child tables,
+	loading each table once for all the items"""
+	item_codes = list(set(d for d in item_codes if d))
+	if not item_codes:
+		return {}
+
+	items = {d.name: d for d in frappe.db.sql("""select * from `tabItem`
+		where name in %(item_codes)s
+			or name in (select variant_of from `tabItem` where name in %(item_codes)s)""",
+		{"item_codes": item_codes}, as_dict=1)}
+
+	if not items:
+		return {}
+
+	for df in frappe.get_meta("Item").get_table_fields():
+		for d in items.values():
+			d[df.fieldname] = []
+
+		for d in frappe.db.sql("""select * from `tab{0}`
+			where parenttype='Item' and parentfield=%s and parent in %s
+			order by idx asc""".format(df.options), (df.fieldname, list(items)), as_dict=1):
+			items[d.parent][df.fieldname].append(d)
+
+	return {name: frappe.get_doc(dict(d, doctype="Item")) for name, d in iteritems(items)}
+
+def get_prefetch(item_code):
+	"""Returns the sources prefetched by `get_items_details_bulk` if `item_code` is one of its items"""
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and item_code in prefetch.items:
+		return prefetch
+
 def update_stock(args, out):
 	if (args.get("doctype") == "Delivery Note" or
 		(args.get("doctype") == "Sales Invoice" and args.get('update_stock'))) \
@@ -128,7 +236,9 @@ def update_stock(args, out):
 
 
 def set_valuation_rate(out, args):
-	if frappe.db.exists("Product Bundle", args.item_code, cache=True):
+	prefetch = get_prefetch(args.item_code)
+	if (args.item_code in prefetch.product_bundles if prefetch
+		else frappe.db.exists("Product Bundle", args.item_code, cache=True)):
 		valuation_rate = 0.0
 		bundled_items = frappe.get_doc("Product Bundle", args.item_code)
 
@@ -382,11 +492,16 @@ def get_item_warehouse(item, args, overwrite_warehouse, defaults={}):
 
 def update_barcode_value(out):
 	from erpnext.accounts.doctype.sales_invoice.pos import get_barcode_data
-	barcode_data = get_barcode_data([out])
+
+	item = get_prefetched_item(out.item_code)
+	if item:
+		barcodes = [d.barcode for d in item.get("barcodes")]
+	else:
+		barcodes = get_barcode_data([out]).get(out.item_code)
 
 	# If item has one barcode then update the value of the barcode field
-	if barcode_data and len(barcode_data.get(out.item_code)) == 1:
-		out['barcode'] = barcode_data.get(out.item_code)[0]
+	if barcodes and len(barcodes) == 1:
+		out['barcode'] = barcodes[0]
 
 @frappe.whitelist()
 def get_item_tax_info(company, tax_category, item_codes):
@@ -607,6 +722,10 @@ def get_item_price(args, item_code, ignore_party=False):
 
 	args['item_code'] = item_code
 
+	prefetch = get_prefetch(item_code)
+	if prefetch and prefetch.price_list == args.get("price_list"):
+		return filter_item_prices(prefetch.item_prices.get(item_code, []), args, ignore_party)
+
 	conditions = """where item_code=%(item_code)s
 		and price_list=%(price_list)s
 		and ifnull(uom, '') in ('', %(uom)s)"""
@@ -627,6 +746,38 @@ def get_item_price(args, item_code, ignore_party=False):
 		from `tabItem Price` {conditions}
 		order by valid_from desc, uom desc """.format(conditions=conditions), args)
 
+def filter_item_prices(item_prices, args, ignore_party=False):
+	"""Returns name, price_list_rate and uom of the prefetched `item_prices` matching the
+	conditions of `get_item_price`, in the same order"""
+	transaction_date = getdate(args.get("transaction_date")) if args.get("transaction_date") else None
+
+	out = []
+	for d in item_prices:
+		if cstr(d.uom) not in ("", args.get("uom")):
+			continue
+
+		if not ignore_party:
+			if args.get("customer"):
+				if d.customer != args.get("customer"):
+					continue
+			elif args.get("supplier"):
+				if d.supplier != args.get("supplier"):
+					continue
+			elif d.customer or d.supplier:
+				continue
+
+		if transaction_date and not (getdate(d.valid_from or "2000-01-01") <= transaction_date
+			<= getdate(d.valid_upto or "2500-12-31")):
+			continue
+
+		out.append(d)
+
+	# order by valid_from desc, uom desc
+	out.sort(key=lambda d: (d.valid_from is not None, getdate(d.valid_from) if d.valid_from else None,
+		cstr(d.uom)), reverse=True)
+
+	return tuple((d.name, d.price_list_rate, d.uom) for d in out)
+
 def get_price_list_rate_for(args, item_code):
 	"""
 		:param customer: link to Customer DocType
@@ -683,9 +834,14 @@ def check_packing_list(price_list_rate_name, desired_qty, item_code):
 	"""
 
 	flag = True
-	item_price = frappe.get_doc("Item Price", price_list_rate_name)
-	if item_price.packing_unit:
-		packing_increment = desired_qty % item_price.packing_unit
+	prefetch = get_prefetch(item_code)
+	if prefetch and price_list_rate_name in prefetch.packing_units:
+		packing_unit = prefetch.packing_units[price_list_rate_name]
+	else:
+		packing_unit = frappe.get_doc("Item Price", price_list_rate_name).packing_unit
+
+	if packing_unit:
+		packing_increment = desired_qty % packing_unit
 
 		if packing_increment != 0:
 			flag = False
@@ -829,14 +985,23 @@ def get_serial_no_batchwise(args, sales_order=None):
 
 @frappe.whitelist()
 def get_conversion_factor(item_code, uom):
-	variant_of = frappe.db.get_value("Item", item_code, "variant_of", cache=True)
-	filters = {"parent": item_code, "uom": uom}
-	if variant_of:
-		filters["parent"] = ("in", (item_code, variant_of))
-	conversion_factor = frappe.db.get_value("UOM Conversion Detail",
-		filters, "conversion_factor")
+	item = get_prefetched_item(item_code)
+	if item:
+		template = get_prefetched_item(item.variant_of) if item.variant_of else None
+		uoms = item.get("uoms") + (template.get("uoms") if template else [])
+		conversion_factor = next((d.conversion_factor for d in uoms if d.uom == uom), None)
+		stock_uom = item.stock_uom
+	else:
+		variant_of = frappe.db.get_value("Item", item_code, "variant_of", cache=True)
+		filters = {"parent": item_code, "uom": uom}
+		if variant_of:
+			filters["parent"] = ("in", (item_code, variant_of))
+		conversion_factor = frappe.db.get_value("UOM Conversion Detail",
+			filters, "conversion_factor")
+		stock_uom = None
+
 	if not conversion_factor:
-		stock_uom = frappe.db.get_value("Item", item_code, "stock_uom")
+		stock_uom = stock_uom or frappe.db.get_value("Item", item_code, "stock_uom")
 		conversion_factor = get_uom_conv_factor(uom, stock_uom)
 	return {"conversion_factor": conversion_factor or 1.0}
 
@@ -847,6 +1012,13 @@ def get_projected_qty(item_code, warehouse):
 
 @frappe.whitelist()
 def get_bin_details(item_code, warehouse):
+	prefetch = get_prefetch(item_code)
+	if prefetch:
+		bin_details = prefetch.bins.get((item_code, warehouse))
+		return frappe._dict({fieldname: bin_details.get(fieldname) for fieldname in
+			("projected_qty", "actual_qty", "reserved_qty")}) if bin_details \
+				else {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0}
+
 	return frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
 		["projected_qty", "actual_qty", "reserved_qty"], as_dict=True, cache=True) \
 			or {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0}
@@ -986,6 +1158,10 @@ def get_price_list_currency_and_exchange_rate(args):
 
 @frappe.whitelist()
 def get_default_bom(item_code=None):
+	prefetch = get_prefetch(item_code)
+	if prefetch:
+		return prefetch.default_boms.get(item_code)
+
 	if item_code:
 		bom = frappe.db.get_value("BOM", {"docstatus": 1, "is_default": 1, "is_active": 1, "item": item_code})
 		if bom:
@@ -997,13 +1173,23 @@ def get_valuation_rate(item_code, company, warehouse=None):
 	item_group = get_item_group_defaults(item_code, company)
 	brand = get_brand_defaults(item_code, company)
 	# item = frappe.get_doc("Item", item_code)
+	prefetch = get_prefetch(item_code)
+
 	if item.get("is_stock_item"):
 		if not warehouse:
 			warehouse = item.get("default_warehouse") or item_group.get("default_warehouse") or brand.get("default_warehouse")
 
+		if prefetch:
+			bin_details = prefetch.bins.get((item_code, warehouse))
+			return frappe._dict({"valuation_rate": bin_details.valuation_rate}) if bin_details \
+				else {"valuation_rate": 0}
+
 		return frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
 			["valuation_rate"], as_dict=True) or {"valuation_rate": 0}
 
+	elif prefetch:
+		return {"valuation_rate": prefetch.purchase_valuation_rates.get(item_code) or 0.0}
+
 	elif not item.get("is_stock_item"):
 		valuation_rate =frappe.db.sql("""select sum(base_net_amount) / sum(qty*conversion_factor)
 			from `tabPurchase Invoice Item`
@@ -5,26 +5,22 @@ from __future__ import unicode_literals
 import frappe
 from frappe import _
 from frappe.utils import date_diff, flt
-from six import iteritems
+from six import iteritems, itervalues
+from collections import deque, OrderedDict
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
 
 def execute(filters=None):
 
 	columns = get_columns(filters)
-	item_details = get_fifo_queue(filters)
 	to_date = filters["to_date"]
-	_func = lambda x: x[1]
 
 	data = []
-	for item, item_dict in iteritems(item_details):
-
-		fifo_queue = sorted(filter(_func, item_dict["fifo_queue"]), key=_func)
+	for key, item_dict in iterate_fifo_queues(filters):
 		details = item_dict["details"]
-		if not fifo_queue or (not item_dict.get("total_qty")): continue
+		if not item_dict.get("total_qty"): continue
 
-		average_age = get_average_age(fifo_queue, to_date)
-		earliest_age = date_diff(to_date, fifo_queue[0][1])
-		latest_age = date_diff(to_date, fifo_queue[-1][1])
+		ageing_data = get_ageing_data(item_dict["fifo_queue"], to_date)
+		if not ageing_data: continue
 
 		row = [details.name, details.item_name,
 			details.description, details.item_group, details.brand]
@@ -32,13 +28,27 @@ def execute(filters=None):
 		if filters.get("show_warehouse_wise_stock"):
 			row.append(details.warehouse)
 
-		row.extend([item_dict.get("total_qty"), average_age,
-			earliest_age, latest_age, details.stock_uom])
+		row.extend([item_dict.get("total_qty"), ageing_data.average_age,
+			ageing_data.earliest_age, ageing_data.latest_age, details.stock_uom])
 
 		data.append(row)
 
 	return columns, data
 
+def get_ageing_data(fifo_queue, to_date):
+	"""average, earliest and latest age of the slots with a posting date"""
+	_func = lambda x: x[1]
+
+	fifo_queue = sorted(filter(_func, fifo_queue), key=_func)
+	if not fifo_queue:
+		return None
+
+	return frappe._dict({
+		"average_age": get_average_age(fifo_queue, to_date),
+		"earliest_age": date_diff(to_date, fifo_queue[0][1]),
+		"latest_age": date_diff(to_date, fifo_queue[-1][1])
+	})
+
 def get_average_age(fifo_queue, to_date):
 	batch_age = age_qty = total_qty = 0.0
 	for batch in fifo_queue:
@@ -134,20 +144,75 @@ def get_columns(filters):
 
 	return columns
 
+class FIFOSlots(object):
+	"""Stock in hand of an item (or item-warehouse) as FIFO slots of [qty, posting date],
+	serial nos are kept in a hash map (ordered by arrival) for constant time removal"""
+	def __init__(self):
+		self.slots = deque()
+		self.serial_nos = OrderedDict()
+
+	def add_slot(self, slot):
+		self.slots.append(slot)
+
+	def add_serial_no(self, serial_no, posting_date):
+		self.serial_nos[serial_no] = posting_date
+
+	def remove_serial_nos(self, serial_nos):
+		for serial_no in serial_nos:
+			self.serial_nos.pop(serial_no, None)
+
+	def consume(self, qty):
+		"""Remove `qty` from the oldest slots, returns the consumed slots"""
+		consumed = []
+		while qty:
+			slot = self.slots[0] if self.slots else [0, None]
+			if 0 < slot[0] <= qty:
+				# if slot qty > 0
+				# not enough or exactly same qty in current slot, clear slot
+				qty -= slot[0]
+				consumed.append(self.slots.popleft())
+			else:
+				# all from current slot
+				slot[0] -= qty
+				consumed.append([qty, slot[1]])
+				qty = 0
+
+		return consumed
+
+	def get_fifo_queue(self):
+		return list(self.slots) + [[serial_no, posting_date]
+			for serial_no, posting_date in iteritems(self.serial_nos)]
+
 def get_fifo_queue(filters, sle=None):
-	item_details = {}
+	"""FIFO queue of each item (or item-warehouse if `show_warehouse_wise_stock` is set)
+	from the given stock ledger entries, or from the ledger for the filters"""
+	if sle is None:
+		return OrderedDict(iterate_fifo_queues(filters))
+
+	return build_fifo_queues(filters, sle)
+
+def iterate_fifo_queues(filters, page_length=100):
+	"""Yield (key, item_dict) of each item (or item-warehouse), the ledger is read in
+	partitions of `page_length` items so that only one partition is held in memory"""
+	item_codes = get_item_codes(filters)
+
+	for i in range(0, len(item_codes), page_length):
+		sle = get_stock_ledger_entries(filters, item_codes[i:i + page_length])
+		for key, item_dict in iteritems(build_fifo_queues(filters, sle)):
+			yield key, item_dict
+
+def build_fifo_queues(filters, sle):
+	item_details = OrderedDict()
 	transferred_item_details = {}
 	serial_no_batch_purchase_details = {}
 
-	if sle == None:
-		sle = get_stock_ledger_entries(filters)
-
 	for d in sle:
 		key = (d.name, d.warehouse) if filters.get('show_warehouse_wise_stock') else d.name
-		item_details.setdefault(key, {"details": d, "fifo_queue": []})
-		fifo_queue = item_details[key]["fifo_queue"]
+		if key not in item_details:
+			item_details[key] = {"details": d, "fifo_slots": FIFOSlots()}
+		fifo_slots = item_details[key]["fifo_slots"]
 
-		transferred_item_details.setdefault((d.voucher_no, d.name), [])
+		transferred_item_details.setdefault((d.voucher_no, d.name), deque())
 
 		if d.voucher_type == "Stock Reconciliation":
 			d.actual_qty = flt(d.qty_after_transaction) - flt(item_details[key].get("qty_after_transaction", 0))
@@ -156,38 +221,19 @@ def get_fifo_queue(filters, sle=None):
 
 		if d.actual_qty > 0:
 			if transferred_item_details.get((d.voucher_no, d.name)):
-				batch = transferred_item_details[(d.voucher_no, d.name)][0]
-				fifo_queue.append(batch)
-				transferred_item_details[((d.voucher_no, d.name))].pop(0)
+				fifo_slots.add_slot(transferred_item_details[(d.voucher_no, d.name)].popleft())
 			else:
 				if serial_no_list:
 					for serial_no in serial_no_list:
-						if serial_no_batch_purchase_details.get(serial_no):
-							fifo_queue.append([serial_no, serial_no_batch_purchase_details.get(serial_no)])
-						else:
-							serial_no_batch_purchase_details.setdefault(serial_no, d.posting_date)
-							fifo_queue.append([serial_no, d.posting_date])
+						posting_date = serial_no_batch_purchase_details.setdefault(serial_no, d.posting_date)
+						fifo_slots.add_serial_no(serial_no, posting_date)
 				else:
-					fifo_queue.append([d.actual_qty, d.posting_date])
+					fifo_slots.add_slot([d.actual_qty, d.posting_date])
 		else:
 			if serial_no_list:
-				for serial_no in fifo_queue:
-					if serial_no[0] in serial_no_list:
-						fifo_queue.remove(serial_no)
+				fifo_slots.remove_serial_nos(serial_no_list)
 			else:
-				qty_to_pop = abs(d.actual_qty)
-				while qty_to_pop:
-					batch = fifo_queue[0] if fifo_queue else [0, None]
-					if 0 < batch[0] <= qty_to_pop:
-						# if batch qty > 0
-						# not enough or exactly same qty in current batch, clear batch
-						qty_to_pop -= batch[0]
-						transferred_item_details[(d.voucher_no, d.name)].append(fifo_queue.pop(0))
-					else:
-						# all from current batch
-						batch[0] -= qty_to_pop
-						transferred_item_details[(d.voucher_no, d.name)].append([qty_to_pop, batch[1]])
-						qty_to_pop = 0
+				transferred_item_details[(d.voucher_no, d.name)].extend(fifo_slots.consume(abs(d.actual_qty)))
 
 		item_details[key]["qty_after_transaction"] = d.qty_after_transaction
 
@@ -196,9 +242,29 @@ def get_fifo_queue(filters, sle=None):
 		else:
 			item_details[key]["total_qty"] += d.actual_qty
 
+	for item_dict in itervalues(item_details):
+		item_dict["fifo_queue"] = item_dict.pop("fifo_slots").get_fifo_queue()
+
 	return item_details
 
-def get_stock_ledger_entries(filters):
+def get_item_codes(filters):
+	return frappe.db.sql_list("""select distinct item_code
+		from `tabStock Ledger Entry` sle
+		where company = %(company)s and
+			posting_date <= %(to_date)s and
+			item_code in (select name from `tabItem` {item_conditions})
+			{sle_conditions}
+		order by item_code""" #nosec
+		.format(item_conditions=get_item_conditions(filters),
+			sle_conditions=get_sle_conditions(filters)), filters)
+
+def get_stock_ledger_entries(filters, item_codes=None):
+	sle_conditions = get_sle_conditions(filters)
+	values = filters
+	if item_codes:
+		sle_conditions += " and sle.item_code in %(item_codes)s"
+		values = dict(filters, item_codes=item_codes)
+
 	return frappe.db.sql("""select
 			item.name, item.item_name, item_group, brand, description, item.stock_uom,
 			actual_qty, posting_date, voucher_type, voucher_no, serial_no, batch_no, qty_after_transaction, warehouse
@@ -211,7 +277,7 @@ def get_stock_ledger_entries(filters):
 			{sle_conditions}
 			order by posting_date, posting_time, sle.creation, actual_qty""" #nosec
 		.format(item_conditions=get_item_conditions(filters),
-			sle_conditions=get_sle_conditions(filters)), filters, as_dict=True)
+			sle_conditions=sle_conditions), values, as_dict=True)
 
 def get_item_conditions(filters):
 	conditions = []
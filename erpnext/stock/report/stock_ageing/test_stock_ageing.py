@@ -0,0 +1,45 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+from __future__ import unicode_literals
+
+import frappe
+import unittest
+from erpnext.stock.report.stock_ageing.stock_ageing import build_fifo_queues
+
+class TestStockAgeing(unittest.TestCase):
+	def test_fifo_queues(self):
+		sle = [
+			make_sle("2020-01-01", 10, "SE-1", "Stores"),
+			make_sle("2020-01-05", 5, "SE-2", "Stores"),
+			# transfer of 12 units, consumes the oldest slots
+			make_sle("2020-01-10", -12, "SE-3", "Stores"),
+			make_sle("2020-01-10", 12, "SE-3", "Finished Goods"),
+			make_sle("2020-01-15", -1, "DN-1", "Stores")
+		]
+
+		item_details = build_fifo_queues(frappe._dict(show_warehouse_wise_stock=1), sle)
+
+		self.assertEqual(item_details[("Item A", "Stores")]["fifo_queue"], [[2, "2020-01-05"]])
+		self.assertEqual(item_details[("Item A", "Stores")]["total_qty"], 2)
+		self.assertEqual(item_details[("Item A", "Finished Goods")]["fifo_queue"], [[10, "2020-01-01"]])
+
+	def test_serial_no_fifo_queues(self):
+		sle = [
+			make_sle("2020-01-01", 3, "PR-1", "Stores", serial_no="SN1\nSN2\nSN3"),
+			make_sle("2020-01-05", -2, "DN-1", "Stores", serial_no="SN1\nSN3")
+		]
+
+		item_details = build_fifo_queues(frappe._dict(), sle)
+		self.assertEqual(item_details["Item A"]["fifo_queue"], [["SN2", "2020-01-01"]])
+
+def make_sle(posting_date, actual_qty, voucher_no, warehouse, serial_no=None):
+	return frappe._dict({
+		"name": "Item A",
+		"posting_date": posting_date,
+		"actual_qty": actual_qty,
+		"voucher_type": "Stock Entry",
+		"voucher_no": voucher_no,
+		"warehouse": warehouse,
+		"serial_no": serial_no,
+		"qty_after_transaction": 0
+	})
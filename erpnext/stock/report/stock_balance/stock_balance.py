@@ -4,11 +4,12 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
-from frappe.utils import flt, cint, getdate, now, date_diff
+from frappe.utils import flt, cint, getdate, now
 from erpnext.stock.utils import add_additional_uom_columns
 from erpnext.stock.report.stock_ledger.stock_ledger import get_item_group_condition
 
-from erpnext.stock.report.stock_ageing.stock_ageing import get_fifo_queue, get_average_age
+from erpnext.stock.report.stock_ageing.stock_ageing import get_fifo_queue, get_ageing_data
+from erpnext.stock.doctype.stock_closing_balance.stock_closing_balance import get_closing_balance_date
 
 from six import iteritems
 
@@ -40,8 +41,6 @@ def execute(filters=None):
 	data = []
 	conversion_factors = {}
 
-	_func = lambda x: x[1]
-
 	for (company, item, warehouse) in sorted(iwb_map):
 		if item_map.get(item):
 			qty_dict = iwb_map[(company, item, warehouse)]
@@ -73,12 +72,10 @@ def execute(filters=None):
 					'latest_age': 0
 				}
 				if fifo_queue:
-					fifo_queue = sorted(filter(_func, fifo_queue), key=_func)
-					if not fifo_queue: continue
+					ageing_data = get_ageing_data(fifo_queue, to_date)
+					if not ageing_data: continue
 
-					stock_ageing_data['average_age'] = get_average_age(fifo_queue, to_date)
-					stock_ageing_data['earliest_age'] = date_diff(to_date, fifo_queue[0][1])
-					stock_ageing_data['latest_age'] = date_diff(to_date, fifo_queue[-1][1])
+					stock_ageing_data.update(ageing_data)
 
 				report_data.update(stock_ageing_data)
 
@@ -132,6 +129,12 @@ def get_conditions(filters):
 	else:
 		frappe.throw(_("'To Date' is required"))
 
+	conditions += get_warehouse_conditions(filters)
+
+	return conditions
+
+def get_warehouse_conditions(filters):
+	conditions = ""
 	if filters.get("warehouse"):
 		warehouse_details = frappe.db.get_value("Warehouse",
 			filters.get("warehouse"), ["lft", "rgt"], as_dict=1)
@@ -154,7 +157,17 @@ def get_stock_ledger_entries(filters, items):
 
 	conditions = get_conditions(filters)
 
-	return frappe.db.sql("""
+	# start from the closing balances of the latest period before the report,
+	# ageing needs all the incoming entries so it is computed from the full ledger
+	opening_entries = []
+	closing_balance_date = (get_closing_balance_date(filters.get("from_date"))
+		if not filters.get("show_stock_ageing_data") else None)
+
+	if closing_balance_date:
+		conditions += " and sle.posting_date > %s" % frappe.db.escape(closing_balance_date)
+		opening_entries = get_closing_balance_entries(closing_balance_date, item_conditions_sql, filters)
+
+	return opening_entries + frappe.db.sql("""
 		select
 			sle.item_code, warehouse, sle.posting_date, sle.actual_qty, sle.valuation_rate,
 			sle.company, sle.voucher_type, sle.qty_after_transaction, sle.stock_value_difference,
@@ -165,6 +178,20 @@ def get_stock_ledger_entries(filters, items):
 		order by sle.posting_date, sle.posting_time, sle.creation, sle.actual_qty""" % #nosec
 		(item_conditions_sql, conditions), as_dict=1)
 
+def get_closing_balance_entries(closing_balance_date, item_conditions_sql, filters):
+	"""closing balances as opening entries of the item-warehouses"""
+	return frappe.db.sql("""
+		select
+			sle.item_code, warehouse, sle.period_end_date as posting_date,
+			sle.qty_after_transaction as actual_qty, sle.valuation_rate, sle.company,
+			'Stock Closing Balance' as voucher_type, sle.qty_after_transaction,
+			sle.stock_value as stock_value_difference, sle.item_code as name, sle.name as voucher_no
+		from
+			`tabStock Closing Balance` sle
+		where sle.period_end_date = %s %s %s""" % #nosec
+		(frappe.db.escape(closing_balance_date), item_conditions_sql, get_warehouse_conditions(filters)),
+		as_dict=1)
+
 def get_item_warehouse_map(filters, sle):
 	iwb_map = {}
 	from_date = getdate(filters.get("from_date"))
@@ -10,7 +10,7 @@ from frappe import _
 from frappe.utils import flt, cint, getdate
 from erpnext.stock.report.stock_balance.stock_balance import (get_item_details,
 	get_item_reorder_details, get_item_warehouse_map, get_items, get_stock_ledger_entries)
-from erpnext.stock.report.stock_ageing.stock_ageing import get_fifo_queue, get_average_age
+from erpnext.stock.report.stock_ageing.stock_ageing import iterate_fifo_queues, get_average_age
 from six import iteritems
 
 def execute(filters=None):
@@ -26,7 +26,7 @@ def execute(filters=None):
 	item_map = get_item_details(items, sle, filters)
 	iwb_map = get_item_warehouse_map(filters, sle)
 	warehouse_list = get_warehouse_list(filters)
-	item_ageing = get_fifo_queue(filters)
+	item_ageing = get_item_ageing(filters)
 	data = []
 	item_balance = {}
 	item_value = {}
@@ -49,17 +49,12 @@ def execute(filters=None):
 
 	# sum bal_qty by item
 	for (item, item_group), wh_balance in iteritems(item_balance):
-		if not item_ageing.get(item):  continue
+		if item not in item_ageing:  continue
 
 		total_stock_value = sum(item_value[(item, item_group)])
 		row = [item, item_group, total_stock_value]
 
-		fifo_queue = item_ageing[item]["fifo_queue"]
-		average_age = 0.00
-		if fifo_queue:
-			average_age = get_average_age(fifo_queue, filters["to_date"])
-
-		row += [average_age]
+		row += [item_ageing[item]]
 
 		bal_qty = [sum(bal_qty) for bal_qty in zip(*wh_balance)]
 		total_qty = sum(bal_qty)
@@ -74,6 +69,15 @@ def execute(filters=None):
 	add_warehouse_column(columns, warehouse_list)
 	return columns, data
 
+def get_item_ageing(filters):
+	"""average age of each item, the FIFO queues are discarded as each item is processed"""
+	item_ageing = {}
+	for item, item_dict in iterate_fifo_queues(filters):
+		fifo_queue = item_dict["fifo_queue"]
+		item_ageing[item] = get_average_age(fifo_queue, filters["to_date"]) if fifo_queue else 0.00
+
+	return item_ageing
+
 def get_columns(filters):
 	"""return columns"""
 
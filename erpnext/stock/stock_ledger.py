@@ -4,11 +4,15 @@ from __future__ import unicode_literals
 
 import frappe, erpnext
 from frappe import _
-from frappe.utils import cint, flt, cstr, now
+from frappe.utils import cint, flt, cstr, now, nowdate, get_datetime
 from erpnext.stock.utils import get_valuation_method
-import json
+from erpnext.stock.valuation import FIFOQueue
+from erpnext.stock.doctype.stock_closing_balance.stock_closing_balance import invalidate_stock_closing_balances
+from erpnext.stock.doctype.serial_no_movement.serial_no_movement import delete_serial_no_movements
+from erpnext.stock.doctype.batch_bin.batch_bin import update_batch_bins, reverse_batch_bins
 
 from six import iteritems
+from datetime import timedelta
 
 # future reposting
 class NegativeStockError(frappe.ValidationError): pass
@@ -17,37 +21,79 @@ _exceptions = frappe.local('stockledger_exceptions')
 # _exceptions = []
 
 def make_sl_entries(sl_entries, is_amended=None, allow_negative_stock=False, via_landed_cost_voucher=False):
+	"""Create stock ledger entries and repost the valuation of the affected item-warehouses.
+
+	Returns True if reposting of the entries after the voucher has been queued
+	in Repost Item Valuation (see Stock Settings)"""
 	if sl_entries:
 		from erpnext.stock.utils import update_bin
+		from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import (is_reposting_deferred,
+			queue_repost_item_valuation)
 
 		cancel = True if sl_entries[0].get("is_cancelled") == "Yes" else False
 		if cancel:
 			set_as_cancel(sl_entries[0].get('voucher_no'), sl_entries[0].get('voucher_type'))
 
 		for sle in sl_entries:
-			sle_id = None
 			if sle.get('is_cancelled') == 'Yes':
 				sle['actual_qty'] = -flt(sle['actual_qty'])
 
-			if sle.get("actual_qty") or sle.get("voucher_type")=="Stock Reconciliation":
-				sle_id = make_entry(sle, allow_negative_stock, via_landed_cost_voucher)
-
-			args = sle.copy()
-			args.update({
-				"sle_id": sle_id,
-				"is_amended": is_amended
-			})
-			update_bin(args, allow_negative_stock, via_landed_cost_voucher)
+		if can_make_entries_in_bulk(sl_entries):
+			updated_entries = make_entries_in_bulk(sl_entries, allow_negative_stock, via_landed_cost_voucher)
+		else:
+			updated_entries = []
+			for sle in sl_entries:
+				sle_id = None
+				if sle.get("actual_qty") or sle.get("voucher_type")=="Stock Reconciliation":
+					sle_id = make_entry(sle, allow_negative_stock, via_landed_cost_voucher)
+					update_batch_bins([sle])
+
+				args = sle.copy()
+				args.update({
+					"sle_id": sle_id,
+					"is_amended": is_amended
+				})
+
+				if update_bin(args, allow_negative_stock, via_landed_cost_voucher, repost=False):
+					updated_entries.append(sle)
+
+		# valuation of all the affected item-warehouses is reposted in one pass below
+		repost_args = []
+		for sle in updated_entries:
+			if (sle.get("actual_qty") or sle.get("voucher_type") == "Stock Reconciliation") \
+				and not (sle.get("is_cancelled") == "Yes" and via_landed_cost_voucher):
+				repost_args.append({
+					"item_code": sle.get("item_code"),
+					"warehouse": sle.get("warehouse"),
+					"company": sle.get("company"),
+					"posting_date": sle.get("posting_date") or nowdate(),
+					"posting_time": sle.get("posting_time"),
+					"voucher_type": sle.get("voucher_type"),
+					"voucher_no": sle.get("voucher_no")
+				})
+
+		defer_future_entries = is_reposting_deferred()
+		pending_args = repost_future_sle(repost_args, allow_negative_stock=allow_negative_stock,
+			via_landed_cost_voucher=via_landed_cost_voucher, defer_future_entries=defer_future_entries)
+
+		if pending_args:
+			queue_repost_item_valuation(pending_args, allow_negative_stock=allow_negative_stock,
+				via_landed_cost_voucher=via_landed_cost_voucher)
 
 		if cancel:
 			delete_cancelled_entry(sl_entries[0].get('voucher_type'), sl_entries[0].get('voucher_no'))
 
+		return bool(pending_args)
+
 def set_as_cancel(voucher_type, voucher_no):
 	frappe.db.sql("""update `tabStock Ledger Entry` set is_cancelled='Yes',
 		modified=%s, modified_by=%s
 		where voucher_no=%s and voucher_type=%s""",
 		(now(), frappe.session.user, voucher_type, voucher_no))
 
+	# serial no movements are indexed only for active entries
+	delete_serial_no_movements(voucher_type, voucher_no)
+
 def make_entry(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	args.update({"doctype": "Stock Ledger Entry"})
 	sle = frappe.get_doc(args)
@@ -58,10 +104,75 @@ def make_entry(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	sle.submit()
 	return sle.name
 
+def can_make_entries_in_bulk(sl_entries):
+	"""Entries of serialized and batched items (which create, update and validate Serial No
+	and Batch records on submit) and Stock Ledger Entry doc_events hooks need the per-row path"""
+	if frappe.flags.disable_bulk_sl_entries:
+		return False
+
+	doc_events = frappe.get_hooks("doc_events")
+	if doc_events.get("Stock Ledger Entry") or doc_events.get("*"):
+		return False
+
+	if any(sle.get("serial_no") or sle.get("batch_no") for sle in sl_entries):
+		return False
+
+	return not frappe.db.sql("""select name from `tabItem`
+		where name in %s and (has_serial_no = 1 or has_batch_no = 1)
+		limit 1""", [list(set(sle.get("item_code") for sle in sl_entries))])
+
+def make_entries_in_bulk(sl_entries, allow_negative_stock=False, via_landed_cost_voucher=False):
+	"""Insert the stock ledger entries of a voucher with multi-row inserts and update the
+	Bin of each item-warehouse once, returns the entries of stock items.
+
+	Produces the same ledger as `make_entry` for each entry, the validations of the
+	Stock Ledger Entry controller are run for all the entries at once."""
+	from erpnext.stock.utils import get_bin
+	from erpnext.stock.doctype.stock_ledger_entry.stock_ledger_entry import validate_sl_entries
+	from erpnext.utilities.bulk_insert import bulk_insert
+
+	entries = [sle for sle in sl_entries
+		if sle.get("actual_qty") or sle.get("voucher_type")=="Stock Reconciliation"]
+
+	if entries:
+		validate_sl_entries(entries)
+
+		columns = frappe.get_meta("Stock Ledger Entry").get_valid_columns()
+		creation = get_datetime(now())
+		rows = []
+		for i, sle in enumerate(entries):
+			row = {key: value for key, value in sle.items() if key in columns}
+			# entries of a voucher are ordered by creation, as if inserted one by one
+			row["creation"] = row["modified"] = creation + timedelta(microseconds=i)
+			row["to_rename"] = 1
+			rows.append(row)
+
+		bulk_insert("Stock Ledger Entry", rows, docstatus=1)
+
+	stock_items = set(d.name for d in frappe.get_all("Item", filters={"is_stock_item": 1,
+		"name": ("in", list(set(sle.get("item_code") for sle in sl_entries)))}))
+
+	bin_entries = {}
+	for sle in sl_entries:
+		if sle.get("item_code") not in stock_items:
+			frappe.msgprint(_("Item {0} ignored since it is not a stock item").format(sle.get("item_code")))
+			continue
+
+		bin_entries.setdefault((sle.get("item_code"), sle.get("warehouse")), []).append(sle)
+
+	for (item_code, warehouse), args_list in iteritems(bin_entries):
+		get_bin(item_code, warehouse).update_qty_for_entries(args_list)
+
+	return [sle for sle in sl_entries if sle.get("item_code") in stock_items]
+
 def delete_cancelled_entry(voucher_type, voucher_no):
+	reverse_batch_bins(voucher_type, voucher_no)
+
 	frappe.db.sql("""delete from `tabStock Ledger Entry`
 		where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
 
+	delete_serial_no_movements(voucher_type, voucher_no)
+
 class update_entries_after(object):
 	"""
 		update valution rate and qty after transaction
@@ -76,7 +187,8 @@ class update_entries_after(object):
 				"posting_time": "12:00"
 			}
 	"""
-	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1):
+	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1,
+		previous_sle=None, entries_to_fix=None, defer_updates=False):
 		from frappe.model.meta import get_field_precision
 
 		self.exceptions = []
@@ -88,12 +200,20 @@ class update_entries_after(object):
 			self.allow_negative_stock = cint(frappe.db.get_single_value("Stock Settings",
 				"allow_negative_stock"))
 
+		# when called from repost_future_sle, the previous sle and the entries to repost
+		# are already fetched and the updated entries are written back in bulk
+		self.entries_to_fix = entries_to_fix
+		self.defer_updates = defer_updates
+		self.updated_entries = []
+
 		self.args = args
 		for key, value in iteritems(args):
 			setattr(self, key, value)
 
-		self.previous_sle = self.get_sle_before_datetime()
-		self.previous_sle = self.previous_sle[0] if self.previous_sle else frappe._dict()
+		if previous_sle is None:
+			previous_sle = self.get_sle_before_datetime()
+			previous_sle = previous_sle[0] if previous_sle else None
+		self.previous_sle = previous_sle or frappe._dict()
 
 		for key in ("qty_after_transaction", "valuation_rate", "stock_value"):
 			setattr(self, key, flt(self.previous_sle.get(key)))
@@ -103,14 +223,16 @@ class update_entries_after(object):
 			currency=frappe.get_cached_value('Company',  self.company,  "default_currency"))
 
 		self.prev_stock_value = self.previous_sle.stock_value or 0.0
-		self.stock_queue = json.loads(self.previous_sle.stock_queue or "[]")
+		self.stock_queue = FIFOQueue.loads(self.previous_sle.stock_queue)
 		self.valuation_method = get_valuation_method(self.item_code)
 		self.stock_value_difference = 0.0
 		self.build()
 
 	def build(self):
 		# includes current entry!
-		entries_to_fix = self.get_sle_after_datetime()
+		entries_to_fix = self.entries_to_fix
+		if entries_to_fix is None:
+			entries_to_fix = self.get_sle_after_datetime()
 
 		for sle in entries_to_fix:
 			self.process_sle(sle)
@@ -118,7 +240,9 @@ class update_entries_after(object):
 		if self.exceptions:
 			self.raise_exceptions()
 
-		self.update_bin()
+		if not self.defer_updates:
+			self.update_bin()
+			invalidate_stock_closing_balances([self.args])
 
 	def update_bin(self):
 		# update bin
@@ -166,7 +290,7 @@ class update_entries_after(object):
 				# assert
 				self.valuation_rate = sle.valuation_rate
 				self.qty_after_transaction = sle.qty_after_transaction
-				self.stock_queue = [[self.qty_after_transaction, self.valuation_rate]]
+				self.stock_queue = FIFOQueue([[self.qty_after_transaction, self.valuation_rate]])
 				self.stock_value = flt(self.qty_after_transaction) * flt(self.valuation_rate)
 			else:
 				if self.valuation_method == "Moving Average":
@@ -176,7 +300,7 @@ class update_entries_after(object):
 				else:
 					self.get_fifo_values(sle)
 					self.qty_after_transaction += flt(sle.actual_qty)
-					self.stock_value = sum((flt(batch[0]) * flt(batch[1]) for batch in self.stock_queue))
+					self.stock_value = self.stock_queue.get_stock_value()
 
 		# rounding as per precision
 		self.stock_value = flt(self.stock_value, self.precision)
@@ -189,10 +313,14 @@ class update_entries_after(object):
 		sle.qty_after_transaction = self.qty_after_transaction
 		sle.valuation_rate = self.valuation_rate
 		sle.stock_value = self.stock_value
-		sle.stock_queue = json.dumps(self.stock_queue)
+		sle.stock_queue = self.stock_queue.dumps()
 		sle.stock_value_difference = stock_value_difference
-		sle.doctype="Stock Ledger Entry"
-		frappe.get_doc(sle).db_update()
+
+		if self.defer_updates:
+			self.updated_entries.append(sle)
+		else:
+			sle.doctype="Stock Ledger Entry"
+			frappe.get_doc(sle).db_update()
 
 	def validate_negative_stock(self, sle):
 		"""
@@ -256,18 +384,14 @@ class update_entries_after(object):
 		for serial_no in invalid_serial_nos:
 			incoming_rate = frappe.db.sql("""
 				select incoming_rate
-				from `tabStock Ledger Entry`
+				from `tabSerial No Movement`
 				where
 					company = %s
 					and actual_qty > 0
-					and (serial_no = %s
-						or serial_no like %s
-						or serial_no like %s
-						or serial_no like %s
-					)
+					and serial_no = %s
 				order by posting_date desc
 				limit 1
-			""", (sle.company, serial_no, serial_no+'\n%', '%\n'+serial_no, '%\n'+serial_no+'\n%'))
+			""", (sle.company, serial_no))
 
 			incoming_values += flt(incoming_rate[0][0]) if incoming_rate else 0
 
@@ -317,18 +441,7 @@ class update_entries_after(object):
 		outgoing_rate = flt(sle.outgoing_rate)
 
 		if actual_qty > 0:
-			if not self.stock_queue:
-				self.stock_queue.append([0, 0])
-
-			# last row has the same rate, just updated the qty
-			if self.stock_queue[-1][1]==incoming_rate:
-				self.stock_queue[-1][0] += actual_qty
-			else:
-				if self.stock_queue[-1][0] > 0:
-					self.stock_queue.append([actual_qty, incoming_rate])
-				else:
-					qty = self.stock_queue[-1][0] + actual_qty
-					self.stock_queue[-1] = [qty, incoming_rate]
+			self.stock_queue.add_stock(actual_qty, incoming_rate)
 		else:
 			qty_to_pop = abs(actual_qty)
 			while qty_to_pop:
@@ -347,16 +460,11 @@ class update_entries_after(object):
 				index = None
 				if outgoing_rate > 0:
 					# Find the entry where rate matched with outgoing rate
-					for i, v in enumerate(self.stock_queue):
-						if v[1] == outgoing_rate:
-							index = i
-							break
+					index = self.stock_queue.index_of_rate(outgoing_rate)
 
 					# If no entry found with outgoing rate, collapse stack
 					if index == None:
-						new_stock_value = sum((d[0]*d[1] for d in self.stock_queue)) - qty_to_pop*outgoing_rate
-						new_stock_qty = sum((d[0] for d in self.stock_queue)) - qty_to_pop
-						self.stock_queue = [[new_stock_qty, new_stock_value/new_stock_qty if new_stock_qty > 0 else outgoing_rate]]
+						self.stock_queue.collapse(qty_to_pop, outgoing_rate)
 						break
 				else:
 					index = 0
@@ -379,8 +487,7 @@ class update_entries_after(object):
 					batch[0] = batch[0] - qty_to_pop
 					qty_to_pop = 0
 
-		stock_value = sum((flt(batch[0]) * flt(batch[1]) for batch in self.stock_queue))
-		stock_qty = sum((flt(batch[0]) for batch in self.stock_queue))
+		stock_qty, stock_value = self.stock_queue.get_total_qty_and_value()
 
 		if stock_qty:
 			self.valuation_rate = stock_value / flt(stock_qty)
@@ -432,6 +539,195 @@ class update_entries_after(object):
 		else:
 			raise NegativeStockError(msg)
 
+def repost_future_sle(args_list, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1,
+	defer_future_entries=False):
+	"""
+		Repost valuation of future entries for multiple item-warehouses in one pass
+
+		Instead of running `update_entries_after` with its own queries for each (item_code, warehouse),
+		the previous entries and the entries to repost of all the keys are fetched together,
+		the valuation is replayed per key in memory and the ledger and bins are updated in bulk.
+
+		If `defer_future_entries` is set, only the entries up to the voucher (`voucher_no` in args) are
+		reposted and the args of the item-warehouses which still have entries after it are returned.
+
+		args_list = [{
+			"item_code": "ABC",
+			"warehouse": "XYZ",
+			"posting_date": "2012-12-12",
+			"posting_time": "12:00"
+		}]
+	"""
+	# earliest posting datetime for each item-warehouse
+	repost_map = {}
+	for args in args_list:
+		args = frappe._dict(args)
+		key = (args.item_code, args.warehouse)
+		args.posting_date = args.posting_date or "1900-01-01"
+		args.posting_time = args.posting_time or "00:00"
+		timestamp = get_datetime("{0} {1}".format(args.posting_date, args.posting_time))
+
+		if key not in repost_map or timestamp < repost_map[key][0]:
+			repost_map[key] = (timestamp, args)
+
+	if not repost_map:
+		return []
+
+	if not allow_negative_stock:
+		allow_negative_stock = cint(frappe.db.get_single_value("Stock Settings", "allow_negative_stock"))
+
+	invalidate_stock_closing_balances([d[1] for d in repost_map.values()])
+
+	previous_sle_map = get_previous_sle_map([d[1] for d in repost_map.values()])
+	entries_map = get_future_sle_map(repost_map, previous_sle_map)
+
+	updated_entries, bin_values, pending_args = [], [], []
+	for key, (timestamp, args) in iteritems(repost_map):
+		entries_to_fix, has_pending_entries = entries_map.get(key, []), False
+		if defer_future_entries:
+			entries_till_voucher = get_entries_till_voucher(entries_to_fix, args.voucher_no)
+			if len(entries_till_voucher) < len(entries_to_fix):
+				pending_args.append(args)
+				entries_to_fix, has_pending_entries = entries_till_voucher, True
+
+		repost = update_entries_after(args, allow_zero_rate=allow_zero_rate,
+			allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher,
+			verbose=verbose, previous_sle=previous_sle_map.get(key) or frappe._dict(),
+			entries_to_fix=entries_to_fix, defer_updates=True)
+
+		updated_entries.extend(repost.updated_entries)
+		if has_pending_entries:
+			# bin is updated after the future entries are reposted
+			continue
+
+		bin_values.append(frappe._dict({
+			"item_code": args.item_code,
+			"warehouse": args.warehouse,
+			"actual_qty": repost.qty_after_transaction,
+			"valuation_rate": repost.valuation_rate,
+			"stock_value": repost.stock_value
+		}))
+
+	bulk_update_sle(updated_entries)
+	bulk_update_bin(bin_values)
+
+	return pending_args
+
+def get_entries_till_voucher(entries, voucher_no):
+	"""entries up to and including the last entry of the voucher"""
+	for i in range(len(entries) - 1, -1, -1):
+		if entries[i].voucher_no == voucher_no:
+			return entries[:i + 1]
+
+	return []
+
+def get_previous_sle_map(args_list):
+	"""get the last sle before the posting datetime of each item-warehouse in a single query"""
+	queries, values = [], []
+	for args in args_list:
+		queries.append("""(select *, timestamp(posting_date, posting_time) as "timestamp"
+			from `tabStock Ledger Entry`
+			where item_code = %s and warehouse = %s
+				and ifnull(is_cancelled, 'No')='No'
+				and timestamp(posting_date, posting_time) < timestamp(%s, %s)
+			order by timestamp(posting_date, posting_time) desc, creation desc
+			limit 1)""")
+		values.extend([args.item_code, args.warehouse, args.posting_date, args.posting_time])
+
+	previous_sle_map = {}
+	for sle in frappe.db.sql(" union all ".join(queries), tuple(values), as_dict=1):
+		previous_sle_map[(sle.item_code, sle.warehouse)] = sle
+
+	return previous_sle_map
+
+def get_future_sle_map(repost_map, previous_sle_map, chunk_size=100):
+	"""get the entries to repost for all the item-warehouses, ordered by posting datetime, with one
+	query per `chunk_size` item-warehouses. Only the entries of each item-warehouse after its own
+	previous entry are read and locked"""
+	from_timestamp = {}
+	for key in repost_map:
+		previous_sle = previous_sle_map.get(key)
+		from_timestamp[key] = (get_datetime(previous_sle.timestamp) if previous_sle
+			else get_datetime("1900-01-01 00:00"))
+
+	keys = list(from_timestamp)
+	entries_map = {}
+	for i in range(0, len(keys), chunk_size):
+		chunk = keys[i:i + chunk_size]
+
+		conditions, values = [], []
+		for item_code, warehouse in chunk:
+			conditions.append("""(item_code = %s and warehouse = %s
+				and timestamp(posting_date, posting_time) > %s)""")
+			values.extend([item_code, warehouse, from_timestamp[(item_code, warehouse)]])
+
+		for sle in frappe.db.sql("""select *, timestamp(posting_date, posting_time) as "timestamp"
+			from `tabStock Ledger Entry`
+			where ({0}) and ifnull(is_cancelled, 'No')='No'
+			order by item_code, warehouse, timestamp(posting_date, posting_time), creation
+			for update""".format(" or ".join(conditions)), tuple(values), as_dict=1):
+			key = (sle.item_code, sle.warehouse)
+			previous_sle = previous_sle_map.get(key)
+			if previous_sle and sle.name == previous_sle.name:
+				continue
+
+			entries_map.setdefault(key, []).append(sle)
+
+	return entries_map
+
+def bulk_update_sle(entries, chunk_size=500):
+	"""write back the reposted valuation fields of stock ledger entries, `chunk_size` rows per query"""
+	fields = ("qty_after_transaction", "valuation_rate", "stock_value", "stock_queue", "stock_value_difference")
+
+	for i in range(0, len(entries), chunk_size):
+		chunk = entries[i:i + chunk_size]
+		names = [frappe.db.escape(d.name) for d in chunk]
+
+		set_values = []
+		for fieldname in fields:
+			cases = " ".join("when {0} then {1}".format(name, frappe.db.escape(cstr(d.get(fieldname))))
+				for name, d in zip(names, chunk))
+			set_values.append("`{0}` = case name {1} end".format(fieldname, cases))
+
+		frappe.db.sql("""update `tabStock Ledger Entry`
+			set {0}, modified = %s, modified_by = %s
+			where name in ({1})""".format(", ".join(set_values), ", ".join(names)),
+			(now(), frappe.session.user))
+
+def bulk_update_bin(bin_values):
+	"""update actual qty and valuation of bins after repost, creating the missing ones"""
+	if not bin_values:
+		return
+
+	existing_bins = {}
+	for d in frappe.db.sql("""select name, item_code, warehouse from `tabBin`
+		where item_code in %(item_codes)s and warehouse in %(warehouses)s""", {
+			"item_codes": list(set(d.item_code for d in bin_values)),
+			"warehouses": list(set(d.warehouse for d in bin_values))
+		}, as_dict=1):
+		existing_bins[(d.item_code, d.warehouse)] = d.name
+
+	for d in bin_values:
+		bin_name = existing_bins.get((d.item_code, d.warehouse))
+		if not bin_name:
+			bin_doc = frappe.get_doc({
+				"doctype": "Bin",
+				"item_code": d.item_code,
+				"warehouse": d.warehouse
+			})
+			bin_doc.insert(ignore_permissions=True)
+			bin_name = bin_doc.name
+
+		frappe.db.sql("""update `tabBin`
+			set actual_qty = %(actual_qty)s, valuation_rate = %(valuation_rate)s, stock_value = %(stock_value)s,
+				projected_qty = %(actual_qty)s + ordered_qty + indented_qty + planned_qty - reserved_qty
+					- reserved_qty_for_production - reserved_qty_for_sub_contract,
+				modified = %(modified)s
+			where name = %(name)s""", dict(d, name=bin_name, modified=now()))
+
+		# clear the cached document, since `get_bin` reads bins from cache
+		frappe.clear_document_cache("Bin", bin_name)
+
 def get_previous_sle(args, for_update=False):
 	"""
 		get the last sle on or before the current time-bucket,
@@ -460,7 +756,13 @@ def get_stock_ledger_entries(previous_sle, operator=None,
 		conditions += " and " + previous_sle.get("warehouse_condition")
 
 	if check_serial_no and previous_sle.get("serial_no"):
-		conditions += " and serial_no like {}".format(frappe.db.escape('%{0}%'.format(previous_sle.get("serial_no"))))
+		conditions += """ and exists(select name from `tabSerial No Movement` snm
+			where snm.serial_no = {0} and snm.voucher_type = `tabStock Ledger Entry`.voucher_type
+				and snm.voucher_no = `tabStock Ledger Entry`.voucher_no
+				and ifnull(snm.voucher_detail_no, '') = ifnull(`tabStock Ledger Entry`.voucher_detail_no, '')
+				and snm.item_code = `tabStock Ledger Entry`.item_code
+				and snm.warehouse = `tabStock Ledger Entry`.warehouse)""".format(
+			frappe.db.escape(previous_sle.get("serial_no")))
 
 	if not previous_sle.get("posting_date"):
 		previous_sle["posting_date"] = "1900-01-01"
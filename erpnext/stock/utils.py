@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 import frappe, erpnext
 from frappe import _
 import json
-from frappe.utils import flt, cstr, nowdate, nowtime
+from frappe.utils import flt, cstr, nowdate, nowtime, add_days
 
 from six import string_types
 
@@ -37,9 +37,11 @@ def get_stock_value_from_bin(warehouse=None, item_code=None):
 	return stock_value
 
 def get_stock_value_on(warehouse=None, posting_date=None, item_code=None):
+	from erpnext.stock.doctype.stock_closing_balance.stock_closing_balance import get_closing_balance_date
+
 	if not posting_date: posting_date = nowdate()
 
-	values, condition = [posting_date], ""
+	values, condition = [], ""
 
 	if warehouse:
 
@@ -59,18 +61,31 @@ def get_stock_value_on(warehouse=None, posting_date=None, item_code=None):
 		values.append(item_code)
 		condition += " AND item_code = %s"
 
+	# scan the ledger only after the latest closing balances
+	closing_balance_date = get_closing_balance_date(add_days(posting_date, 1))
+	date_condition = " AND posting_date > %s" if closing_balance_date else ""
+	date_values = [closing_balance_date] if closing_balance_date else []
+
 	stock_ledger_entries = frappe.db.sql("""
 		SELECT item_code, stock_value, name, warehouse
 		FROM `tabStock Ledger Entry` sle
-		WHERE posting_date <= %s {0}
+		WHERE posting_date <= %s {0} {1}
 		ORDER BY timestamp(posting_date, posting_time) DESC, creation DESC
-	""".format(condition), values, as_dict=1)
+	""".format(date_condition, condition), [posting_date] + date_values + values, as_dict=1)
 
 	sle_map = {}
 	for sle in stock_ledger_entries:
 		if not (sle.item_code, sle.warehouse) in sle_map:
 			sle_map[(sle.item_code, sle.warehouse)] = flt(sle.stock_value)
 
+	if closing_balance_date:
+		for d in frappe.db.sql("""
+			SELECT item_code, stock_value, warehouse
+			FROM `tabStock Closing Balance` sle
+			WHERE period_end_date = %s {0}
+		""".format(condition), [closing_balance_date] + values, as_dict=1):
+			sle_map.setdefault((d.item_code, d.warehouse), flt(d.stock_value))
+
 	return sum(sle_map.values())
 
 @frappe.whitelist()
@@ -110,19 +125,10 @@ def get_stock_balance(item_code, warehouse, posting_date=None, posting_time=None
 		return last_entry.qty_after_transaction if last_entry else 0.0
 
 def get_serial_nos_data_after_transactions(args):
-	serial_nos = []
-	data = frappe.db.sql(""" SELECT serial_no, actual_qty
-		FROM `tabStock Ledger Entry`
-		WHERE
-			item_code = %(item_code)s and warehouse = %(warehouse)s
-			and timestamp(posting_date, posting_time) < timestamp(%(posting_date)s, %(posting_time)s)
-			order by posting_date, posting_time asc """, args, as_dict=1)
-
-	for d in data:
-		if d.actual_qty > 0:
-			serial_nos.extend(get_serial_nos_data(d.serial_no))
-		else:
-			serial_nos = list(set(serial_nos) - set(get_serial_nos_data(d.serial_no)))
+	from erpnext.stock.doctype.serial_no_movement.serial_no_movement import get_serial_nos_in_stock
+
+	serial_nos = get_serial_nos_in_stock(args.get("item_code"), args.get("warehouse"),
+		args.get("posting_date"), args.get("posting_time"))
 
 	return '\n'.join(serial_nos)
 
@@ -175,11 +181,11 @@ def get_bin(item_code, warehouse):
 	bin_obj.flags.ignore_permissions = True
 	return bin_obj
 
-def update_bin(args, allow_negative_stock=False, via_landed_cost_voucher=False):
+def update_bin(args, allow_negative_stock=False, via_landed_cost_voucher=False, repost=True):
 	is_stock_item = frappe.db.get_value('Item', args.get("item_code"), 'is_stock_item')
 	if is_stock_item:
 		bin = get_bin(args.get("item_code"), args.get("warehouse"))
-		bin.update_stock(args, allow_negative_stock, via_landed_cost_voucher)
+		bin.update_stock(args, allow_negative_stock, via_landed_cost_voucher, repost=repost)
 		return bin
 	else:
 		frappe.msgprint(_("Item {0} ignored since it is not a stock item").format(args.get("item_code")))
@@ -188,6 +194,7 @@ def update_bin(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 def get_incoming_rate(args, raise_error_if_no_rate=True):
 	"""Get Incoming Rate based on valuation method"""
 	from erpnext.stock.stock_ledger import get_previous_sle, get_valuation_rate
+	from erpnext.stock.valuation import FIFOQueue
 	if isinstance(args, string_types):
 		args = json.loads(args)
 
@@ -199,7 +206,7 @@ def get_incoming_rate(args, raise_error_if_no_rate=True):
 		previous_sle = get_previous_sle(args)
 		if valuation_method == 'FIFO':
 			if previous_sle:
-				previous_stock_queue = json.loads(previous_sle.get('stock_queue', '[]') or '[]')
+				previous_stock_queue = FIFOQueue.loads(previous_sle.get('stock_queue'))
 				in_rate = get_fifo_rate(previous_stock_queue, args.get("qty") or 0) if previous_stock_queue else 0
 		elif valuation_method == 'Moving Average':
 			in_rate = previous_sle.get('valuation_rate') or 0
@@ -229,7 +236,11 @@ def get_valuation_method(item_code):
 	return val_method
 
 def get_fifo_rate(previous_stock_queue, qty):
-	"""get FIFO (average) Rate from Queue"""
+	"""get FIFO (average) Rate from Queue, a list of [qty, rate] or `FIFOQueue`"""
+	from erpnext.stock.valuation import FIFOQueue
+	if not isinstance(previous_stock_queue, FIFOQueue):
+		previous_stock_queue = FIFOQueue(previous_stock_queue)
+
 	if qty >= 0:
 		total = sum(f[0] for f in previous_stock_queue)
 		return sum(flt(f[0]) * flt(f[1]) for f in previous_stock_queue) / flt(total) if total else 0.0
@@ -0,0 +1,124 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import json, zlib, struct, base64
+from collections import deque
+from frappe.utils import flt
+
+from six import string_types
+
+# prefix of the compact (binary) serialisation of a FIFO queue
+COMPACT_QUEUE_PREFIX = "fifo1:"
+
+# queues with fewer layers are stored as JSON, so that they remain readable
+COMPACT_QUEUE_MIN_LAYERS = 50
+
+class FIFOQueue(object):
+	"""
+		Stock queue (FIFO) as a deque of [qty, rate] layers
+
+		Layers are consumed from the head in O(1). The queue is stored in `stock_queue` of
+		the Stock Ledger Entry either as a JSON list of [qty, rate] pairs (small queues and
+		existing entries) or as a compact binary string for large queues:
+
+			"fifo1:" + base64(zlib(qtys as doubles + rates as doubles))
+	"""
+	def __init__(self, layers=None):
+		self.queue = deque([list(d) for d in (layers or [])])
+
+	@classmethod
+	def loads(cls, data):
+		"""build queue from the serialised `stock_queue`, JSON or compact"""
+		if not data:
+			return cls()
+
+		if not isinstance(data, string_types):
+			return cls(data)
+
+		if data.startswith(COMPACT_QUEUE_PREFIX):
+			packed = zlib.decompress(base64.b64decode(data[len(COMPACT_QUEUE_PREFIX):]))
+			values = struct.unpack("<{0}d".format(len(packed) // 8), packed)
+			count = len(values) // 2
+			return cls(zip(values[:count], values[count:]))
+
+		return cls(json.loads(data))
+
+	def dumps(self):
+		"""serialise the queue, compact format is used for large queues"""
+		if len(self.queue) < COMPACT_QUEUE_MIN_LAYERS:
+			return json.dumps(self.get_layers())
+
+		# store qtys and rates column wise, so that repeated values compress well
+		values = [flt(d[0]) for d in self.queue] + [flt(d[1]) for d in self.queue]
+		packed = struct.pack("<{0}d".format(len(values)), *values)
+
+		# fastest compression level, the queue is serialised for every reposted entry
+		return COMPACT_QUEUE_PREFIX + base64.b64encode(zlib.compress(packed, 1)).decode("ascii")
+
+	def get_layers(self):
+		return [list(d) for d in self.queue]
+
+	def get_total_qty_and_value(self):
+		qty, value = 0.0, 0.0
+		for d in self.queue:
+			qty += flt(d[0])
+			value += flt(d[0]) * flt(d[1])
+
+		return qty, value
+
+	def get_stock_value(self):
+		return sum((flt(d[0]) * flt(d[1]) for d in self.queue))
+
+	def add_stock(self, qty, rate):
+		"""add an incoming layer, merged with the last layer if rate is the same"""
+		if not self.queue:
+			self.queue.append([0, 0])
+
+		# last row has the same rate, just updated the qty
+		if self.queue[-1][1] == rate:
+			self.queue[-1][0] += qty
+		else:
+			if self.queue[-1][0] > 0:
+				self.queue.append([qty, rate])
+			else:
+				qty = self.queue[-1][0] + qty
+				self.queue[-1] = [qty, rate]
+
+	def index_of_rate(self, rate):
+		for i, d in enumerate(self.queue):
+			if d[1] == rate:
+				return i
+
+	def collapse(self, qty_to_remove, rate):
+		"""remove qty at the given rate from the value of the queue, leaving a single layer"""
+		qty, value = self.get_total_qty_and_value()
+		new_stock_qty = qty - qty_to_remove
+		new_stock_value = value - qty_to_remove * rate
+		self.queue = deque([[new_stock_qty, new_stock_value/new_stock_qty if new_stock_qty > 0 else rate]])
+
+	def pop(self, index=0):
+		if index == 0:
+			return self.queue.popleft()
+
+		layer = self.queue[index]
+		del self.queue[index]
+		return layer
+
+	def append(self, layer):
+		self.queue.append(list(layer))
+
+	def __getitem__(self, index):
+		return self.queue[index]
+
+	def __len__(self):
+		return len(self.queue)
+
+	def __iter__(self):
+		return iter(self.queue)
+
+	def __eq__(self, other):
+		return self.get_layers() == [list(d) for d in other]
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
@@ -3,8 +3,16 @@
 
 from __future__ import unicode_literals
 
+import os
+import unittest
 import frappe
 
+def benchmark(test):
+	"""Skip the test unless the ERPNEXT_BENCHMARK environment variable is set. Benchmarks print
+	their timings, they are not asserted"""
+	return unittest.skipUnless(os.environ.get("ERPNEXT_BENCHMARK"),
+		"set ERPNEXT_BENCHMARK to run the benchmarks")(test)
+
 def create_test_contact_and_address():
 	frappe.db.sql('delete from tabContact')
 	frappe.db.sql('delete from `tabContact Email`')
@@ -0,0 +1,71 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import now
+
+numeric_fieldtypes = ("Currency", "Int", "Long Int", "Float", "Percent", "Check")
+
+def bulk_insert(doctype, rows, chunk_size=1000, docstatus=0):
+	"""Insert rows (list of dicts) with multi-row INSERT queries, `chunk_size` rows per query.
+
+	Standard fields (name, creation, modified, owner, modified_by, docstatus) are set
+	if not in the row, missing numeric values are set as 0. No controller methods,
+	validations or hooks are run."""
+	if not rows:
+		return []
+
+	meta = frappe.get_meta(doctype)
+
+	timestamp, user = now(), frappe.session.user
+	default_values = {
+		"creation": timestamp,
+		"modified": timestamp,
+		"owner": user,
+		"modified_by": user,
+		"docstatus": docstatus
+	}
+
+	fields = ["name"] + list(default_values)
+	for row in rows:
+		for fieldname in row:
+			if fieldname not in fields:
+				fields.append(fieldname)
+
+	for fieldname in fields:
+		df = meta.get_field(fieldname)
+		if df and df.fieldtype in numeric_fieldtypes:
+			default_values[fieldname] = 0
+
+	names = []
+	for row in rows:
+		if not row.get("name"):
+			row["name"] = frappe.generate_hash(txt="", length=10)
+		names.append(row["name"])
+
+	columns = ", ".join("`{0}`".format(fieldname) for fieldname in fields)
+	placeholder = "({0})".format(", ".join(["%s"] * len(fields)))
+
+	for i in range(0, len(rows), chunk_size):
+		chunk = rows[i:i + chunk_size]
+
+		values = []
+		for row in chunk:
+			values.extend(default_values.get(fieldname) if row.get(fieldname) is None else row.get(fieldname)
+				for fieldname in fields)
+
+		frappe.db.sql("""insert into `tab{0}` ({1}) values {2}""".format(doctype, columns,
+			", ".join([placeholder] * len(chunk))), tuple(values))
+
+	return names
+
+def get_master_details(doctype, names, fields):
+	"""Returns the `fields` of the records of `doctype` named `names`, by name, in one query.
+	Used to validate the rows of a bulk insert against their masters"""
+	names = list(set(name for name in names if name))
+	if not names:
+		return {}
+
+	return {d.name: d for d in frappe.get_all(doctype, filters={"name": ("in", names)},
+		fields=["name"] + fields)}
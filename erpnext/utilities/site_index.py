@@ -0,0 +1,43 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import frappe
+from frappe.utils import now
+
+# (site, index name) -> (version, index)
+site_indexes = {}
+
+def get_site_index(name, doctype, build=dict):
+	"""Returns the index `name` of the site, kept in the memory of the process and rebuilt
+	with `build` when the version of the records of `doctype` changes.
+
+	The version (number of records and last modified) is read from the database once per
+	request, so an index built from the records of a transaction is rebuilt in the other
+	processes once the transaction is committed. Child records are changed by saving their
+	parent, which updates its modified"""
+	if frappe.flags.site_index_versions is None:
+		frappe.flags.site_index_versions = {}
+
+	version = frappe.flags.site_index_versions.get(name)
+	if version is None:
+		version = tuple(frappe.db.sql("""select count(*), max(modified) from `tab{0}`""".format(doctype))[0])
+		frappe.flags.site_index_versions[name] = version
+
+	key = (frappe.local.site, name)
+	site_index = site_indexes.get(key)
+	if not site_index or site_index[0] != version:
+		site_index = (version, build())
+		site_indexes[key] = site_index
+
+	return site_index[1]
+
+def clear_site_index_version(name):
+	"""Read the version of the index `name` again in this request, to be called after
+	the records of the index are changed"""
+	if frappe.flags.site_index_versions:
+		frappe.flags.site_index_versions.pop(name, None)
+
+def update_modified_after_rename(doctype, name):
+	"""Renaming does not change the modified of the record, which versions the indexes"""
+	frappe.db.sql("""update `tab{0}` set modified = %s where name = %s""".format(doctype), (now(), name))